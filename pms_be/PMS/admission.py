@@ -0,0 +1,143 @@
+"""
+Admission control in front of every Ollama call (see PMS.ollama).
+
+At most OLLAMA_CONCURRENCY calls run at once; the rest wait in a bounded priority
+queue (interactive voice first, then chat, then batch work) and are admitted in
+priority order, first come first served within a class. A call is rejected right
+away with 429 when OLLAMA_QUEUE_SIZE calls are already waiting, and with 503 when
+it waited OLLAMA_QUEUE_TIMEOUT seconds without being admitted. Ollama runs one
+generation at a time anyway; this keeps the backlog short and visible instead of
+letting every request pile onto it.
+
+The state is guarded by a thread lock and waiters are woken on their own event
+loop, so one controller serves the whole process (ASGI loop, async_to_sync loops
+and threads alike). Counters and wait times are served by /api/ai-stats/.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+
+from .metrics import Timings
+
+PRIORITIES = {"interactive": 0, "chat": 1, "batch": 2}
+
+
+class Rejected(Exception):
+    """Not admitted: 429 (queue full) or 503 (waited too long)."""
+
+    def __init__(self, status_code, message, retry_after=1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = []  # (priority, seq, future, loop)
+        self._queued = set()  # futures still in _queue and not given up on
+        self._seq = itertools.count()
+        self.active = 0
+        self.waiting = self.peak_waiting = 0
+        self.admitted = self.rejected = self.timed_out = 0
+        self.waits = Timings()
+
+    @staticmethod
+    def limits():
+        return (
+            getattr(settings, "OLLAMA_CONCURRENCY", 2),
+            getattr(settings, "OLLAMA_QUEUE_SIZE", 32),
+            getattr(settings, "OLLAMA_QUEUE_TIMEOUT", 30),
+        )
+
+    async def acquire(self, priority="chat"):
+        concurrency, queue_size, timeout = self.limits()
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < concurrency and not self.waiting:
+                self.active += 1
+                self.admitted += 1
+                self.waits.record(priority, 0.0)
+                return
+            if self.waiting >= queue_size:
+                self.rejected += 1
+                raise Rejected(429, "Too many AI requests queued, try again shortly")
+            future = loop.create_future()
+            heapq.heappush(self._queue, (PRIORITIES[priority], next(self._seq), future, loop))
+            self._queued.add(future)
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                granted = future.done() and not future.cancelled()
+                if future in self._queued:
+                    # still queued: leave the queue (release() skips cancelled entries)
+                    self._queued.discard(future)
+                    self.waiting -= 1
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.timed_out += 1
+                if not granted:
+                    # if a slot is already on its way, _grant() passes it on
+                    future.cancel()
+            if granted:
+                # admitted just as we gave up: pass the slot on
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                raise Rejected(503, "The AI service is busy, try again later", retry_after=timeout) from None
+            raise
+        with self._lock:
+            self.admitted += 1
+        self.waits.record(priority, time.perf_counter() - started)
+
+    def release(self):
+        """Free a slot, handing it straight to the next live waiter if there is one."""
+        with self._lock:
+            while self._queue:
+                _, _, future, loop = heapq.heappop(self._queue)
+                if future not in self._queued:
+                    continue
+                self._queued.discard(future)
+                self.waiting -= 1
+                loop.call_soon_threadsafe(self._grant, future)
+                return
+            self.active -= 1
+
+    def _grant(self, future):
+        # runs on the waiter's loop; it may have given up in the meantime
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(True)
+
+    @asynccontextmanager
+    async def slot(self, priority="chat"):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        concurrency, queue_size, timeout = self.limits()
+        with self._lock:
+            counters = {
+                "active": self.active, "queue_depth": self.waiting, "peak_queue_depth": self.peak_waiting,
+                "admitted": self.admitted, "rejected": self.rejected, "timed_out": self.timed_out,
+            }
+        return {
+            "limits": {"concurrency": concurrency, "queue_size": queue_size, "queue_timeout": timeout},
+            **counters,
+            "wait_by_priority": self.waits.stats(),
+        }
+
+
+controller = AdmissionController()
@@ -0,0 +1,184 @@
+"""
+Burndown, cumulative flow and cycle time.
+
+Every status transition of a task (including its creation and deletion) is appended
+to TaskStatusChange by PMS.signals. The same write upserts the project's row for
+today in ProjectDailySnapshot: the status counts are copied from the project's rollup
+counters (already up to date when the receiver runs) and the day's created /
+completed / cycle time totals are incremented. Reports then read one row per active
+day and carry the counts forward over quiet days, instead of replaying the history.
+`manage.py snapshot_projects` (daily, from cron) writes a row for every project, so
+quiet days are materialized too.
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .models import Project, TaskStatusChange, ProjectDailySnapshot
+from .rollups import ROLLUP_FIELDS, ROLLUP_STATUSES
+
+# longest window a report may cover, in days
+MAX_WINDOW = 366
+DEFAULT_WINDOW = 30
+
+ACTIVITY_FIELDS = ["created_count", "completed_count", "cycle_time_hours", "cycle_time_count"]
+
+
+# ---------------- recording ----------------
+def record(changes):
+    """
+    Append transitions [(task_id, project_id, from_status, to_status)] and fold them
+    into today's snapshots. A from_status of None is a creation, a to_status of
+    None a deletion.
+    """
+    changes = [c for c in changes if c[2] != c[3]]
+    if not changes:
+        return
+    now = timezone.now()
+    cycle_times = _cycle_times([c[0] for c in changes if c[3] == "completed"], now)
+    TaskStatusChange.objects.bulk_create([
+        TaskStatusChange(task_id=t, project_id=p, from_status=old, to_status=new, changed_at=now)
+        for t, p, old, new in changes
+    ])
+
+    activity = {}
+    for task_id, project_id, old, new in changes:
+        if project_id is None:
+            continue
+        totals = activity.setdefault(project_id, dict.fromkeys(ACTIVITY_FIELDS, 0))
+        if old is None:
+            totals["created_count"] += 1
+        if new == "completed":
+            totals["completed_count"] += 1
+            if task_id in cycle_times:
+                totals["cycle_time_hours"] += cycle_times[task_id]
+                totals["cycle_time_count"] += 1
+    snapshot(activity, day=timezone.localdate(now))
+
+
+def _cycle_times(task_ids, now):
+    """{task_id: hours since it first went in progress (or was created, if it never did)}"""
+    if not task_ids:
+        return {}
+    rows = (
+        TaskStatusChange.objects.filter(task_id__in=task_ids)
+        .values("task_id")
+        .annotate(started=Min("changed_at", filter=Q(to_status="in_progress")), created=Min("changed_at"))
+    )
+    return {
+        row["task_id"]: (now - (row["started"] or row["created"])).total_seconds() / 3600
+        for row in rows
+    }
+
+
+def _upsert_sql():
+    table = connection.ops.quote_name(ProjectDailySnapshot._meta.db_table)
+    project_table = connection.ops.quote_name(Project._meta.db_table)
+    copied = ", ".join(f"{f} = excluded.{f}" for f in ROLLUP_FIELDS)
+    added = ", ".join(f"{f} = {table}.{f} + excluded.{f}" for f in ACTIVITY_FIELDS)
+    return (
+        f"INSERT INTO {table} (project_id, day, {', '.join(ROLLUP_FIELDS)}, {', '.join(ACTIVITY_FIELDS)}) "
+        f"SELECT id, %s, {', '.join(ROLLUP_FIELDS)}, {', '.join(['%s'] * len(ACTIVITY_FIELDS))} "
+        f"FROM {project_table} WHERE id = %s "
+        f"ON CONFLICT (project_id, day) DO UPDATE SET {copied}, {added}"
+    )
+
+
+def snapshot(activity, day=None):
+    """
+    Upsert the day's row for each project in {project_id: {activity field: delta}}:
+    counts copied from the project, activity added. One statement per project.
+    """
+    if not activity:
+        return
+    day = day or timezone.localdate()
+    params = [
+        [day] + [totals.get(f, 0) for f in ACTIVITY_FIELDS] + [project_id]
+        for project_id, totals in activity.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), params)
+
+
+def snapshot_all(day=None):
+    """Materialize today's row for every project (quiet ones included)."""
+    project_ids = Project.objects.filter(deleting=False).values_list("id", flat=True)
+    snapshot({p: {} for p in project_ids}, day=day)
+
+
+# ---------------- reports ----------------
+def window(start=None, end=None):
+    """(start, end) dates, defaulting to the last DEFAULT_WINDOW days. Raises ValueError."""
+    end = end or timezone.localdate()
+    start = start or end - timedelta(days=DEFAULT_WINDOW - 1)
+    if end < start:
+        raise ValueError("end must not be before start")
+    if (end - start).days >= MAX_WINDOW:
+        raise ValueError(f"window must not exceed {MAX_WINDOW} days")
+    return start, end
+
+
+def daily(project_id, start, end):
+    """
+    One dict per day from start to end: status counts as of the end of the day
+    (carried forward from the last snapshot) and the day's activity (0 when quiet).
+    """
+    rows = ProjectDailySnapshot.objects.filter(project_id=project_id)
+    by_day = {r.day: r for r in rows.filter(day__range=(start, end))}
+    carried = rows.filter(day__lt=start).order_by("-day").first()
+
+    series = []
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        row = by_day.get(day)
+        if row is not None:
+            carried = row
+        entry = {"day": day}
+        entry.update({f: getattr(carried, f) if carried else 0 for f in ROLLUP_FIELDS})
+        entry.update({f: getattr(row, f) if row else 0 for f in ACTIVITY_FIELDS})
+        series.append(entry)
+    return series
+
+
+def burndown(project, start, end):
+    series = daily(project.id, start, end)
+    remaining = [d["tasks_total"] - d["tasks_completed"] for d in series]
+    # straight line from the first day's remaining work to zero at the project end date
+    ideal = None
+    if project.end_date and project.end_date > start:
+        span = (project.end_date - start).days
+        ideal = [max(0.0, round(remaining[0] * (1 - i / span), 2)) for i in range(len(series))]
+    return {
+        "days": [d["day"] for d in series],
+        "remaining": remaining,
+        "completed": [d["tasks_completed"] for d in series],
+        "total": [d["tasks_total"] for d in series],
+        "ideal": ideal,
+    }
+
+
+def cumulative_flow(project, start, end):
+    series = daily(project.id, start, end)
+    return {
+        "days": [d["day"] for d in series],
+        "statuses": {s: [d[f"tasks_{s}"] for d in series] for s in ROLLUP_STATUSES},
+    }
+
+
+def cycle_time(project, start, end):
+    series = daily(project.id, start, end)
+    hours = sum(d["cycle_time_hours"] for d in series)
+    measured = sum(d["cycle_time_count"] for d in series)
+    return {
+        "days": [d["day"] for d in series],
+        "completed": [d["completed_count"] for d in series],
+        "created": [d["created_count"] for d in series],
+        "average_hours": [
+            round(d["cycle_time_hours"] / d["cycle_time_count"], 2) if d["cycle_time_count"] else None
+            for d in series
+        ],
+        "throughput": sum(d["completed_count"] for d in series),
+        "average_cycle_time_hours": round(hours / measured, 2) if measured else None,
+    }
@@ -0,0 +1,152 @@
+"""
+Batched create/update for modules and tasks.
+
+A payload is validated as a whole first (field validation per item, foreign keys
+and target rows checked with one query per relation); if anything is wrong nothing
+is written and the errors are reported per item index. Otherwise all rows are
+written with bulk_create / bulk_update inside a single transaction.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from . import events, rollups, scheduling, search, semantic, workload
+from .models import Project, Module, Task
+from .serializers import BulkModuleSerializer, BulkTaskSerializer
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+
+class BulkSpec:
+    def __init__(self, model, serializer_class, relations):
+        self.model = model
+        self.serializer_class = serializer_class
+        # attname -> related model whose ids must exist
+        self.relations = relations
+
+
+MODULES = BulkSpec(Module, BulkModuleSerializer, {"project_id": Project, "assigned_to_id": User})
+TASKS = BulkSpec(Task, BulkTaskSerializer, {"module_id": Module, "assigned_to_id": User})
+
+
+def _existing_ids(model, ids):
+    ids = list(ids)
+    found = set()
+    for i in range(0, len(ids), BATCH_SIZE):
+        found.update(model.objects.filter(id__in=ids[i:i + BATCH_SIZE]).values_list("id", flat=True))
+    return found
+
+
+def _fetch(model, ids):
+    ids = list(ids)
+    found = {}
+    for i in range(0, len(ids), BATCH_SIZE):
+        found.update(model.objects.in_bulk(ids[i:i + BATCH_SIZE]))
+    return found
+
+
+def validate(spec, items, update=False):
+    """
+    Returns (validated rows, existing instances by id, errors) where errors is a list of
+    {"index": i, "errors": {...}}. Existing instances are only fetched for updates.
+    """
+    if not isinstance(items, list) or not items:
+        return [], {}, [{"index": None, "errors": {"non_field_errors": ["Expected a non-empty list of items."]}}]
+
+    # one serializer instance for the whole list: building the fields is the
+    # expensive part of DRF validation, running them is cheap
+    child = spec.serializer_class(partial=update)
+    rows, errors = [], {}
+    for index, item in enumerate(items):
+        try:
+            rows.append(child.run_validation(item))
+        except ValidationError as exc:
+            rows.append(None)
+            errors[index] = exc.detail if isinstance(exc.detail, dict) else {"non_field_errors": exc.detail}
+
+    def add_error(index, field, message):
+        errors.setdefault(index, {}).setdefault(field, []).append(message)
+
+    for attname, related in spec.relations.items():
+        wanted = {row[attname] for row in rows if row and row.get(attname) is not None}
+        missing = wanted - _existing_ids(related, wanted)
+        for index, row in enumerate(rows):
+            if row and row.get(attname) in missing:
+                add_error(index, attname.removesuffix("_id"), f"{related.__name__} {row[attname]} does not exist.")
+
+    instances = {}
+    if update:
+        wanted = set()
+        for index, row in enumerate(rows):
+            if row is None:
+                continue
+            if row.get("id") is None:
+                add_error(index, "id", "This field is required for updates.")
+            elif row["id"] in wanted:
+                add_error(index, "id", "Duplicate id in payload.")
+            else:
+                wanted.add(row["id"])
+        instances = _fetch(spec.model, wanted)
+        for index, row in enumerate(rows):
+            if row and row.get("id") is not None and row["id"] not in instances:
+                add_error(index, "id", f"{spec.model.__name__} {row['id']} does not exist.")
+
+    error_list = [{"index": i, "errors": e} for i, e in sorted(errors.items())]
+    return rows, instances, error_list
+
+
+def create(spec, items):
+    """Returns (created objects, errors)."""
+    rows, _, errors = validate(spec, items)
+    if errors:
+        return [], errors
+    objs = [spec.model(**{k: v for k, v in row.items() if k != "id"}) for row in rows]
+    with transaction.atomic():
+        spec.model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+        if spec.model is Module:
+            # tasks are covered by tasks_bulk_changed, modules have no bulk signal
+            search.reindex("module", [o.pk for o in objs])
+            semantic.changed("module", [o.pk for o in objs], created=True)
+            events.rows_written(Module, [o.pk for o in objs], created=True)
+            transaction.on_commit(workload.invalidate_all)
+    return objs, []
+
+
+def update(spec, items):
+    """Partial update of existing rows by id. Returns (updated objects, errors)."""
+    rows, instances, errors = validate(spec, items, update=True)
+    if errors:
+        return [], errors
+
+    objs, fields = [], set()
+    old_projects = set()
+    for row in rows:
+        obj = instances[row["id"]]
+        if spec.model is Module and row.get("project_id", obj.project_id) != obj.project_id:
+            old_projects.add(obj.project_id)
+        for attname, value in row.items():
+            if attname != "id":
+                setattr(obj, attname, value)
+                fields.add(attname)
+        objs.append(obj)
+
+    with transaction.atomic():
+        if fields:
+            spec.model.objects.bulk_update(objs, sorted(fields), batch_size=BATCH_SIZE)
+        if old_projects:
+            # modules carry their task counters with them to the new project
+            rollups.refresh_projects(old_projects | {o.project_id for o in objs})
+        if spec.model is Module:
+            search.reindex("module", [o.pk for o in objs])
+            if semantic.TEXT_FIELDS["module"] & fields:
+                semantic.changed("module", [o.pk for o in objs])
+            events.rows_written(Module, [o.pk for o in objs])
+            transaction.on_commit(workload.invalidate_all)
+            if old_projects:
+                # task rows carry their project for filtering
+                search.reindex("task", Task.objects.filter(module__in=objs).values_list("id", flat=True))
+                for project_id in old_projects | {o.project_id for o in objs}:
+                    scheduling.mark(project_id, full=True)
+    return objs, []
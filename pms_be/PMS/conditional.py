@@ -0,0 +1,59 @@
+"""
+Conditional GET (ETag / Last-Modified) for read endpoints.
+
+A stamp function returns the version stamps the response depends on (see
+models.next_version / CollectionVersion) and is evaluated before the view. When
+the client already holds that state, Django's condition() answers 304 and the
+queryset is never evaluated or serialized.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.utils import timezone as django_timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .models import CollectionVersion
+
+
+def collection_stamps(*models_):
+    """Stamp function part: latest write stamps of whole tables (one query)."""
+    return CollectionVersion.stamps(*models_)
+
+
+def day_stamp():
+    """
+    Stamp function part for responses that depend on today's date (e.g. what is
+    overdue): local midnight in the same microsecond scale as the version stamps,
+    so it also moves Last-Modified forward when the day changes.
+    """
+    midnight = datetime.combine(django_timezone.localdate(), datetime.min.time())
+    return int(django_timezone.make_aware(midnight).timestamp() * 1_000_000)
+
+
+def conditional(stamp_func):
+    """
+    Decorator for APIView GET handlers. stamp_func(request, *args, **kwargs) returns
+    a list of integer stamps, or None to skip conditional handling (e.g. not found).
+    """
+    def stamps(request, *args, **kwargs):
+        # condition() asks for the ETag and Last-Modified separately; compute once
+        if not hasattr(request, "_pms_stamps"):
+            request._pms_stamps = stamp_func(request, *args, **kwargs)
+        return request._pms_stamps
+
+    def etag(request, *args, **kwargs):
+        values = stamps(request, *args, **kwargs)
+        if values is None:
+            return None
+        # the full path keeps different filters / pages from sharing an ETag
+        raw = "|".join([request.get_full_path(), *map(str, values)])
+        return '"%s"' % hashlib.blake2s(raw.encode(), digest_size=12).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        values = stamps(request, *args, **kwargs)
+        if not values or not max(values):
+            return None
+        return datetime.fromtimestamp(max(values) / 1e6, tz=timezone.utc)
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified))
@@ -1,7 +1,13 @@
 # PMS/consumers.py
+import asyncio
 import json
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from . import admission, events, llm_cache, ollama
+
 class CallConsumer(AsyncWebsocketConsumer):
     """
     Simple signaling consumer.
@@ -47,3 +53,109 @@ class CallConsumer(AsyncWebsocketConsumer):
     async def call_message(self, event):
         # send message to WebSocket client
         await self.send(text_data=json.dumps(event["message"]))
+
+    async def deadline_notifications(self, event):
+        # overdue / due soon items from PMS.deadlines
+        await self.send(text_data=json.dumps({"type": "deadlines", "items": event["items"]}))
+
+
+class ProjectBoardConsumer(AsyncWebsocketConsumer):
+    """
+    Live changes of one project's board (see PMS.events).
+    Every message carries the event seq; a client that reconnects with the last seq
+    it saw, ws/projects/<id>/?cursor=<seq> or {"action": "resume", "cursor": <seq>},
+    first gets what it missed, or {"type": "reset"} if it is too far behind and
+    should reload the board.
+    Pushed messages:
+    {"type": "events", "events": [{"seq", "project", "entity", "id", "op", "fields"}, ...]}
+    """
+    async def connect(self):
+        self.project_id = int(self.scope['url_route']['kwargs']['project_id'])
+        self.group_name = events.group_name(self.project_id)
+        # live events at or below this seq were already sent by a replay
+        self.replayed_up_to = 0
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        if query.get("cursor"):
+            await self.resume(query["cursor"][0])
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data)
+        except Exception:
+            return
+        if data.get("action") == "resume":
+            await self.resume(data.get("cursor"))
+
+    async def resume(self, cursor):
+        try:
+            cursor = int(cursor)
+        except (TypeError, ValueError):
+            await self.send(text_data=json.dumps({"type": "error", "error": "cursor must be an integer"}))
+            return
+        missed, complete = await database_sync_to_async(events.missed_events)(self.project_id, cursor)
+        if not complete:
+            await self.send(text_data=json.dumps({"type": "reset"}))
+            return
+        if missed:
+            self.replayed_up_to = max(self.replayed_up_to, missed[-1]["seq"])
+            await self.send(text_data=json.dumps({"type": "events", "events": missed}))
+
+    async def board_events(self, event):
+        fresh = [e for e in event["events"] if e["seq"] > self.replayed_up_to]
+        if fresh:
+            await self.send(text_data=json.dumps({"type": "events", "events": fresh}))
+
+
+class VoiceChatConsumer(AsyncWebsocketConsumer):
+    """
+    Streamed AI replies: send {"message": "..."}, receive {"type": "token", "token"}
+    messages as the model generates, then {"type": "done", "reply"} (or
+    {"type": "error", "error"}). {"action": "stop"} cancels the reply in progress;
+    a new message replaces it.
+    """
+    async def connect(self):
+        self.reply_task = None
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        await self.stop()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data)
+        except (TypeError, ValueError):
+            return
+        await self.stop()
+        message = data.get("message") if isinstance(data, dict) else None
+        message = message.strip() if isinstance(message, str) else ""
+        if message and data.get("action") != "stop":
+            self.reply_task = asyncio.create_task(self.reply(message))
+
+    async def stop(self):
+        if self.reply_task and not self.reply_task.done():
+            self.reply_task.cancel()
+            await asyncio.gather(self.reply_task, return_exceptions=True)
+        self.reply_task = None
+
+    async def reply(self, message):
+        messages = [{"role": "system", "content": ollama.VOICE_SYSTEM_PROMPT}, {"role": "user", "content": message}]
+        cache_key, cached = llm_cache.lookup(message, ollama.model(), ollama.VOICE_SYSTEM_PROMPT)
+        stream = llm_cache.replay(cached) if cached is not None else llm_cache.remembered(ollama.stream_chat(messages, priority="interactive"), cache_key)
+        pieces = []
+        try:
+            async for piece in stream:
+                pieces.append(piece)
+                await self.send(text_data=json.dumps({"type": "token", "token": piece}))
+        except admission.Rejected as e:
+            await self.send(text_data=json.dumps({"type": "error", "error": str(e), "retry_after": e.retry_after}))
+            return
+        except ollama.OllamaError as e:
+            await self.send(text_data=json.dumps({"type": "error", "error": f"Error contacting LLM: {e}"}))
+            return
+        await self.send(text_data=json.dumps({"type": "done", "reply": "".join(pieces) or "Sorry, no response from LLM."}))
@@ -0,0 +1,121 @@
+"""
+Overdue / due soon notifications for tasks and modules.
+
+`manage.py scan_deadlines` (run from cron) looks only at end dates it has not seen
+yet: DeadlineScan keeps, per kind, the last end date already scanned, so a run reads
+the tasks and modules whose end_date falls between that mark and today (overdue) or
+today + due_soon_days (due soon). Both are range scans of the end_date indexes, so a
+run costs the same however much history there is. Matching items are sent, grouped
+per assignee, to the user_<username> group CallConsumer joins, after the marks
+have been committed. Open means not completed (tasks) or not all tasks completed
+(modules); projects being deleted are left out.
+
+An end date moved back behind the mark is not reported again; one moved forward is
+reported when the window reaches it.
+"""
+import logging
+import re
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Module, Task, DeadlineScan
+
+logger = logging.getLogger(__name__)
+
+DUE_SOON_DAYS = 2
+# items per websocket message
+BATCH_SIZE = 100
+
+# group names CallConsumer can join (its route only accepts \w+ usernames)
+GROUP_SAFE = re.compile(r"^\w+$")
+
+
+def user_group(username):
+    return f"user_{username}"
+
+
+def windows(today, due_soon_days, scanned_through=None):
+    """
+    {kind: (first day, last day)} a run covers. The first run reports what became
+    overdue yesterday; later ones everything since the last overdue day scanned,
+    so days cron skipped are caught up. scanned_through is {kind: date}.
+    """
+    scanned_through = scanned_through or {}
+    yesterday = today - timedelta(days=1)
+    overdue_from = scanned_through["overdue"] + timedelta(days=1) if "overdue" in scanned_through else yesterday
+    return {
+        "overdue": (overdue_from, yesterday),
+        "due_soon": (today, today + timedelta(days=due_soon_days)),
+    }
+
+
+def _open_tasks(first, last):
+    return (
+        Task.objects.filter(end_date__gte=first, end_date__lte=last, assigned_to__isnull=False,
+                            module__project__deleting=False)
+        .exclude(status="completed")
+        .values_list("id", "title", "end_date", "module__project_id", "assigned_to__username")
+    )
+
+
+def _open_modules(first, last):
+    return (
+        Module.objects.filter(end_date__gte=first, end_date__lte=last, assigned_to__isnull=False,
+                              project__deleting=False)
+        .filter(Q(tasks_total=0) | Q(tasks_completed__lt=F("tasks_total")))
+        .values_list("id", "name", "end_date", "project_id", "assigned_to__username")
+    )
+
+
+def scan(today=None, due_soon_days=DUE_SOON_DAYS):
+    """
+    Advance the marks to today and queue notifications for what came into range.
+    Returns {kind: number of items}.
+    """
+    today = today or timezone.localdate()
+    by_user = {}
+    counts = {}
+    with transaction.atomic():
+        marks = {s.kind: s for s in DeadlineScan.objects.select_for_update().all()}
+        scanned_through = {kind: mark.scanned_through for kind, mark in marks.items()}
+        for kind, (first, last) in windows(today, due_soon_days, scanned_through).items():
+            scan_state = marks.get(kind) or DeadlineScan(kind=kind, scanned_through=first - timedelta(days=1))
+            first = max(first, scan_state.scanned_through + timedelta(days=1))
+            counts[kind] = 0
+            if first <= last:
+                for entity, rows in (("task", _open_tasks(first, last)), ("module", _open_modules(first, last))):
+                    for pk, title, end_date, project_id, username in rows:
+                        by_user.setdefault(username, []).append({
+                            "kind": kind, "entity": entity, "id": pk, "title": title,
+                            "end_date": end_date.isoformat(), "project": project_id,
+                        })
+                        counts[kind] += 1
+                scan_state.scanned_through = last
+            scan_state.last_run_at = timezone.now()
+            scan_state.last_notified = counts[kind]
+            scan_state.save()
+        transaction.on_commit(lambda: notify(by_user))
+    return counts
+
+
+def notify(by_user):
+    """Send {username: [item, ...]} in batches of BATCH_SIZE, one group_send each."""
+    if not by_user:
+        return
+    try:
+        channel_layer = get_channel_layer()
+        for username, items in by_user.items():
+            if not GROUP_SAFE.match(username):
+                continue
+            for i in range(0, len(items), BATCH_SIZE):
+                async_to_sync(channel_layer.group_send)(
+                    user_group(username), {"type": "deadline.notifications", "items": items[i:i + BATCH_SIZE]},
+                )
+    except Exception as e:
+        # the marks already moved on; the workload endpoint still shows what is overdue
+        logger.warning("Could not send deadline notifications to %d user(s): %s", len(by_user), e)
@@ -0,0 +1,136 @@
+"""
+Background deletion of whole projects.
+
+project.delete() makes Django's collector load every module and task (and run their
+signals) inside the request. Instead DELETE only flags the project and queues a
+ProjectDeletion; a background thread then removes tasks, modules and finally the
+project with raw DELETEs of CHUNK_SIZE rows, one short transaction per chunk.
+
+Raw deletes skip post_delete, so every chunk also does what those receivers would:
+drop dependent rows (DEPENDENT_ROWS), the search rows and embeddings, append tombstones to the
+change log and touch the collection versions (cached workloads are retired, and the
+project's status history and daily snapshots dropped, once at the end). `manage.py purge_deleted_projects` resumes deletions interrupted by a
+restart.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import events, search, semantic, workload
+from .models import (
+    Project, Module, Task, TaskDependency, TaskSchedule, TaskStatusChange, ProjectDailySnapshot, ChangeEvent,
+    CollectionVersion, ProjectDeletion,
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+
+# rows pointing at a model that have to go before it: (model, foreign key column)
+DEPENDENT_ROWS = {
+    Task: [(TaskSchedule, "task_id"), (TaskDependency, "predecessor_id"), (TaskDependency, "successor_id")],
+}
+
+
+def request_deletion(project):
+    """Flag the project and queue its deletion. Returns the ProjectDeletion."""
+    with transaction.atomic():
+        deletion, created = ProjectDeletion.objects.get_or_create(
+            project_id=project.pk,
+            defaults={
+                "project_name": project.name,
+                "tasks_total": Task.objects.filter(module__project_id=project.pk).count(),
+                "modules_total": Module.objects.filter(project_id=project.pk).count(),
+            },
+        )
+        restarted = not created and deletion.status in ("done", "failed")
+        if restarted:
+            deletion.status, deletion.error, deletion.finished_at = "queued", "", None
+            deletion.save(update_fields=["status", "error", "finished_at"])
+        Project.objects.filter(pk=project.pk).update(deleting=True)
+        # its modules and tasks drop out of every listing right away
+        CollectionVersion.touch(Module, Task)
+        transaction.on_commit(workload.invalidate_all)
+        # a deletion already queued or running has its thread
+        if (created or restarted) and getattr(settings, "PMS_DELETE_IN_BACKGROUND", True):
+            transaction.on_commit(lambda: start(project.pk))
+    return deletion
+
+
+def start(project_id):
+    threading.Thread(target=_run_in_thread, args=(project_id,), name=f"delete-project-{project_id}", daemon=True).start()
+
+
+def _run_in_thread(project_id):
+    try:
+        run(project_id)
+    finally:
+        connection.close()
+
+
+def _tombstones(entity, ids, project_id):
+    return [ChangeEvent(project_id=project_id, entity=entity, entity_id=i, op="deleted") for i in ids]
+
+
+def _delete_chunk(model, entity, ids, project_id):
+    with transaction.atomic():
+        search.remove(entity, ids)
+        semantic.remove(entity, ids)
+        events.record(_tombstones(entity, ids, project_id))
+        for dependent, column in DEPENDENT_ROWS.get(model, ()):
+            dependent.objects.filter(**{f"{column}__in": ids})._raw_delete(connection.alias)
+        model.objects.filter(pk__in=ids)._raw_delete(connection.alias)
+        CollectionVersion.touch(model)
+
+
+def run(project_id):
+    """Delete a flagged project chunk by chunk, recording progress. Safe to re-run."""
+    deletion = ProjectDeletion.objects.get(project_id=project_id)
+    ProjectDeletion.objects.filter(pk=project_id).update(status="running")
+    try:
+        while ids := list(Task.objects.filter(module__project_id=project_id).values_list("id", flat=True)[:CHUNK_SIZE]):
+            _delete_chunk(Task, "task", ids, project_id)
+            deletion.tasks_deleted += len(ids)
+            ProjectDeletion.objects.filter(pk=project_id).update(tasks_deleted=deletion.tasks_deleted)
+
+        while ids := list(Module.objects.filter(project_id=project_id).values_list("id", flat=True)[:CHUNK_SIZE]):
+            _delete_chunk(Module, "module", ids, project_id)
+            deletion.modules_deleted += len(ids)
+            ProjectDeletion.objects.filter(pk=project_id).update(modules_deleted=deletion.modules_deleted)
+
+        _delete_chunk(Project, "project", [project_id], project_id)
+        with transaction.atomic():
+            for model in (TaskStatusChange, ProjectDailySnapshot):
+                model.objects.filter(project_id=project_id)._raw_delete(connection.alias)
+    except Exception as e:
+        logger.exception("Deleting project %s failed", project_id)
+        ProjectDeletion.objects.filter(pk=project_id).update(status="failed", error=str(e), finished_at=timezone.now())
+        return
+    workload.invalidate_all()
+    ProjectDeletion.objects.filter(pk=project_id).update(status="done", finished_at=timezone.now())
+
+
+def pending():
+    """Project ids whose deletion was queued or interrupted."""
+    return list(ProjectDeletion.objects.filter(status__in=["queued", "running"]).values_list("project_id", flat=True))
+
+
+def progress(deletion):
+    done = deletion.tasks_deleted + deletion.modules_deleted
+    total = deletion.tasks_total + deletion.modules_total
+    return {
+        "project_id": deletion.project_id,
+        "project_name": deletion.project_name,
+        "status": deletion.status,
+        "tasks_deleted": deletion.tasks_deleted,
+        "tasks_total": deletion.tasks_total,
+        "modules_deleted": deletion.modules_deleted,
+        "modules_total": deletion.modules_total,
+        "progress": 1.0 if deletion.status == "done" else round(done / total, 4) if total else 0.0,
+        "error": deletion.error,
+        "requested_at": deletion.requested_at,
+        "finished_at": deletion.finished_at,
+    }
@@ -0,0 +1,135 @@
+"""
+Change events for project boards.
+
+Every Project / Module / Task write appends a ChangeEvent (same connection and
+transaction as the write) carrying only the fields that changed; once the
+transaction commits the event is pushed to the project's channel group, where
+ProjectBoardConsumer forwards it to open boards. The event id doubles as the
+resume cursor for clients that reconnect.
+"""
+import json
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+
+from .models import Project, Module, Task, ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+ENTITY_OF_MODEL = {Project: "project", Module: "module", Task: "task"}
+
+# a reconnecting client further behind than this is told to reload instead
+MAX_REPLAY = 1000
+
+
+def group_name(project_id):
+    return f"board_{project_id}"
+
+
+def project_id_of(instance):
+    """Project a Project / Module / Task belongs to; cached on Task instances."""
+    if isinstance(instance, Project):
+        return instance.pk
+    if isinstance(instance, Module):
+        return instance.project_id
+    if getattr(instance, "_project_id_for", None) != instance.module_id:
+        instance._project_id = Module.objects.filter(id=instance.module_id).values_list("project_id", flat=True).first()
+        instance._project_id_for = instance.module_id
+    return instance._project_id
+
+
+def public_fields(model, values):
+    """attname -> field name (module_id -> module) and JSON-safe values."""
+    names = {f.attname: f.name for f in model._meta.concrete_fields}
+    return json.loads(json.dumps({names.get(k, k): v for k, v in values.items()}, cls=DjangoJSONEncoder))
+
+
+def as_message(event):
+    return {
+        "seq": event.id,
+        "project": event.project_id,
+        "entity": event.entity,
+        "id": event.entity_id,
+        "op": event.op,
+        "fields": event.fields,
+    }
+
+
+def broadcast(events):
+    """Push committed events to their project groups, one group_send per project."""
+    by_project = {}
+    for event in events:
+        if event.project_id is not None:
+            by_project.setdefault(event.project_id, []).append(as_message(event))
+    if not by_project:
+        return
+    try:
+        channel_layer = get_channel_layer()
+        for project_id, messages in by_project.items():
+            async_to_sync(channel_layer.group_send)(group_name(project_id), {"type": "board.events", "events": messages})
+    except Exception as e:
+        # the write already committed; boards catch up through the resume cursor
+        logger.warning("Could not broadcast %d board event(s): %s", len(events), e)
+
+
+def record(events):
+    """Insert unsaved ChangeEvents and broadcast them after commit."""
+    if not events:
+        return []
+    events = ChangeEvent.objects.bulk_create(events)
+    transaction.on_commit(lambda: broadcast(events))
+    return events
+
+
+def instance_saved(instance, created):
+    changed = instance.changed_values()
+    if not changed:
+        return
+    record([ChangeEvent(
+        project_id=project_id_of(instance),
+        entity=ENTITY_OF_MODEL[type(instance)],
+        entity_id=instance.pk,
+        op="created" if created else "updated",
+        fields=public_fields(type(instance), changed),
+    )])
+
+
+def instance_deleted(instance):
+    record([ChangeEvent(
+        project_id=project_id_of(instance),
+        entity=ENTITY_OF_MODEL[type(instance)],
+        entity_id=instance.pk,
+        op="deleted",
+    )])
+
+
+def rows_written(model, pks, created=False):
+    """Events for bulk writes: the current values of every field, read back in one query per chunk."""
+    pks = list(pks)
+    attnames = [f.attname for f in model._meta.concrete_fields if f.attname != "version"]
+    project_path = {Project: "id", Module: "project_id", Task: "module__project_id"}[model]
+    events = []
+    for i in range(0, len(pks), 500):
+        for row in model.objects.filter(pk__in=pks[i:i + 500]).values(*attnames, _project=F(project_path)):
+            project_id = row.pop("_project")
+            events.append(ChangeEvent(
+                project_id=project_id,
+                entity=ENTITY_OF_MODEL[model],
+                entity_id=row["id"],
+                op="created" if created else "updated",
+                fields=public_fields(model, row),
+            ))
+    return record(events)
+
+
+def missed_events(project_id, after, limit=MAX_REPLAY):
+    """
+    (messages, complete) for a reconnecting client. complete is False when more than
+    `limit` events were missed and the client should reload the board instead.
+    """
+    events = list(ChangeEvent.objects.filter(project_id=project_id, id__gt=after).order_by("id")[:limit + 1])
+    return [as_message(e) for e in events[:limit]], len(events) <= limit
@@ -0,0 +1,184 @@
+"""
+Streaming CSV import of tasks.
+
+The file is read row by row (never loaded whole), module / project / user names are
+resolved through dictionaries built with one query each before the first row, and
+tasks are inserted with bulk_create in fixed-size batches, one transaction per
+batch. Progress is reported after every batch.
+
+Columns (header row required):
+    title, module_name, start_date                      required
+    project_name                                        disambiguates module_name
+    module_id                                           instead of module_name
+    description, end_date, priority, status, assigned_to (username)
+"""
+import csv
+import time
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import Module, Task
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 1000
+# only the first errors are kept in the summary, the rest are just counted
+MAX_REPORTED_ERRORS = 100
+
+PRIORITIES = {p for p, _ in Task.priority_choices}
+STATUSES = {s for s, _ in Task.status_choices}
+TITLE_MAX = Task._meta.get_field("title").max_length
+
+AMBIGUOUS = object()
+
+
+class NameResolver:
+    """Module and user lookups for the whole import, loaded with one query each."""
+
+    def __init__(self):
+        self.by_project_and_name = {}
+        self.by_name = {}
+        self.module_ids = set()
+        # modules of a project being deleted can't receive tasks
+        modules = Module.objects.filter(project__deleting=False).values_list("id", "name", "project__name")
+        for module_id, name, project_name in modules.iterator():
+            self.module_ids.add(module_id)
+            self.by_project_and_name[(project_name, name)] = module_id
+            self.by_name[name] = AMBIGUOUS if name in self.by_name else module_id
+        self.users = dict(User.objects.values_list("username", "id"))
+
+    def module(self, row):
+        if row.get("module_id"):
+            try:
+                module_id = int(row["module_id"])
+            except ValueError:
+                raise ValueError(f"module_id '{row['module_id']}' is not a number")
+            if module_id not in self.module_ids:
+                raise ValueError(f"Module {module_id} does not exist")
+            return module_id
+
+        name = (row.get("module_name") or "").strip()
+        if not name:
+            raise ValueError("module_name is required")
+        project_name = (row.get("project_name") or "").strip()
+        if project_name:
+            module_id = self.by_project_and_name.get((project_name, name))
+            if module_id is None:
+                raise ValueError(f"Module '{name}' not found in project '{project_name}'")
+            return module_id
+        module_id = self.by_name.get(name)
+        if module_id is None:
+            raise ValueError(f"Module '{name}' not found")
+        if module_id is AMBIGUOUS:
+            raise ValueError(f"Module name '{name}' exists in several projects, add project_name")
+        return module_id
+
+    def user(self, username):
+        username = (username or "").strip()
+        if not username:
+            return None
+        if username not in self.users:
+            raise ValueError(f"User '{username}' not found")
+        return self.users[username]
+
+
+def _date(value, field, required=False):
+    value = (value or "").strip()
+    if not value:
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{field} '{value}' is not a YYYY-MM-DD date")
+
+
+def build_task(row, resolver):
+    title = (row.get("title") or "").strip()
+    if not title:
+        raise ValueError("title is required")
+    if len(title) > TITLE_MAX:
+        raise ValueError(f"title is longer than {TITLE_MAX} characters")
+    priority = (row.get("priority") or "medium").strip().lower()
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority '{priority}' is not one of {sorted(PRIORITIES)}")
+    task_status = (row.get("status") or "todo").strip().lower()
+    if task_status not in STATUSES:
+        raise ValueError(f"status '{task_status}' is not one of {sorted(STATUSES)}")
+
+    return Task(
+        module_id=resolver.module(row),
+        title=title,
+        description=(row.get("description") or "").strip() or None,
+        start_date=_date(row.get("start_date"), "start_date", required=True),
+        end_date=_date(row.get("end_date"), "end_date"),
+        priority=priority,
+        status=task_status,
+        assigned_to_id=resolver.user(row.get("assigned_to")),
+    )
+
+
+def iter_import(text_stream, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Import tasks from an open text stream, yielding a progress summary after every
+    batch (the last one has done=True). Rows that fail validation are skipped and
+    reported; valid rows are written in batches. A file that stops being readable
+    CSV ends the import: the rows before it are kept and the last summary has
+    "error" and "line".
+    """
+    started = time.monotonic()
+    resolver = NameResolver()
+    summary = {"rows": 0, "imported": 0, "failed": 0, "errors": [], "elapsed": 0.0, "done": False}
+
+    def flush(batch):
+        if batch:
+            with transaction.atomic():
+                Task.objects.bulk_create(batch)
+            summary["imported"] += len(batch)
+        summary["elapsed"] = round(time.monotonic() - started, 3)
+        if summary["done"]:
+            return summary
+        # intermediate snapshots leave the error list for the final summary
+        return {k: v for k, v in summary.items() if k != "errors"}
+
+    batch = []
+    reader = csv.DictReader(text_stream)
+    # last line of the last record read, for pointing at the one that can't be
+    last_line = 0
+    try:
+        reader.fieldnames  # reads the header
+        last_line = reader.line_num
+        for row in reader:
+            last_line = reader.line_num
+            summary["rows"] += 1
+            try:
+                batch.append(build_task(row, resolver))
+            except ValueError as e:
+                summary["failed"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append({"line": reader.line_num, "error": str(e)})
+                continue
+            if len(batch) >= batch_size:
+                yield flush(batch)
+                batch = []
+    except csv.Error as e:
+        # e.g. an unterminated quote running into the field size limit
+        summary.update(error=f"Malformed CSV: {e}", line=last_line + 1)
+    except UnicodeDecodeError:
+        # decoding runs ahead of the parser, so the bad bytes are at or after this line
+        summary.update(error="The file is not UTF-8 encoded", line=last_line + 1)
+
+    summary["done"] = True
+    yield flush(batch)
+
+
+def import_tasks_csv(text_stream, batch_size=DEFAULT_BATCH_SIZE, on_progress=None):
+    """Runs the whole import; on_progress(summary) is called after every batch. Returns the final summary."""
+    summary = None
+    for summary in iter_import(text_stream, batch_size):
+        if on_progress:
+            on_progress(summary)
+    return summary
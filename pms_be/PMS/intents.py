@@ -0,0 +1,140 @@
+"""
+Rule-based parser for create commands, tried before the LLM (see AIChatView).
+
+    create project Website Relaunch starting 2026-11-01 due 2026-12-15
+    create module "Auth" in project Website Relaunch from tomorrow
+    create task Fix login in module Auth starting 2026-11-01 priority high
+
+Trailing clauses (dates, priority, status, quoted description) are peeled off the
+end, then the head must match one of the command patterns exactly. Names may be
+quoted or introduced by "named" / "called"; unquoted ones split on the last
+" in module " / " in project ", and may not start with a preposition or a word
+like "list" or "plan" ("make a task list for module Auth" is a request, not a
+task called "list"). A project, having no module/project clause to anchor it,
+needs a quoted name or a date clause. Anything the grammar does not fully account
+for returns None and goes to the model, so a parse is never a guess. The result
+has the shape of the model's JSON reply.
+"""
+import re
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from .models import Task
+
+PRIORITIES = [p for p, _ in Task.priority_choices]
+STATUSES = [s for s, _ in Task.status_choices]
+STATUS_WORDS = {**{s: s for s in STATUSES}, "to do": "todo", "in progress": "in_progress", "done": "completed"}
+
+DATE = r"(\d{4}-\d{2}-\d{2}|today|tomorrow)"
+CLAUSES = [
+    ("start_date", re.compile(rf"\s+(?:starting|starts|start|beginning|from)(?:\s+on)?\s+{DATE}$", re.I)),
+    ("end_date", re.compile(rf"\s+(?:ending|ends|end|due|until|till|by)(?:\s+on)?\s+{DATE}$", re.I)),
+    ("priority", re.compile(rf"\s+(?:with\s+)?(?:priority\s+({'|'.join(PRIORITIES)})|({'|'.join(PRIORITIES)})\s+priority)$", re.I)),
+    ("status", re.compile(rf"\s+(?:with\s+)?status\s+({'|'.join(sorted(STATUS_WORDS, key=len, reverse=True))})$", re.I)),
+    ("description", re.compile(r"\s+(?:with\s+)?(?:description|described as)\s+\"([^\"]*)\"$", re.I)),
+]
+
+VERB = r"(?:please\s+)?(?:create|add|make|new)(?:\s+(?:a|an))?(?:\s+new)?"
+NAME = r"(?:(?:named|called|titled)\s+)?(?:\"([^\"]+)\"|'([^']+)'|(.+))"
+COMMANDS = {
+    "create_task": re.compile(rf"^{VERB}\s+task\s+{NAME}\s+(?:in|for|under|to)\s+(?:the\s+)?module\s+{NAME}$", re.I),
+    "create_module": re.compile(rf"^{VERB}\s+module\s+{NAME}\s+(?:in|for|under|to)\s+(?:the\s+)?project\s+{NAME}$", re.I),
+    "create_project": re.compile(rf"^{VERB}\s+project\s+{NAME}$", re.I),
+}
+# an unquoted name starting with one of these is part of a sentence, not a name
+NOT_A_NAME = {
+    "about", "at", "by", "for", "from", "in", "into", "of", "on", "to", "under", "with",
+    "me", "my", "our", "us", "your", "it", "this", "that", "some", "please",
+    "called", "named", "titled", "list", "lists", "plan", "plans", "management", "tips", "ideas", "template",
+}
+# which names each command captures, in order
+NAME_FIELDS = {
+    "create_task": ["title", "module_name"],
+    "create_module": ["name", "project_name"],
+    "create_project": ["name"],
+}
+
+
+def _date(value, today):
+    value = value.lower()
+    if value == "today":
+        return today
+    if value == "tomorrow":
+        return today + timedelta(days=1)
+    return date.fromisoformat(value)
+
+
+def _names(match, count):
+    """
+    Each NAME group is (double quoted, single quoted, bare); take whichever matched.
+    Returns (names, whether the first one was quoted), or None if a bare name does
+    not look like one.
+    """
+    groups = match.groups()
+    names = []
+    for i in range(count):
+        quoted = groups[i * 3] or groups[i * 3 + 1]
+        value = (quoted or groups[i * 3 + 2] or "").strip()
+        if not value:
+            return None
+        if not quoted:
+            words = value.lower().split()
+            # a bare name ending in a quote means a clause was mistyped
+            if '"' in value or words[0] in NOT_A_NAME or words[-1] == "please":
+                return None
+        names.append(value)
+    return names, bool(groups[0] or groups[1])
+
+
+def parse(message, today=None):
+    """{"action", "data"} for an unambiguous create command, otherwise None."""
+    today = today or timezone.localdate()
+    text = re.sub(r"\s+", " ", message).strip().rstrip(".!")
+    data = {}
+    try:
+        progress = True
+        while progress:
+            progress = False
+            for field, pattern in CLAUSES:
+                match = pattern.search(text)
+                if match is None:
+                    continue
+                if field in data:
+                    # the same clause twice is ambiguous
+                    return None
+                value = next(g for g in match.groups() if g is not None)
+                if field in ("start_date", "end_date"):
+                    value = _date(value, today)
+                elif field == "status":
+                    value = STATUS_WORDS[value.lower()]
+                elif field == "priority":
+                    value = value.lower()
+                data[field] = value
+                text = text[:match.start()]
+                progress = True
+    except ValueError:
+        # e.g. 2026-02-30
+        return None
+
+    for action, pattern in COMMANDS.items():
+        match = pattern.match(text)
+        if match is None:
+            continue
+        parsed = _names(match, len(NAME_FIELDS[action]))
+        if parsed is None:
+            return None
+        names, quoted = parsed
+        if action == "create_project" and not quoted and not ("start_date" in data or "end_date" in data):
+            return None
+        if action != "create_task" and ("priority" in data or "status" in data):
+            return None
+        data.update(zip(NAME_FIELDS[action], names))
+        data.setdefault("start_date", today)
+        if data.get("end_date") and data["end_date"] < data["start_date"]:
+            return None
+        data["start_date"] = data["start_date"].isoformat()
+        if data.get("end_date"):
+            data["end_date"] = data["end_date"].isoformat()
+        return {"action": action, "data": data}
+    return None
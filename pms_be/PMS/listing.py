@@ -0,0 +1,181 @@
+"""
+Filtered, sparse module and task lists.
+
+Query params are turned into filters on indexed columns, `fields=` picks the
+columns that are SELECTed (one .values() query, no model instances or serializer),
+and pages are keyset paginated over the requested ordering. A list call is one
+query whatever the page; its cost and payload follow what the client asked for.
+"""
+from datetime import date
+
+from django.db.models import Q
+
+from .models import Module, Task
+from .pagination import KeysetPaginator
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def _ids(value):
+    values = [v for v in value.split(",") if v]
+    if not values or not all(v.isdigit() for v in values):
+        raise ValueError("expected a comma separated list of ids")
+    return [int(v) for v in values]
+
+
+def _choices(choices):
+    allowed = {c for c, _ in choices}
+
+    def parse(value):
+        values = [v for v in value.split(",") if v]
+        if not values or not set(values) <= allowed:
+            raise ValueError(f"expected a comma separated list of {', '.join(sorted(allowed))}")
+        return values
+    return parse
+
+
+class ListSpec:
+    def __init__(self, model, fields, filters, orderings, default_ordering, base=None):
+        self.model = model
+        # output name -> column (attname), in response order
+        self.fields = fields
+        # query param -> (lookup, parser)
+        self.filters = filters
+        # ordering param -> columns; each ends with id so keyset pages are stable
+        self.orderings = orderings
+        self.default_ordering = default_ordering
+        self.base = base or Q()
+
+    def queryset(self, params):
+        queryset = self.model.objects.filter(self.base)
+        for param, (lookup, parse) in self.filters.items():
+            value = params.get(param)
+            if not value:
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: parse(value)})
+            except ValueError as e:
+                raise InvalidQuery(f"{param}: {e}")
+        return queryset
+
+    def selected(self, params):
+        """Requested output names (all by default)."""
+        raw = params.get("fields")
+        if not raw:
+            return [*self.fields, *self.computed]
+        names = [n.strip() for n in raw.split(",") if n.strip()]
+        unknown = [n for n in names if n not in self.fields and n not in self.computed]
+        if unknown:
+            raise InvalidQuery(f"Unknown fields: {', '.join(unknown)}")
+        return names
+
+    def paginator(self, params):
+        ordering = params.get("ordering") or self.default_ordering
+        if ordering not in self.orderings:
+            raise InvalidQuery(f"ordering must be one of {', '.join(self.orderings)}")
+        return KeysetPaginator(ordering=self.orderings[ordering])
+
+    # computed output name -> (columns it needs, function of the row)
+    computed = {}
+
+    def rows(self, queryset, names, extra=()):
+        """
+        .values() over just the columns behind `names` (plus `extra`, e.g. the
+        ordering); returns (queryset, function turning a row into the output dict).
+        """
+        columns = {self.fields[n] for n in names if n in self.fields}
+        for n in names:
+            if n in self.computed:
+                columns.update(self.computed[n][0])
+        columns.update(extra)
+
+        def output(row):
+            return {
+                n: self.computed[n][1](row) if n in self.computed else row[self.fields[n]]
+                for n in names
+            }
+        return queryset.values(*columns), output
+
+
+def _progress(row):
+    return round(row["tasks_completed"] / row["tasks_total"], 4) if row["tasks_total"] else 0.0
+
+
+def _date_filters(prefix, column):
+    return {
+        f"{prefix}_from": (f"{column}__gte", date.fromisoformat),
+        f"{prefix}_to": (f"{column}__lte", date.fromisoformat),
+    }
+
+
+def _orderings(*columns):
+    orderings = {"id": ["id"], "-id": ["-id"]}
+    for column in columns:
+        orderings[column] = [column, "id"]
+        orderings[f"-{column}"] = [f"-{column}", "-id"]
+    return orderings
+
+
+class ModuleListSpec(ListSpec):
+    computed = {"progress": (("tasks_completed", "tasks_total"), _progress)}
+
+
+MODULES = ModuleListSpec(
+    Module,
+    fields={
+        "id": "id", "project": "project_id", "name": "name", "description": "description",
+        "start_date": "start_date", "end_date": "end_date", "assigned_to": "assigned_to_id",
+        "tasks_total": "tasks_total", "tasks_todo": "tasks_todo", "tasks_in_progress": "tasks_in_progress",
+        "tasks_review": "tasks_review", "tasks_completed": "tasks_completed", "version": "version",
+    },
+    filters={
+        "project": ("project_id__in", _ids),
+        "assigned_to": ("assigned_to_id__in", _ids),
+        **_date_filters("start", "start_date"),
+        **_date_filters("end", "end_date"),
+    },
+    orderings=_orderings("start_date", "name"),
+    default_ordering="start_date",
+    base=Q(project__deleting=False),
+)
+
+TASKS = ListSpec(
+    Task,
+    fields={
+        "id": "id", "module": "module_id", "title": "title", "description": "description",
+        "assigned_to": "assigned_to_id", "start_date": "start_date", "end_date": "end_date",
+        "priority": "priority", "status": "status", "version": "version",
+    },
+    filters={
+        "project": ("module__project_id__in", _ids),
+        "module": ("module_id__in", _ids),
+        "status": ("status__in", _choices(Task.status_choices)),
+        "priority": ("priority__in", _choices(Task.priority_choices)),
+        "assigned_to": ("assigned_to_id__in", _ids),
+        **_date_filters("start", "start_date"),
+        **_date_filters("end", "end_date"),
+    },
+    orderings=_orderings("start_date", "title"),
+    default_ordering="start_date",
+    base=Q(module__project__deleting=False),
+)
+
+
+def page(spec, request):
+    """{"next_cursor", "results"} for a list request. Raises InvalidQuery / InvalidCursor."""
+    params = request.query_params
+    paginator = spec.paginator(params)
+    names = spec.selected(params)
+    queryset, output = spec.rows(spec.queryset(params), names, extra=paginator.fields)
+    rows, next_cursor = paginator.paginate(queryset, request)
+    return {"page_size": paginator.page_size(request), "next_cursor": next_cursor, "results": [output(r) for r in rows]}
+
+
+def detail(spec, pk, params):
+    """One row as a dict, or None. Raises InvalidQuery."""
+    names = spec.selected(params)
+    queryset, output = spec.rows(spec.model.objects.filter(spec.base, pk=pk), names)
+    row = queryset.first()
+    return None if row is None else output(row)
@@ -0,0 +1,134 @@
+"""
+In-process cache of assistant replies for repeated prompts (greetings, help).
+
+Keyed by the normalized message, the model and the system prompt. Entries expire
+after PMS_LLM_CACHE_TTL seconds and the least recently used ones are evicted once
+there are more than PMS_LLM_CACHE_MAX_ENTRIES or their replies take more than
+PMS_LLM_CACHE_MAX_BYTES. Messages that look like create commands bypass the cache
+both ways, and callers only store plain chat replies, never ones that carry an
+action, so a cached reply can never create anything.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+# "create / add / new ... project / module / task" in any order
+CREATE_WORDS = re.compile(r"\b(create|add|new|make|start|set up|setup)\b", re.IGNORECASE)
+ENTITY_WORDS = re.compile(r"\b(projects?|modules?|tasks?)\b", re.IGNORECASE)
+
+
+def normalize(message):
+    """Case, surrounding whitespace / punctuation and repeated spaces don't matter."""
+    return re.sub(r"\s+", " ", message.lower()).strip(" \t.!?,;:")
+
+
+def may_create(message):
+    return bool(CREATE_WORDS.search(message) and ENTITY_WORDS.search(message))
+
+
+def key(message, model, system=""):
+    raw = "\x1f".join([model, system, normalize(message)])
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+class ReplyCache:
+    """LRU + TTL map of key -> reply with an entry and a byte cap. Thread safe."""
+
+    def __init__(self, ttl, max_entries, max_bytes):
+        self.ttl, self.max_entries, self.max_bytes = ttl, max_entries, max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, reply, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.bypassed = self.evicted = self.expired = 0
+
+    def get(self, cache_key):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._drop(cache_key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, cache_key, reply):
+        size = len(reply.encode()) + len(cache_key)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if cache_key in self._entries:
+                self._drop(cache_key)
+            self._entries[cache_key] = (time.monotonic() + self.ttl, reply, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evicted += 1
+
+    def bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def _drop(self, cache_key):
+        self._bytes -= self._entries.pop(cache_key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "bypassed": self.bypassed,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+
+
+replies = ReplyCache(
+    ttl=getattr(settings, "PMS_LLM_CACHE_TTL", 60 * 60),
+    max_entries=getattr(settings, "PMS_LLM_CACHE_MAX_ENTRIES", 1000),
+    max_bytes=getattr(settings, "PMS_LLM_CACHE_MAX_BYTES", 8 * 1024 * 1024),
+)
+
+
+def lookup(message, model, system=""):
+    """(cache key, cached reply or None). The key is None when the message bypasses the cache."""
+    if may_create(message):
+        replies.bypass()
+        return None, None
+    cache_key = key(message, model, system)
+    return cache_key, replies.get(cache_key)
+
+
+def store(cache_key, reply):
+    if cache_key and reply:
+        replies.put(cache_key, reply)
+
+
+async def remembered(pieces, cache_key):
+    """Pass streamed pieces through, caching the whole reply once it is complete."""
+    reply = []
+    async for piece in pieces:
+        reply.append(piece)
+        yield piece
+    store(cache_key, "".join(reply))
+
+
+async def replay(reply):
+    """A cached reply as a one-piece stream."""
+    yield reply
@@ -0,0 +1,152 @@
+"""
+Shared helpers for the bench_* management commands.
+
+Benchmarks never touch the configured database: they run against a throwaway
+database created the same way the test runner does it (file-backed for SQLite so
+commit costs are realistic) and dropped afterwards. Benchmarks of the AI views
+talk to OllamaStub instead of a real model.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def scratch_database():
+    tmpdir = tempfile.mkdtemp(prefix="pms-bench-")
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    previous_name = test_settings.get("NAME")
+    if connection.vendor == "sqlite":
+        test_settings["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings["NAME"] = previous_name
+
+
+@contextmanager
+def timer(results, label):
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class OllamaStub:
+    """
+    Minimal stand-in for Ollama's /api/chat on a local port, served from its own
+    thread and event loop. Every reply takes `latency` seconds; with "stream": true
+    it is sent as NDJSON chunks, one token every `token_delay` seconds. With
+    `parallel` set, at most that many replies are generated at once and the rest
+    wait, like Ollama itself. /api/embed answers with small made-up vectors. Counts
+    how many requests were in flight at once and how many connections were opened.
+    """
+
+    def __init__(self, latency=0.5, tokens=20, token_delay=0.0, parallel=None):
+        self.latency, self.tokens, self.token_delay, self.parallel = latency, tokens, token_delay, parallel
+        self.in_flight = self.peak_in_flight = self.connections = self.requests = 0
+        self.url = None
+        self._ready = threading.Event()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._serve, name="ollama-stub", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join()
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._main())
+        self._loop.close()
+
+    async def _main(self):
+        self._stop = asyncio.Event()
+        self._generating = asyncio.Semaphore(self.parallel) if self.parallel else None
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=4096)
+        self.url = "http://127.0.0.1:%d" % server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._handlers = set()
+        async with server:
+            await self._stop.wait()
+            # connections kept alive by clients that are gone
+            for handler in self._handlers:
+                handler.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode("latin-1").split("\r\n"):
+                    name, _, value = line.partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                body = json.loads(await reader.readexactly(length) or b"{}")
+                body["path"] = head.split(b" ")[1].decode()
+                self.requests += 1
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                try:
+                    if self._generating is None:
+                        await asyncio.sleep(self.latency)
+                        await self._reply(writer, body)
+                    else:
+                        async with self._generating:
+                            await asyncio.sleep(self.latency)
+                            await self._reply(writer, body)
+                finally:
+                    self.in_flight -= 1
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def _reply(self, writer, body):
+        if body["path"] == "/api/embed":
+            vectors = [[float(len(text) % 7), 1.0, float(sum(map(ord, text)) % 11)] for text in body.get("input", [])]
+            payload = json.dumps({"embeddings": vectors}).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (len(payload), payload))
+            await writer.drain()
+            return
+        words = [f"word{i} " for i in range(self.tokens)]
+        if not body.get("stream", True):
+            # generating takes as long either way, buffered replies just arrive at once
+            await asyncio.sleep(self.token_delay * self.tokens)
+            payload = json.dumps({"message": {"role": "assistant", "content": "".join(words)}, "done": True}).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (len(payload), payload))
+            await writer.drain()
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n")
+        for i, word in enumerate(words + [""]):
+            line = json.dumps({"message": {"role": "assistant", "content": word}, "done": i == len(words)}).encode() + b"\n"
+            writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+            await writer.drain()
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
@@ -0,0 +1,81 @@
+import asyncio
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from PMS import admission, ollama
+from ._bench import OllamaStub, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "A burst of voice and chat calls against an Ollama stub that generates one reply at a "
+        "time: every call sent straight through vs the admission queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=60)
+        parser.add_argument("--interactive-share", type=float, default=0.3, help="Share of voice (interactive) calls.")
+        parser.add_argument("--latency", type=float, default=0.1, help="Seconds the stub takes per reply.")
+        parser.add_argument("--concurrency", type=int, default=2)
+        parser.add_argument("--queue-size", type=int, default=32)
+        parser.add_argument("--queue-timeout", type=float, default=2.0)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        n = options["requests"]
+        priorities = ["interactive" if rng.random() < options["interactive_share"] else "chat" for _ in range(n)]
+
+        runs = {
+            # what the views did before: nothing is shed, Ollama queues everything
+            "unbounded": dict(OLLAMA_CONCURRENCY=n, OLLAMA_QUEUE_SIZE=n, OLLAMA_QUEUE_TIMEOUT=3600),
+            "admission": dict(OLLAMA_CONCURRENCY=options["concurrency"], OLLAMA_QUEUE_SIZE=options["queue_size"],
+                              OLLAMA_QUEUE_TIMEOUT=options["queue_timeout"]),
+        }
+        self.stdout.write(f"{n} calls at once ({priorities.count('interactive')} interactive), "
+                          f"stub latency {options['latency'] * 1000:.0f} ms, one reply at a time")
+        for label, limits in runs.items():
+            original, admission.controller = admission.controller, admission.AdmissionController()
+            try:
+                with OllamaStub(latency=options["latency"], parallel=1) as stub, \
+                        override_settings(OLLAMA_URL=stub.url, **limits):
+                    started = time.perf_counter()
+                    results = asyncio.run(self.run(priorities))
+                    total = time.perf_counter() - started
+                    stats = admission.controller.stats()
+                    peak = stub.peak_in_flight
+            finally:
+                admission.controller = original
+
+            outcomes = [outcome for _, outcome, _ in results]
+            self.stdout.write(f"{label:>10}: {total:5.2f} s, served {outcomes.count(200)}, 429 {outcomes.count(429)}, "
+                              f"503 {outcomes.count(503)}, peak at Ollama {peak}, peak queue {stats['peak_queue_depth']}")
+            for priority in ("interactive", "chat"):
+                served = [seconds for p, outcome, seconds in results if p == priority and outcome == 200]
+                shed = [seconds for p, outcome, seconds in results if p == priority and outcome != 200]
+                line = f"{'':>12}{priority:>11}: served p50 {percentile(served, 50) * 1000:6.0f} ms, " \
+                       f"p95 {percentile(served, 95) * 1000:6.0f} ms"
+                if shed:
+                    line += f", turned away after p50 {percentile(shed, 50) * 1000:.0f} ms"
+                self.stdout.write(line)
+
+    @staticmethod
+    async def run(priorities):
+        messages = [{"role": "user", "content": "hello"}]
+
+        async def call(priority):
+            started = time.perf_counter()
+            try:
+                await ollama.chat(messages, priority=priority)
+                outcome = 200
+            except admission.Rejected as e:
+                outcome = e.status_code
+            return priority, outcome, time.perf_counter() - started
+
+        try:
+            return await asyncio.gather(*(call(priority) for priority in priorities))
+        finally:
+            await ollama.aclose()
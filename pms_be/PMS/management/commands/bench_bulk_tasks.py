@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from PMS import bulk
+from PMS.models import Project, Module
+from PMS.serializers import TaskSerializer
+from ._bench import scratch_database, timer
+
+
+class Command(BaseCommand):
+    help = "Compare task import throughput: one TaskSerializer.save() per row vs the bulk endpoint path."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        timings = {}
+        with scratch_database():
+            project = Project.objects.create(name="bench", start_date=date(2026, 1, 1))
+            module = Module.objects.create(project=project, name="bench", start_date=date(2026, 1, 1))
+            payload = [
+                {"module": module.id, "title": f"Task {i}", "start_date": "2026-01-01", "priority": "medium"}
+                for i in range(rows)
+            ]
+
+            with timer(timings, "single-row"):
+                for item in payload:
+                    serializer = TaskSerializer(data=item)
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save()
+
+            with timer(timings, "bulk"):
+                objs, errors = bulk.create(bulk.TASKS, payload)
+            assert not errors and len(objs) == rows
+
+        for label, seconds in timings.items():
+            self.stdout.write(f"{label:>10}: {rows} rows in {seconds:.3f}s ({rows / seconds:,.0f} rows/s)")
+        self.stdout.write(self.style.SUCCESS(f"bulk speedup: {timings['single-row'] / timings['bulk']:.1f}x"))
@@ -0,0 +1,57 @@
+import time
+import tracemalloc
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from PMS import exports
+from PMS.models import Project, Module, Task
+from ._bench import scratch_database
+
+INSERT_BATCH = 5000
+
+
+class Command(BaseCommand):
+    help = "Export memory: peak Python heap while streaming the task export at growing row counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000, help="Tasks in the largest run.")
+        parser.add_argument("--steps", type=int, default=3, help="Runs at rows/10**(steps-1) .. rows.")
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+        parser.add_argument("--gzip", action="store_true")
+
+    def handle(self, *args, **options):
+        sizes = sorted({max(1, options["rows"] // 10 ** i) for i in range(options["steps"])})
+        # board broadcasts of the inserts stay in process
+        in_memory = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+        with scratch_database(), override_settings(PMS_SEMANTIC_AUTO_UPDATE=False, CHANNEL_LAYERS=in_memory):
+            project = Project.objects.create(name="Bench", start_date=date(2026, 1, 1))
+            modules = [
+                Module.objects.create(project=project, name=f"Module {m}", start_date=date(2026, 1, 1))
+                for m in range(20)
+            ]
+            created = 0
+            for size in sizes:
+                while created < size:
+                    count = min(INSERT_BATCH, size - created)
+                    with transaction.atomic():
+                        Task.objects.bulk_create(
+                            Task(module=modules[(created + i) % len(modules)], title=f"Task {created + i}",
+                                 description="Imported from the old tracker", start_date=date(2026, 1, 1))
+                            for i in range(count)
+                        )
+                    created += count
+                self.run(size, options)
+
+    def run(self, rows, options):
+        tracemalloc.start()
+        started = time.perf_counter()
+        chunks, _, _ = exports.stream_export("tasks", fmt=options["format"], gzip=options["gzip"])
+        sent = sum(len(chunk) for chunk in chunks)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(f"{rows:>9} tasks: {sent / 2 ** 20:7.1f} MiB streamed in {elapsed:5.2f} s, "
+                          f"peak heap {peak / 2 ** 20:5.2f} MiB")
@@ -0,0 +1,64 @@
+import os
+import resource
+import tempfile
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from PMS import imports
+from PMS.models import Project, Module, Task
+from ._bench import scratch_database
+
+
+class Command(BaseCommand):
+    help = "CSV task import: throughput and peak RSS of the batched import vs one ORM save per row."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500_000)
+        parser.add_argument("--modules", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=imports.DEFAULT_BATCH_SIZE)
+        parser.add_argument("--baseline", type=int, default=2000, help="Rows saved one by one for comparison.")
+
+    def handle(self, *args, **options):
+        rows, modules = options["rows"], options["modules"]
+        fd, path = tempfile.mkstemp(prefix="pms-import-", suffix=".csv")
+        with os.fdopen(fd, "w", newline="") as f:
+            f.write("title,project_name,module_name,start_date,end_date,priority,description\n")
+            for i in range(rows):
+                f.write(f"Task {i},Project {i % 10},Module {i % modules},2026-02-01,2026-03-01,medium,"
+                        f"Migrated from the old tracker\n")
+        # board broadcasts of the inserts stay in process
+        in_memory = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+        try:
+            with scratch_database(), override_settings(PMS_SEMANTIC_AUTO_UPDATE=False, CHANNEL_LAYERS=in_memory):
+                projects = [Project.objects.create(name=f"Project {p}", start_date=date(2026, 1, 1)) for p in range(10)]
+                for m in range(modules):
+                    Module.objects.create(project=projects[m % 10], name=f"Module {m}", start_date=date(2026, 1, 1))
+                self.baseline(options["baseline"], modules)
+                self.batched(path, rows, options["batch_size"])
+        finally:
+            os.remove(path)
+
+    def baseline(self, rows, modules):
+        if not rows:
+            return
+        started = time.perf_counter()
+        for i in range(rows):
+            module = Module.objects.get(name=f"Module {i % modules}", project__name=f"Project {i % 10}")
+            Task.objects.create(module=module, title=f"Row {i}", start_date=date(2026, 2, 1))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"one save per row: {rows} rows in {elapsed:.2f} s ({rows / elapsed:,.0f} rows/s)")
+
+    def batched(self, path, rows, batch_size):
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        with open(path, encoding="utf-8", newline="") as stream:
+            summary = imports.import_tasks_csv(stream, batch_size)
+        elapsed = time.perf_counter() - started
+        # ru_maxrss is in KiB on Linux
+        rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.stdout.write(f"batched import:   {summary['imported']} of {rows} rows in {elapsed:.2f} s "
+                          f"({summary['imported'] / elapsed:,.0f} rows/s, batches of {batch_size})")
+        self.stdout.write(f"  peak RSS {rss_peak / 1024:.0f} MiB ({(rss_peak - rss_before) / 1024:+.0f} MiB during the import)")
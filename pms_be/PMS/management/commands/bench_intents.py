@@ -0,0 +1,67 @@
+import asyncio
+import json
+import random
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncRequestFactory, override_settings
+
+from PMS import intents, llm_cache, metrics, ollama
+from PMS.models import Project, Module
+from PMS.views import AIChatView
+from ._bench import OllamaStub, scratch_database
+
+
+class Command(BaseCommand):
+    help = "AI chat latency for create commands parsed by the intent fast path vs free-form text sent to a stub LLM."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--structured-share", type=float, default=0.5, help="Share of structured create commands.")
+        parser.add_argument("--latency", type=float, default=0.3, help="Seconds the stub takes per reply.")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        messages = [
+            f"create task Task {i} in module Auth starting 2026-11-01 priority high"
+            if rng.random() < options["structured_share"]
+            else f"what should I work on next? ({i})"
+            for i in range(options["requests"])
+        ]
+        # board broadcasts of the created tasks stay in process
+        in_memory = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+        with scratch_database(), OllamaStub(latency=options["latency"]) as stub, \
+                override_settings(OLLAMA_URL=stub.url, CHANNEL_LAYERS=in_memory):
+            project = Project.objects.create(name="Bench", start_date=date(2026, 1, 1))
+            Module.objects.create(project=project, name="Auth", start_date=date(2026, 1, 1))
+            metrics.ai_chat.reset()
+            llm_cache.replies.clear()
+            started = time.perf_counter()
+            asyncio.run(self.run(messages))
+            total = time.perf_counter() - started
+            llm_requests = stub.requests
+
+        started = time.perf_counter()
+        for message in messages:
+            intents.parse(message)
+        parse_us = (time.perf_counter() - started) / len(messages) * 1e6
+
+        stats = metrics.ai_chat.stats()
+        self.stdout.write(f"{len(messages)} requests in {total:.2f} s, stub latency {options['latency'] * 1000:.0f} ms, "
+                          f"{llm_requests} reached the LLM")
+        for path, row in sorted(stats.items()):
+            self.stdout.write(f"{path:>10}: {row['count']:5d} ({row['share']:.0%}), p50 {row['p50_ms']:.2f} ms, "
+                              f"p95 {row['p95_ms']:.2f} ms")
+        self.stdout.write(f"intent parser alone: {parse_us:.1f} µs per message")
+
+    @staticmethod
+    async def run(messages):
+        factory = AsyncRequestFactory()
+        view = AIChatView.as_view()
+        try:
+            for message in messages:
+                await view(factory.post("/api/ai-chat/", json.dumps({"message": message}), content_type="application/json"))
+        finally:
+            await ollama.aclose()
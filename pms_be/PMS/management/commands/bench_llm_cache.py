@@ -0,0 +1,70 @@
+import asyncio
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncRequestFactory, override_settings
+
+from PMS import llm_cache, ollama
+from PMS.views import voicechat
+from ._bench import OllamaStub, percentile
+
+
+class Command(BaseCommand):
+    help = "Latency of voicechat against a local Ollama stub with and without the reply cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=300)
+        parser.add_argument("--distinct", type=int, default=20, help="Distinct chat prompts (picked with a Zipf-like skew).")
+        parser.add_argument("--create-share", type=float, default=0.1, help="Share of create commands (never cached).")
+        parser.add_argument("--latency", type=float, default=0.3, help="Seconds the stub takes per reply.")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        prompts = [f"Hi, how do I use feature {i}?" for i in range(options["distinct"])]
+        weights = [1 / (i + 1) for i in range(len(prompts))]
+        messages = [
+            f"create task T{i} in module Auth" if rng.random() < options["create_share"]
+            else rng.choices(prompts, weights)[0]
+            for i in range(options["requests"])
+        ]
+
+        results = {}
+        with OllamaStub(latency=options["latency"]) as stub, override_settings(OLLAMA_URL=stub.url):
+            for label, cache in (
+                ("no cache", llm_cache.ReplyCache(ttl=0, max_entries=0, max_bytes=0)),
+                ("reply cache", llm_cache.ReplyCache(ttl=3600, max_entries=1000, max_bytes=8 * 1024 * 1024)),
+            ):
+                original, llm_cache.replies = llm_cache.replies, cache
+                try:
+                    started = time.perf_counter()
+                    hits, misses = asyncio.run(self.run(messages))
+                    results[label] = (time.perf_counter() - started, hits, misses, cache.stats())
+                finally:
+                    llm_cache.replies = original
+
+        self.stdout.write(f"{len(messages)} requests, {options['distinct']} distinct prompts, "
+                          f"stub latency {options['latency'] * 1000:.0f} ms")
+        for label, (total, hits, misses, stats) in results.items():
+            line = f"{label:>12}: {total:6.2f} s total, hit rate {stats['hit_rate']:.0%}, bypassed {stats['bypassed']}"
+            if misses:
+                line += f", miss p50 {percentile(misses, 50) * 1000:.1f} ms"
+            if hits:
+                line += f", hit p50 {percentile(hits, 50) * 1000:.2f} ms"
+            self.stdout.write(line)
+
+    @staticmethod
+    async def run(messages):
+        factory = AsyncRequestFactory()
+        hits, misses = [], []
+        try:
+            for message in messages:
+                request = factory.post("/api/ai-voicechat/", json.dumps({"message": message}), content_type="application/json")
+                started = time.perf_counter()
+                response = await voicechat(request)
+                (hits if response.get("X-Cache") == "HIT" else misses).append(time.perf_counter() - started)
+        finally:
+            await ollama.aclose()
+        return hits, misses
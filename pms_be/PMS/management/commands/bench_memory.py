@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from PMS import memory
+from PMS.models import ConversationTurn
+from ._bench import percentile, scratch_database
+
+
+class Command(BaseCommand):
+    help = "Conversation memory: cost of remembering an exchange (write-through vs batched) and of building a prompt."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--exchanges", type=int, default=20, help="Exchanges per user, sent concurrently across users.")
+        parser.add_argument("--flush-delay", type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            users = get_user_model().objects
+            user_ids = [users.create(username=f"user{i}", email=f"user{i}@example.com").id for i in range(options["users"])]
+            for label, delay in (("write-through", 0), ("batched", options["flush_delay"])):
+                ConversationTurn.objects.all().delete()
+                flushes = memory.writer.flushes
+                with override_settings(PMS_AI_MEMORY_FLUSH_DELAY=delay):
+                    started = time.perf_counter()
+                    samples = asyncio.run(self.run(user_ids, options["exchanges"]))
+                    total = time.perf_counter() - started
+                    memory.writer.flush()
+                # write-through: one INSERT per exchange (plus the trim)
+                inserts = memory.writer.flushes - flushes if delay else len(samples)
+                stored = ConversationTurn.objects.count()
+                expected = len(user_ids) * min(options["exchanges"] * 2, ConversationTurn.objects.window())
+                self.stdout.write(f"{label:>14}: {total:5.2f} s for {len(samples)} exchanges, remember p50 "
+                                  f"{percentile(samples, 50) * 1000:.2f} ms, p95 {percentile(samples, 95) * 1000:.2f} ms, "
+                                  f"{inserts} INSERTs, "
+                                  f"{stored}/{expected} turns kept")
+
+            reads = []
+            for user_id in user_ids:
+                started = time.perf_counter()
+                asyncio.run(memory.context(user_id))
+                reads.append(time.perf_counter() - started)
+            with CaptureQueriesContext(connection) as queries:
+                memory._context(user_ids[0], memory.token_budget())
+            self.stdout.write(f"prompt context ({ConversationTurn.objects.window()} turns): p50 "
+                              f"{percentile(reads, 50) * 1000:.2f} ms, {len(queries)} query")
+
+    @staticmethod
+    async def run(user_ids, exchanges):
+        samples = []
+
+        async def converse(user_id):
+            for i in range(exchanges):
+                started = time.perf_counter()
+                await memory.remember(user_id, f"question {i}", f"answer {i} " * 20)
+                samples.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(converse(user_id) for user_id in user_ids))
+        return samples
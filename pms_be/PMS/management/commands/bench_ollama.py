@@ -0,0 +1,106 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from PMS import ollama
+from ._bench import OllamaStub, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Requests in flight against a local Ollama stub: blocking calls from a fixed pool "
+        "of sync workers vs the shared async client; time to first token, buffered vs streamed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--latency", type=float, default=0.5, help="Seconds the stub takes per reply.")
+        parser.add_argument("--workers", type=int, default=4, help="Sync workers for the blocking run.")
+        parser.add_argument("--max-connections", type=int, default=100, help="Async client pool size.")
+        parser.add_argument("--tokens", type=int, default=40, help="Tokens per reply in the time to first token run.")
+        parser.add_argument("--token-delay", type=float, default=0.05, help="Seconds between generated tokens.")
+        parser.add_argument("--samples", type=int, default=10, help="Replies timed per mode for time to first token.")
+
+    def handle(self, *args, **options):
+        n = options["requests"]
+        messages = [{"role": "user", "content": "hello"}]
+
+        with OllamaStub(latency=options["latency"]) as stub:
+            payload = {"model": "stub", "messages": messages, "stream": False}
+
+            def blocking_call(_):
+                started = time.perf_counter()
+                # what the views did before: a new connection per call, a worker blocked throughout
+                requests.post(stub.url + ollama.CHAT_PATH, json=payload).raise_for_status()
+                return time.perf_counter() - started
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+                blocking = list(pool.map(blocking_call, range(n)))
+            blocking_total = time.perf_counter() - started
+            blocking_peak, blocking_connections = stub.peak_in_flight, stub.connections
+
+        with OllamaStub(latency=options["latency"]) as stub:
+            async def async_call():
+                started = time.perf_counter()
+                await ollama.chat(messages)
+                return time.perf_counter() - started
+
+            async def run_all():
+                try:
+                    return await asyncio.gather(*(async_call() for _ in range(n)))
+                finally:
+                    await ollama.aclose()
+
+            # the whole burst is admitted at once, this measures the client alone
+            with override_settings(OLLAMA_URL=stub.url, OLLAMA_MAX_CONNECTIONS=options["max_connections"],
+                                   OLLAMA_CONCURRENCY=n, OLLAMA_QUEUE_SIZE=n):
+                started = time.perf_counter()
+                pooled = asyncio.run(run_all())
+                pooled_total = time.perf_counter() - started
+            pooled_peak, pooled_connections = stub.peak_in_flight, stub.connections
+
+        with OllamaStub(latency=0, tokens=options["tokens"], token_delay=options["token_delay"]) as stub:
+            async def ttft(stream):
+                samples = []
+                for _ in range(options["samples"]):
+                    started = time.perf_counter()
+                    if stream:
+                        pieces = ollama.stream_chat(messages)
+                        await anext(pieces)
+                        samples.append(time.perf_counter() - started)
+                        async for _ in pieces:
+                            pass
+                    else:
+                        await ollama.chat(messages)
+                        samples.append(time.perf_counter() - started)
+                return samples
+
+            async def run_ttft():
+                try:
+                    return await ttft(False), await ttft(True)
+                finally:
+                    await ollama.aclose()
+
+            with override_settings(OLLAMA_URL=stub.url):
+                buffered_first, streamed_first = asyncio.run(run_ttft())
+
+        self.stdout.write(f"{n} requests, stub latency {options['latency'] * 1000:.0f} ms")
+        for label, samples, total, peak, connections in (
+            (f"blocking ({options['workers']} workers)", blocking, blocking_total, blocking_peak, blocking_connections),
+            ("async (shared client)", pooled, pooled_total, pooled_peak, pooled_connections),
+        ):
+            self.stdout.write(
+                f"{label:>26}: {total:6.2f} s total, {n / total:7.1f} req/s, peak in flight {peak:4d}, "
+                f"{connections:4d} connections, p50 {percentile(samples, 50) * 1000:.0f} ms, "
+                f"p99 {percentile(samples, 99) * 1000:.0f} ms"
+            )
+        self.stdout.write(
+            f"time to first token ({options['tokens']} tokens, {options['token_delay'] * 1000:.0f} ms apart): "
+            f"buffered p50 {percentile(buffered_first, 50) * 1000:.0f} ms, "
+            f"streamed p50 {percentile(streamed_first, 50) * 1000:.1f} ms"
+        )
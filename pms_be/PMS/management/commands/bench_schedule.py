@@ -0,0 +1,105 @@
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from PMS import scheduling
+from PMS.models import Project, Module, Task, TaskDependency, TaskSchedule
+from ._bench import scratch_database, timer
+
+
+class Command(BaseCommand):
+    help = "Time the critical path engine: full schedule of a large project vs incremental edits."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=100_000)
+        parser.add_argument("--links-per-task", type=float, default=1.5)
+        parser.add_argument("--edits", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        n = options["tasks"]
+        timings = {}
+        with scratch_database():
+            project = self.build(rng, n, options["links_per_task"])
+            links = TaskDependency.objects.count()
+
+            with timer(timings, "load graph"):
+                graph = scheduling.load_project(project.id)
+            with timer(timings, "compute (in memory)"):
+                scheduling.compute(graph)
+            with timer(timings, "full schedule (load+compute+store)"):
+                scheduling.schedule_project(project.id)
+
+            edit_times, written = self.edit(rng, project, options["edits"])
+            snapshot = self.snapshot(project)
+            scheduling.schedule_project(project.id)
+            consistent = snapshot == self.snapshot(project)
+
+        self.stdout.write(f"{n:,} tasks, {links:,} links")
+        for label, seconds in timings.items():
+            self.stdout.write(f"{label:>36}: {seconds * 1000:8.1f} ms")
+        edit_times.sort()
+        self.stdout.write(
+            f"{'incremental edit (save+reschedule)':>36}: p50 {edit_times[len(edit_times) // 2] * 1000:.1f} ms, "
+            f"max {edit_times[-1] * 1000:.1f} ms, avg {sum(written) / len(written):,.0f} rows rewritten"
+        )
+        if consistent:
+            self.stdout.write(self.style.SUCCESS("incremental results match a full recompute"))
+        else:
+            self.stdout.write(self.style.ERROR("incremental results differ from a full recompute"))
+
+    def build(self, rng, n, links_per_task):
+        start = date(2026, 1, 1)
+        with transaction.atomic():
+            project = Project.objects.create(name="bench", start_date=start)
+            modules = Module.objects.bulk_create([
+                Module(project=project, name=f"M{m}", start_date=start) for m in range(max(1, n // 1000))
+            ])
+            tasks = Task.objects.bulk_create([
+                Task(
+                    module=modules[i % len(modules)], title=f"Task {i}",
+                    start_date=start + timedelta(days=i // 500),
+                    end_date=start + timedelta(days=i // 500 + rng.randint(0, 9)),
+                )
+                for i in range(n)
+            ], batch_size=2000)
+            ids = [t.id for t in tasks]
+            links = set()
+            # every link points forward in creation order, so the graph is acyclic
+            for i in range(1, n):
+                for _ in range(int(links_per_task) + (rng.random() < links_per_task % 1)):
+                    links.add((ids[rng.randint(max(0, i - 200), i - 1)], ids[i]))
+            TaskDependency.objects.bulk_create(
+                [TaskDependency(predecessor_id=p, successor_id=s, lag_days=rng.randint(0, 2)) for p, s in links],
+                batch_size=2000,
+            )
+        return project
+
+    def edit(self, rng, project, count):
+        """Stretch tasks that have slack by one day, one save (and reschedule) each."""
+        candidates = list(TaskSchedule.objects.filter(project_id=project.id, slack__gte=2).values_list("task_id", flat=True))
+        times, written = [], []
+        original = scheduling._save
+
+        def counting_save(project_id, results):
+            written.append(len(results))
+            return original(project_id, results)
+
+        scheduling._save = counting_save
+        try:
+            for task_id in rng.sample(candidates, min(count, len(candidates))):
+                task = Task.objects.get(id=task_id)
+                task.end_date = (task.end_date or task.start_date) + timedelta(days=1)
+                with timer(timings := {}, "edit"):
+                    task.save()
+                times.append(timings["edit"])
+        finally:
+            scheduling._save = original
+        return times, written or [0]
+
+    @staticmethod
+    def snapshot(project):
+        return set(TaskSchedule.objects.filter(project_id=project.id).values_list("task_id", *scheduling.SCHEDULE_FIELDS))
@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from PMS import search
+from ._bench import scratch_database, percentile
+
+DOMAIN_WORDS = (
+    "login payment invoice report dashboard export import user role access api cache search "
+    "mobile android ios backend frontend database migration deploy release sprint review bug "
+    "crash timeout latency memory queue worker email notification calendar chart filter sort"
+).split()
+SYLLABLES = "ka lo mi ne ru sa te vo zi pa qu re fi da go hu".split()
+
+
+def vocabulary(rng, size=20_000):
+    """
+    Domain words plus synthetic ones with Zipf-Mandelbrot weights. The offset
+    flattens the head the way real text looks once stop words are gone, so the
+    most common word is in a few percent of rows rather than nearly all of them.
+    """
+    words = list(DOMAIN_WORDS)
+    while len(words) < size:
+        words.append("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    cum_weights, total = [], 0.0
+    for rank in range(1, len(words) + 1):
+        total += 1.0 / (rank + 50)
+        cum_weights.append(total)
+    return words, cum_weights
+
+
+class Command(BaseCommand):
+    help = "Measure search latency on a synthetic FTS5 corpus (default 1M rows)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=200)
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            raise CommandError("The search index needs the sqlite3 backend.")
+        rng = random.Random(42)
+        rows = options["rows"]
+        words, cum_weights = vocabulary(rng)
+
+        with scratch_database():
+            search.create_index()
+            # text pools keep corpus generation from dominating the run
+            titles = [" ".join(rng.choices(words, cum_weights=cum_weights, k=5)) for _ in range(50_000)]
+            bodies = [" ".join(rng.choices(words, cum_weights=cum_weights, k=25)) for _ in range(50_000)]
+            insert = f"INSERT INTO {search.TABLE} (rowid, kind, title, body, project_id) VALUES (%s, %s, %s, %s, %s)"
+
+            started = time.perf_counter()
+            with transaction.atomic(), connection.cursor() as cursor:
+                for start in range(1, rows + 1, 10_000):
+                    cursor.executemany(insert, [
+                        (search.rowid("task", i), "task", rng.choice(titles), rng.choice(bodies), i % 500)
+                        for i in range(start, min(start + 10_000, rows + 1))
+                    ])
+                cursor.execute(f"INSERT INTO {search.TABLE} ({search.TABLE}) VALUES ('optimize')")
+            self.stdout.write(f"indexed {rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+            # queries draw from the same distribution as the text
+            pick = lambda k: " ".join(rng.choices(words, cum_weights=cum_weights, k=k))
+            shapes = {
+                "one word": lambda: pick(1),
+                "prefix": lambda: pick(1)[:3],
+                "two words": lambda: pick(2),
+                "two words + project": lambda: pick(2),
+            }
+            for label, make_query in shapes.items():
+                samples = []
+                for _ in range(options["queries"]):
+                    text = make_query()
+                    project_id = rng.randrange(500) if "project" in label else None
+                    t = time.perf_counter()
+                    search.search(text, project_id=project_id, limit=20)
+                    samples.append((time.perf_counter() - t) * 1000)
+                self.stdout.write(
+                    f"{label:>22}: p50 {percentile(samples, 50):.1f} ms, p95 {percentile(samples, 95):.1f} ms"
+                )
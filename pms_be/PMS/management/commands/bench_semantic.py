@@ -0,0 +1,115 @@
+import asyncio
+import time
+from datetime import date
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from PMS import semantic
+from PMS.models import Project, Module, Task
+from ._bench import percentile, scratch_database, timer
+
+# per-query latency the index is meant to keep at 1M vectors
+TARGET_MS = 20
+
+
+class Command(BaseCommand):
+    help = "Semantic search: top-k query latency of the float32 index and cost of full vs incremental embedding."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--vectors", type=int, default=1_000_000)
+        parser.add_argument("--dim", type=int, default=256)
+        parser.add_argument("--queries", type=int, default=50)
+        parser.add_argument("--batch", type=int, default=32, help="Queries per batched product.")
+        parser.add_argument("--tasks", type=int, default=5000, help="Tasks embedded in the incremental run.")
+        parser.add_argument("--edited", type=int, default=50, help="Tasks whose title changes before the second run.")
+        parser.add_argument("--seed", type=int, default=7)
+        parser.add_argument("--target-ms", type=float, default=TARGET_MS, help="Per-query latency target.")
+
+    def handle(self, *args, **options):
+        self.query_latency(options)
+        self.incremental(options)
+
+    def query_latency(self, options):
+        rng = np.random.default_rng(options["seed"])
+        n, dim = options["vectors"], options["dim"]
+        index = semantic.VectorIndex("bench")
+        started = time.perf_counter()
+        for start in range(0, n, 100_000):
+            count = min(100_000, n - start)
+            keys = np.arange(start, start + count, dtype=np.int64) * 4 + 3
+            index.add(keys.tolist(), semantic.normalized(rng.standard_normal((count, dim), dtype=np.float32)))
+        load = time.perf_counter() - started
+        queries = semantic.normalized(rng.standard_normal((options["queries"], dim), dtype=np.float32))
+
+        single, filtered = [], []
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query, 10)
+            single.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            index.search(query, 10, codes=[2])
+            filtered.append(time.perf_counter() - started)
+        batch = queries[:options["batch"]]
+        started = time.perf_counter()
+        index.search(batch, 10)
+        batched = (time.perf_counter() - started) / len(batch)
+
+        # the same number of requests searching at once, coalesced by QueryBatcher
+        async def concurrent():
+            batcher = semantic.QueryBatcher(index)
+
+            async def one(query):
+                started = time.perf_counter()
+                await batcher.search(query, 10)
+                return time.perf_counter() - started
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*(one(query) for query in batch))
+            return latencies, time.perf_counter() - started, batcher.batches
+
+        latencies, concurrent_total, batches = asyncio.run(concurrent())
+
+        target = options["target_ms"]
+
+        def verdict(seconds):
+            return "meets" if seconds * 1000 <= target else "misses"
+
+        self.stdout.write(f"{n} x {dim} float32 vectors ({n * dim * 4 / 2 ** 20:.0f} MiB), loaded in {load:.2f} s; "
+                          f"target {target:g} ms per query")
+        self.stdout.write(f"  top-10, one query:   p50 {percentile(single, 50) * 1000:.1f} ms, "
+                          f"p95 {percentile(single, 95) * 1000:.1f} ms ({verdict(percentile(single, 50))} the target)")
+        self.stdout.write(f"  top-10, kind filter: p50 {percentile(filtered, 50) * 1000:.1f} ms "
+                          f"({verdict(percentile(filtered, 50))} the target)")
+        self.stdout.write(f"  top-10, batch of {len(batch)}: {batched * 1000:.1f} ms per query ({verdict(batched)} the target)")
+        per_query = concurrent_total / len(batch)
+        self.stdout.write(f"  {len(batch)} concurrent requests: {batches} matrix product(s), "
+                          f"{per_query * 1000:.1f} ms per query ({verdict(per_query)} the target), "
+                          f"slowest answered after {max(latencies) * 1000:.0f} ms")
+
+    def incremental(self, options):
+        results = {}
+        # board broadcasts of the edits stay in process
+        in_memory = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+        with scratch_database(), override_settings(PMS_EMBEDDER="hashing", PMS_SEMANTIC_AUTO_UPDATE=False,
+                                                   CHANNEL_LAYERS=in_memory):
+            project = Project.objects.create(name="Bench", start_date=date(2026, 1, 1))
+            module = Module.objects.create(project=project, name="Payments", start_date=date(2026, 1, 1))
+            Task.objects.bulk_create(
+                Task(module=module, title=f"Task {i} about invoices and refunds", start_date=date(2026, 1, 1))
+                for i in range(options["tasks"])
+            )
+            with timer(results, "full"):
+                full = semantic.update_index()
+            for task in Task.objects.order_by("id")[:options["edited"]]:
+                task.title = f"{task.title} (edited)"
+                task.save()
+            with timer(results, "incremental"):
+                incremental = semantic.update_index()
+            with timer(results, "unchanged"):
+                semantic.update_index()
+
+        self.stdout.write(f"embedding {full} rows (hashing embedder): {results['full']:.2f} s")
+        self.stdout.write(f"  after editing {options['edited']}: {incremental} re-embedded in "
+                          f"{results['incremental'] * 1000:.0f} ms; nothing changed: {results['unchanged'] * 1000:.1f} ms")
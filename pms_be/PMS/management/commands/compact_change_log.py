@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from PMS import sync
+
+
+class Command(BaseCommand):
+    help = "Drop change log entries that delta sync no longer needs (superseded updates, old tombstones)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days", type=int, default=sync.DEFAULT_RETENTION_DAYS,
+            help="Keep the full history of this many days (default %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        superseded, tombstones, horizon = sync.compact(options["retention_days"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {superseded} superseded entries and {tombstones} tombstones; sync horizon is now {horizon}."
+        ))
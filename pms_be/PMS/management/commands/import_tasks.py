@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from PMS import imports
+
+
+class Command(BaseCommand):
+    help = "Import tasks from a CSV file in batches (see PMS/imports.py for the columns)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=imports.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            stream = open(options["path"], encoding="utf-8-sig", newline="")
+        except OSError as e:
+            raise CommandError(str(e))
+
+        def progress(summary):
+            self.stdout.write(
+                f"{summary['rows']} rows read, {summary['imported']} imported, "
+                f"{summary['failed']} failed ({summary['elapsed']}s)"
+            )
+
+        with stream:
+            summary = imports.import_tasks_csv(stream, options["batch_size"], on_progress=progress)
+
+        for error in summary["errors"]:
+            self.stdout.write(self.style.WARNING(f"line {error['line']}: {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(f"Imported {summary['imported']} of {summary['rows']} rows."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from PMS import deletion
+
+
+class Command(BaseCommand):
+    help = "Finish project deletions that were queued or interrupted (e.g. by a restart)."
+
+    def handle(self, *args, **options):
+        project_ids = deletion.pending()
+        for project_id in project_ids:
+            self.stdout.write(f"Deleting project {project_id} ...")
+            deletion.run(project_id)
+        self.stdout.write(self.style.SUCCESS(f"{len(project_ids)} deletion(s) processed."))
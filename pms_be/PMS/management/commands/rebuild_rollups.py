@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from PMS import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the task counters stored on Project and Module, or just check them with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true", help="Report mismatches without writing anything.")
+
+    def handle(self, *args, **options):
+        if not options["verify"]:
+            rollups.rebuild_all()
+            self.stdout.write(self.style.SUCCESS("Rollups rebuilt."))
+
+        mismatches = rollups.verify_all()
+        for model, pk, field, stored, actual in mismatches[:50]:
+            self.stdout.write(f"{model} {pk}: {field} is {stored}, expected {actual}")
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{len(mismatches)} counter(s) out of sync."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All rollup counters match."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from PMS import search
+
+
+class Command(BaseCommand):
+    help = "Drop and rebuild the FTS5 search index over projects, modules and tasks."
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            raise CommandError("The search index needs the sqlite3 backend.")
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from PMS import deadlines
+
+
+class Command(BaseCommand):
+    help = "Notify assignees of tasks and modules that became overdue or due soon since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--due-soon-days", type=int, default=deadlines.DUE_SOON_DAYS,
+            help="Warn this many days ahead of an end date (default %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        counts = deadlines.scan(due_soon_days=options["due_soon_days"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Notified {counts['overdue']} newly overdue and {counts['due_soon']} due soon items."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from PMS import analytics
+from PMS.models import Project
+
+
+class Command(BaseCommand):
+    help = "Write today's analytics snapshot for every project, so days without activity have a row too."
+
+    def handle(self, *args, **options):
+        analytics.snapshot_all()
+        count = Project.objects.filter(deleting=False).count()
+        self.stdout.write(self.style.SUCCESS(f"Snapshotted {count} projects for {timezone.localdate()}."))
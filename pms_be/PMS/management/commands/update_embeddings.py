@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from PMS import semantic
+from PMS.models import Embedding
+
+
+class Command(BaseCommand):
+    help = "Embed the modules and tasks that have no embedding yet (all of them with --full)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Drop every embedding first.")
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            Embedding.objects.all().delete()
+        embedded = semantic.update_index()
+        self.stdout.write(self.style.SUCCESS(f"Embedded {embedded} modules and tasks with {semantic.embedder().name}."))
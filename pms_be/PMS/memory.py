@@ -0,0 +1,128 @@
+"""
+Conversation memory of the AI chat (see ConversationTurn and AIChatView).
+
+Every exchange appends two rows, the user's message and the reply; each user keeps
+the last PMS_AI_MEMORY_TURNS of them. Building a prompt reads them back with one
+indexed query and keeps the newest turns that fit in PMS_AI_MEMORY_TOKENS (a rough
+estimate of 4 characters per token), so the cost per request doesn't grow with
+the history.
+
+With PMS_AI_MEMORY_FLUSH_DELAY > 0 turns go through a background writer instead:
+they are buffered in process and inserted in one statement per
+PMS_AI_MEMORY_FLUSH_SIZE turns or after the delay, whichever comes first. Reads
+include the buffered turns, so the next message already sees the last reply. A
+crash loses at most the buffered turns.
+"""
+import atexit
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+
+from .models import ConversationTurn
+
+logger = logging.getLogger(__name__)
+
+# per message on top of its text (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def token_budget():
+    return getattr(settings, "PMS_AI_MEMORY_TOKENS", 1000)
+
+
+def flush_delay():
+    return getattr(settings, "PMS_AI_MEMORY_FLUSH_DELAY", 0)
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+def within_budget(turns, budget):
+    """The newest turns whose estimated size fits in the budget, oldest first."""
+    kept, used = [], 0
+    for turn in reversed(turns):
+        used += estimate_tokens(turn["content"])
+        if used > budget:
+            break
+        kept.append(turn)
+    return kept[::-1]
+
+
+class TurnWriter:
+    """Buffers turns and inserts them from a daemon thread. Thread safe."""
+
+    def __init__(self):
+        self._pending = []
+        self._writing = []  # the batch being inserted, still visible to pending()
+        self._ready = threading.Condition()
+        self._thread = None
+        self.flushes = self.written = 0
+
+    def add(self, turns):
+        with self._ready:
+            self._pending.extend(turns)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pms-memory-writer", daemon=True)
+                self._thread.start()
+            self._ready.notify()
+
+    def pending(self, user_id):
+        with self._ready:
+            return [{"role": r, "content": c} for u, r, c in self._writing + self._pending if u == user_id]
+
+    def _run(self):
+        while True:
+            with self._ready:
+                self._ready.wait_for(lambda: self._pending)
+                # give other requests the delay to add to the batch
+                size = getattr(settings, "PMS_AI_MEMORY_FLUSH_SIZE", 200)
+                self._ready.wait_for(lambda: len(self._pending) >= size, timeout=flush_delay())
+            self.flush()
+
+    def flush(self):
+        with self._ready:
+            batch = self._writing = self._pending
+            self._pending = []
+        if not batch:
+            return
+        try:
+            ConversationTurn.objects.append(batch)
+        except DatabaseError:
+            logger.exception("Could not write %d conversation turns", len(batch))
+        else:
+            self.flushes += 1
+            self.written += len(batch)
+        finally:
+            with self._ready:
+                self._writing = []
+
+
+writer = TurnWriter()
+atexit.register(writer.flush)
+
+
+def _context(user_id, budget):
+    turns = ConversationTurn.objects.recent(user_id) + writer.pending(user_id)
+    return within_budget(turns[-ConversationTurn.objects.window():], budget)
+
+
+async def context(user_id, budget=None):
+    """Earlier turns of the user's conversation as chat messages, within the token budget."""
+    if user_id is None:
+        return []
+    return await sync_to_async(_context)(user_id, token_budget() if budget is None else budget)
+
+
+async def remember(user_id, message, reply):
+    """Append one exchange to the user's conversation."""
+    if user_id is None or not reply:
+        return
+    turns = [(user_id, "user", message), (user_id, "assistant", reply)]
+    if flush_delay() > 0:
+        writer.add(turns)
+    else:
+        await sync_to_async(ConversationTurn.objects.append)(turns)
@@ -0,0 +1,61 @@
+"""
+In-process request counters and latency percentiles for the AI endpoints, served
+by /api/ai-stats/. Percentiles are taken over the last WINDOW samples per label.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+WINDOW = 1000
+
+
+class Timings:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._counts = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds):
+        with self._lock:
+            self._counts[label] = self._counts.get(label, 0) + 1
+            self._samples.setdefault(label, deque(maxlen=self.window)).append(seconds)
+
+    @contextmanager
+    def timed(self, label):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(label, time.perf_counter() - started)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            samples = {label: sorted(values) for label, values in self._samples.items()}
+        total = sum(counts.values())
+        return {
+            label: {
+                "count": count,
+                "share": round(count / total, 4),
+                "p50_ms": _percentile_ms(samples[label], 50),
+                "p95_ms": _percentile_ms(samples[label], 95),
+            }
+            for label, count in counts.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._samples.clear()
+
+
+def _percentile_ms(ordered, pct):
+    if not ordered:
+        return 0.0
+    return round(ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] * 1000, 3)
+
+
+# AIChatView requests by how they were answered: fast_path, cache, llm
+ai_chat = Timings()
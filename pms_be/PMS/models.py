@@ -1,9 +1,159 @@
+import threading
+import time
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+from django.dispatch import Signal
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
-class Project(models.Model):
+_version_lock = threading.Lock()
+_last_version = 0
+
+
+def next_version():
+    """
+    Version stamp for a write: microseconds since the epoch (still exact as a JS
+    number), strictly increasing within the process. Doubles as the Last-Modified
+    time of the row.
+    """
+    global _last_version
+    with _version_lock:
+        _last_version = max(time.time_ns() // 1000, _last_version + 1)
+        return _last_version
+
+
+class CollectionVersion(models.Model):
+    """
+    Latest write stamp per table ("project", "module", "task"), including deletes,
+    so list endpoints can answer conditional GETs with a primary-key lookup. Also
+    holds the change log compaction horizon (see PMS.sync).
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} @ {self.version}"
+
+    @classmethod
+    def touch(cls, *models_):
+        stamp = next_version()
+        cls.objects.bulk_create(
+            [cls(name=m._meta.model_name, version=stamp) for m in models_],
+            update_conflicts=True, unique_fields=["name"], update_fields=["version"],
+        )
+
+    @classmethod
+    def stamps(cls, *models_):
+        names = [m._meta.model_name for m in models_]
+        found = dict(cls.objects.filter(name__in=names).values_list("name", "version"))
+        return [found.get(name, 0) for name in names]
+
+
+class VersionedQuerySet(models.QuerySet):
+    """Queryset writes that skip Model.save() still stamp the rows and the collection."""
+
+    def update(self, **kwargs):
+        kwargs.setdefault("version", next_version())
+        rows = super().update(**kwargs)
+        if rows:
+            CollectionVersion.touch(self.model)
+        return rows
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        stamp = next_version()
+        for obj in objs:
+            obj.version = stamp
+        rows = super().bulk_update(objs, [*{*fields, "version"}], *args, **kwargs)
+        if rows:
+            CollectionVersion.touch(self.model)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            CollectionVersion.touch(self.model)
+        return objs
+
+
+class Versioned(models.Model):
+    """
+    Per-row version stamp, bumped on every write (see next_version). Used for ETag /
+    Last-Modified on read endpoints.
+    """
+    version = models.PositiveBigIntegerField(default=next_version, editable=False)
+
+    objects = VersionedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.version = next_version()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+        super().save(*args, **kwargs)
+        # post_save receivers have compared against the old values by now
+        self.remember_loaded_values()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.remember_loaded_values()
+
+    def remember_loaded_values(self):
+        """
+        Snapshot of the field values as last loaded or saved (taken on post_init, see
+        PMS.signals). Reads __dict__ so deferred fields are skipped, not fetched.
+        """
+        values = self.__dict__
+        self._loaded_values = {f.attname: values[f.attname] for f in self._meta.concrete_fields if f.attname in values}
+
+    def changed_values(self):
+        """{attname: current value} for fields that differ from the snapshot (version excluded)."""
+        loaded = getattr(self, "_loaded_values", {})
+        values = self.__dict__
+        return {
+            f.attname: values[f.attname]
+            for f in self._meta.concrete_fields
+            if f.attname != "version" and f.attname in values
+            and (f.attname not in loaded or loaded[f.attname] != values[f.attname])
+        }
+
+# Sent after Task writes that bypass post_save/post_delete (bulk_create, bulk_update,
+# QuerySet.update). Receivers get module_ids (set), task_ids (set, may be empty),
+# created (the new Task objects for bulk_create, otherwise None), fields (the
+# attnames written by an update, None for bulk_create) and previous_status
+# ({task_id: status before the write} when an update wrote status, otherwise None).
+tasks_bulk_changed = Signal()
+
+
+class TaskRollup(Versioned):
+    """
+    Denormalized task counters kept on Project and Module so progress can be read
+    without joining Task. Maintained incrementally by PMS.signals / PMS.rollups;
+    `manage.py rebuild_rollups` recomputes them from scratch.
+    """
+    tasks_total = models.PositiveIntegerField(default=0)
+    tasks_todo = models.PositiveIntegerField(default=0)
+    tasks_in_progress = models.PositiveIntegerField(default=0)
+    tasks_review = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def progress(self):
+        """Completion ratio 0..1"""
+        if not self.tasks_total:
+            return 0.0
+        return round(self.tasks_completed / self.tasks_total, 4)
+
+
+class Project(TaskRollup):
     name = models.CharField(max_length=200, unique=True)
     description = models.TextField(blank=True, null=True)
     start_date = models.DateField()
@@ -15,12 +165,20 @@ class Project(models.Model):
         ("completed", "Completed"),
     ]
     status = models.CharField(max_length=20, choices=status_choices, default="pending")
+    # set by DELETE; the rows are removed in the background (see PMS.deletion)
+    deleting = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of the project list
+            models.Index(fields=["start_date", "id"], name="pms_project_start_id"),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Module(models.Model):
+class Module(TaskRollup):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="modules")
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
@@ -28,11 +186,83 @@ class Module(models.Model):
     end_date = models.DateField(blank=True, null=True)
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="assigned_modules")
 
+    class Meta:
+        indexes = [
+            # timeline overlap queries (end_date >= window start AND start_date <= window end)
+            models.Index(fields=["end_date", "start_date"], name="pms_module_span"),
+            models.Index(fields=["project", "end_date", "start_date"], name="pms_module_project_span"),
+            # keyset pages of a project's modules (PMS.listing)
+            models.Index(fields=["project", "start_date", "id"], name="pms_module_project_start"),
+            # keyset pages ordered by name
+            models.Index(fields=["name", "id"], name="pms_module_name"),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.project.name}"
 
 
-class Task(models.Model):
+class TaskQuerySet(VersionedQuerySet):
+    """
+    Bulk writes skip model signals, so report the touched rows through
+    tasks_bulk_changed instead (rollups, search and the change log listen to it).
+    """
+    # fields the rollup counters depend on
+    ROLLUP_FIELDS = {"module_id", "status"}
+    # set while bulk_update runs its own update() calls, which then stay quiet
+    _in_bulk_update = threading.local()
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            tasks_bulk_changed.send(
+                sender=Task,
+                module_ids={o.module_id for o in objs},
+                task_ids={o.pk for o in objs if o.pk is not None},
+                created=objs,
+                fields=None,
+                previous_status=None,
+            )
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        self._in_bulk_update.active = True
+        try:
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+        finally:
+            self._in_bulk_update.active = False
+        if objs:
+            module_ids = {o.module_id for o in objs}
+            # modules the tasks were loaded from (see Versioned.remember_loaded_values)
+            module_ids |= {o._loaded_values.get("module_id") for o in objs if hasattr(o, "_loaded_values")}
+            fields = {Task._meta.get_field(f).attname for f in fields}
+            previous_status = None
+            if "status" in fields:
+                previous_status = {o.pk: getattr(o, "_loaded_values", {}).get("status") for o in objs}
+            tasks_bulk_changed.send(
+                sender=Task, module_ids=module_ids, task_ids={o.pk for o in objs}, created=None,
+                fields=fields, previous_status=previous_status,
+            )
+        return rows
+
+    def update(self, **kwargs):
+        if getattr(self._in_bulk_update, "active", False):
+            return super().update(**kwargs)
+        touched = list(self.values_list("id", "module_id", "status"))
+        rows = super().update(**kwargs)
+        module_ids = {m for _, m, _ in touched}
+        new_module = kwargs.get("module_id", kwargs.get("module"))
+        if new_module is not None:
+            module_ids.add(getattr(new_module, "pk", new_module))
+        tasks_bulk_changed.send(
+            sender=Task, module_ids=module_ids, task_ids={t for t, _, _ in touched}, created=None,
+            fields={Task._meta.get_field(f).attname for f in kwargs},
+            previous_status={t: s for t, _, s in touched} if "status" in kwargs else None,
+        )
+        return rows
+
+
+class Task(Versioned):
     module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name="tasks")
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
@@ -54,24 +284,262 @@ class Task(models.Model):
     ]
     status = models.CharField(max_length=20, choices=status_choices, default="todo")
 
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # covering indexes for the board summary GROUP BY (status x priority, overdue)
+            models.Index(fields=["module", "status", "priority", "end_date"], name="pms_task_board"),
+            models.Index(fields=["assigned_to", "status", "priority", "end_date"], name="pms_task_assignee_board"),
+            # timeline overlap queries
+            models.Index(fields=["end_date", "start_date"], name="pms_task_span"),
+            models.Index(fields=["module", "end_date", "start_date"], name="pms_task_module_span"),
+            # keyset pages of a module's tasks (PMS.listing)
+            models.Index(fields=["module", "start_date", "id"], name="pms_task_module_start"),
+            # keyset pages ordered by title
+            models.Index(fields=["title", "id"], name="pms_task_title"),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.module.name}"
     
 
+class TaskDependency(models.Model):
+    """Finish-to-start link: successor may start lag_days after predecessor ends."""
+    predecessor = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="successor_links")
+    successor = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="predecessor_links")
+    lag_days = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["predecessor", "successor"], name="pms_dependency_unique"),
+        ]
+        indexes = [
+            # walking the graph upstream (the unique constraint covers downstream)
+            models.Index(fields=["successor", "predecessor"], name="pms_dependency_successor"),
+        ]
+
+    def __str__(self):
+        return f"{self.predecessor_id} -> {self.successor_id}"
+
+
+class TaskSchedule(models.Model):
+    """
+    Critical path results for a task, maintained by PMS.scheduling. Dates are the
+    first / last working day of the task.
+    """
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, primary_key=True, related_name="schedule")
+    project_id = models.BigIntegerField()
+    early_start = models.DateField()
+    early_finish = models.DateField()
+    late_start = models.DateField()
+    late_finish = models.DateField()
+    slack = models.IntegerField()
+    critical = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # project finish (max early_finish) without scanning the project
+            models.Index(fields=["project_id", "early_finish"], name="pms_schedule_finish"),
+        ]
+
+    def __str__(self):
+        return f"Schedule of task {self.task_id}"
+
+
+class TaskStatusChange(models.Model):
+    """
+    Append-only status history. from_status is null when the task was created,
+    to_status when it was deleted. Plain id columns, so history survives deletes.
+    """
+    task_id = models.BigIntegerField()
+    project_id = models.BigIntegerField(null=True)
+    from_status = models.CharField(max_length=20, null=True, blank=True)
+    to_status = models.CharField(max_length=20, null=True, blank=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["task_id", "changed_at"], name="pms_status_task"),
+            models.Index(fields=["project_id", "changed_at"], name="pms_status_project"),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id}: {self.from_status} -> {self.to_status}"
+
+
+class ProjectDailySnapshot(models.Model):
+    """
+    One row per project and day with activity (see PMS.analytics): task counts by
+    status at the end of the day, plus what happened during it.
+    """
+    project_id = models.BigIntegerField()
+    day = models.DateField()
+    tasks_total = models.PositiveIntegerField(default=0)
+    tasks_todo = models.PositiveIntegerField(default=0)
+    tasks_in_progress = models.PositiveIntegerField(default=0)
+    tasks_review = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    # cycle time (first in_progress -> completed) of the tasks completed that day
+    cycle_time_hours = models.FloatField(default=0)
+    cycle_time_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["project_id", "day"], name="pms_snapshot_project_day"),
+        ]
+
+    def __str__(self):
+        return f"Project {self.project_id} on {self.day}"
+
+
+class DeadlineScan(models.Model):
+    """
+    High-water mark of the deadline scanner (see PMS.deadlines): end dates up to
+    scanned_through have been notified for this kind ("overdue" / "due_soon").
+    """
+    kind = models.CharField(max_length=20, primary_key=True)
+    scanned_through = models.DateField()
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_notified = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.kind} through {self.scanned_through}"
+
+
+class ChangeEvent(models.Model):
+    """
+    Append-only log of Project / Module / Task writes. The id is the sequence number
+    board clients resume from; project_id is a plain column so events outlive the
+    project they describe.
+    """
+    op_choices = [
+        ("created", "Created"),
+        ("updated", "Updated"),
+        ("deleted", "Deleted"),
+    ]
+    project_id = models.BigIntegerField(null=True)
+    entity = models.CharField(max_length=20)
+    entity_id = models.BigIntegerField()
+    op = models.CharField(max_length=10, choices=op_choices)
+    fields = models.JSONField(default=dict, blank=True)  # only the fields that changed
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # resume: events of one project after a sequence number
+            models.Index(fields=["project_id", "id"], name="pms_event_project_seq"),
+            # delta sync compaction: newer events of the same entity, retention cutoff
+            models.Index(fields=["entity", "entity_id", "id"], name="pms_event_entity_seq"),
+            models.Index(fields=["created_at"], name="pms_event_created"),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.entity} {self.entity_id} {self.op}"
+
+
+class ProjectDeletion(models.Model):
+    """
+    Progress of a background project deletion. Keyed by the project id as a plain
+    column so the record outlives the project.
+    """
+    status_choices = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+    project_id = models.BigIntegerField(primary_key=True)
+    project_name = models.CharField(max_length=200)
+    status = models.CharField(max_length=10, choices=status_choices, default="queued")
+    tasks_total = models.PositiveIntegerField(default=0)
+    tasks_deleted = models.PositiveIntegerField(default=0)
+    modules_total = models.PositiveIntegerField(default=0)
+    modules_deleted = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    requested_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Deletion of {self.project_name} ({self.status})"
+
+
+class Embedding(models.Model):
+    """
+    Embedding vector of a module's or task's text (see PMS.semantic). key is the
+    search rowid (pk * 4 + kind code); a missing row means "not embedded yet".
+    """
+    key = models.BigIntegerField(unique=True)
+    model = models.CharField(max_length=100)  # embedder that produced the vector
+    vector = models.BinaryField()  # float32, L2-normalized
+
+    def __str__(self):
+        return f"Embedding {self.key} ({self.model})"
+
+
+class ConversationTurnQuerySet(models.QuerySet):
+    """
+    Conversation memory as append-only rows: writes are INSERTs (no read-modify-write
+    of a shared blob, so concurrent requests can't lose each other's turns) and
+    each user keeps a ring buffer of the last PMS_AI_MEMORY_TURNS turns.
+    """
+
+    @staticmethod
+    def window():
+        return getattr(settings, "PMS_AI_MEMORY_TURNS", 20)
+
+    def append(self, turns):
+        """Insert (user_id, role, content) turns in one statement and trim each user's window."""
+        rows = self.bulk_create([ConversationTurn(user_id=u, role=r, content=c) for u, r, c in turns])
+        for user_id in {u for u, _, _ in turns}:
+            self.trim(user_id)
+        return rows
+
+    def trim(self, user_id):
+        # everything older than the window-th newest turn, in one indexed DELETE
+        newest = self.filter(user_id=user_id).order_by("-id").values("id")[self.window() - 1:self.window()]
+        return self.filter(user_id=user_id, id__lt=models.Subquery(newest)).delete()[0]
+
+    def recent(self, user_id, limit=None):
+        """The user's last turns, oldest first, as {"role", "content"} dicts (one query)."""
+        rows = self.filter(user_id=user_id).order_by("-id").values("role", "content")[:limit or self.window()]
+        return list(rows)[::-1]
+
+
+class ConversationTurn(models.Model):
+    ROLE_CHOICES = [("user", "User"), ("assistant", "Assistant")]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="conversation_turns")
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    content = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = ConversationTurnQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "id"], name="pms_turn_user")]
+
+    def __str__(self):
+        return f"{self.role} turn of user {self.user_id}"
+
+
 class UserContext(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="context")
     name = models.CharField(max_length=100, blank=True, null=True)
     last_project = models.CharField(max_length=255, blank=True, null=True)
     last_module = models.CharField(max_length=255, blank=True, null=True)
-    memory = models.JSONField(default=list, blank=True)  # 🧠 stores chat history as [{"user":"hi"}, {"ai":"hello"}]
 
     def __str__(self):
         return f"Context for {self.user.username}"
 
+    @property
+    def memory(self):
+        """🧠 chat history as [{"user": "hi"}, {"ai": "hello"}] (see ConversationTurn)"""
+        return [{"ai" if t["role"] == "assistant" else "user": t["content"]} for t in ConversationTurn.objects.recent(self.user_id)]
+
     def add_message(self, role, content):
         """Append chat message to memory"""
-        m = self.memory or []
-        m.append({role: content})
-        # keep last 20 only to prevent overload
-        self.memory = m[-20:]
-        self.save()
+        ConversationTurn.objects.append([(self.user_id, "assistant" if role == "ai" else role, content)])
@@ -0,0 +1,171 @@
+"""
+Async client for the Ollama chat API.
+
+One httpx.AsyncClient per event loop, so under an ASGI server every request shares
+a keep-alive connection pool (at most OLLAMA_MAX_CONNECTIONS sockets) and a view
+waiting for a reply only holds a coroutine, not a worker thread. Connection
+failures and 502/503/504 answers are retried OLLAMA_RETRIES times with a short
+backoff; a reply that is merely slow is not, it runs into OLLAMA_TIMEOUT.
+stream_chat() yields the reply token by token as Ollama produces it (NDJSON),
+so callers can forward the first words long before generation finishes.
+Every call first takes a slot from PMS.admission (priority "interactive", "chat"
+or "batch") and may raise admission.Rejected instead of queueing without bound.
+
+embed() returns embedding vectors from /api/embed (see PMS.semantic).
+
+Settings (see be/settings.py): OLLAMA_URL (base URL), OLLAMA_MODEL, OLLAMA_EMBED_MODEL,
+OLLAMA_TIMEOUT, OLLAMA_CONNECT_TIMEOUT, OLLAMA_RETRIES, OLLAMA_MAX_CONNECTIONS.
+"""
+import asyncio
+import json
+import logging
+import weakref
+
+import httpx
+from django.conf import settings
+
+from . import admission
+
+logger = logging.getLogger(__name__)
+
+CHAT_PATH = "/api/chat"
+EMBED_PATH = "/api/embed"
+RETRY_STATUSES = {502, 503, 504}
+RETRY_BACKOFF = 0.2
+
+# system prompt of the voice assistant (voicechat view and VoiceChatConsumer)
+VOICE_SYSTEM_PROMPT = (
+    "You are a helpful AI assistant. Always summarize your replies into maximum 3 lines. "
+    "Be concise, clear, and informative."
+)
+
+_clients = weakref.WeakKeyDictionary()
+
+
+class OllamaError(Exception):
+    """Ollama could not be reached or answered with an error."""
+
+
+def base_url():
+    url = getattr(settings, "OLLAMA_URL", "http://localhost:11434").rstrip("/")
+    # older settings pointed at the chat endpoint itself
+    return url[: -len(CHAT_PATH)] if url.endswith(CHAT_PATH) else url
+
+
+def model():
+    return getattr(settings, "OLLAMA_MODEL", "llama3:latest")
+
+
+def _new_client():
+    connections = getattr(settings, "OLLAMA_MAX_CONNECTIONS", 50)
+    return httpx.AsyncClient(
+        base_url=base_url(),
+        timeout=httpx.Timeout(
+            getattr(settings, "OLLAMA_TIMEOUT", 120), connect=getattr(settings, "OLLAMA_CONNECT_TIMEOUT", 5),
+        ),
+        limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+    )
+
+
+def client():
+    """The pooled client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    shared = _clients.get(loop)
+    if shared is None or shared.is_closed:
+        shared = _clients[loop] = _new_client()
+    return shared
+
+
+async def aclose():
+    """Close the current loop's client (e.g. on shutdown)."""
+    shared = _clients.pop(asyncio.get_running_loop(), None)
+    if shared is not None:
+        await shared.aclose()
+
+
+def _payload(messages, model_name, stream, options):
+    payload = {"model": model_name or model(), "messages": messages, "stream": stream}
+    if options:
+        payload["options"] = options
+    return payload
+
+
+async def _post(payload, path=CHAT_PATH):
+    retries = getattr(settings, "OLLAMA_RETRIES", 2)
+    for attempt in range(retries + 1):
+        try:
+            response = await client().post(path, json=payload)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                response.raise_for_status()
+                return response
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+            if attempt == retries:
+                raise OllamaError(f"Could not reach Ollama at {base_url()}: {e}") from e
+        except httpx.HTTPError as e:
+            raise OllamaError(str(e) or type(e).__name__) from e
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+async def chat(messages, model_name=None, priority="chat", **options):
+    """The assistant's reply to a list of {"role", "content"} messages ("" if empty)."""
+    async with admission.controller.slot(priority):
+        response = await _post(_payload(messages, model_name, False, options))
+    try:
+        return response.json().get("message", {}).get("content", "")
+    except ValueError as e:
+        raise OllamaError(f"Unexpected reply from Ollama: {e}") from e
+
+
+async def embed(texts, model_name=None, priority="batch"):
+    """One embedding (list of floats) per text."""
+    payload = {"model": model_name or getattr(settings, "OLLAMA_EMBED_MODEL", "nomic-embed-text"), "input": list(texts)}
+    async with admission.controller.slot(priority):
+        response = await _post(payload, EMBED_PATH)
+    try:
+        embeddings = response.json()["embeddings"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise OllamaError(f"Unexpected reply from Ollama: {e}") from e
+    if len(embeddings) != len(payload["input"]):
+        raise OllamaError(f"Ollama returned {len(embeddings)} embeddings for {len(payload['input'])} texts")
+    return embeddings
+
+
+async def stream_chat(messages, model_name=None, priority="chat", **options):
+    """
+    Async iterator over the pieces of the reply as they are generated. Retries only
+    happen before the first piece, so nothing is ever yielded twice. The admission
+    slot is held until the stream ends or is closed.
+    """
+    async with admission.controller.slot(priority):
+        async for piece in _stream(_payload(messages, model_name, True, options)):
+            yield piece
+
+
+async def _stream(payload):
+    retries = getattr(settings, "OLLAMA_RETRIES", 2)
+    for attempt in range(retries + 1):
+        try:
+            async with client().stream("POST", CHAT_PATH, json=payload) as response:
+                if response.status_code in RETRY_STATUSES and attempt < retries:
+                    await response.aread()
+                else:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        try:
+                            chunk = json.loads(line)
+                        except ValueError:
+                            continue
+                        content = chunk.get("message", {}).get("content")
+                        if content:
+                            yield content
+                        if chunk.get("done"):
+                            break
+                    return
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            if attempt == retries:
+                raise OllamaError(f"Could not reach Ollama at {base_url()}: {e}") from e
+        except httpx.HTTPError as e:
+            raise OllamaError(str(e) or type(e).__name__) from e
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
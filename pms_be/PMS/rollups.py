@@ -0,0 +1,184 @@
+"""
+Task counters on Project / Module (see models.TaskRollup).
+
+Single-row writes adjust counters in place with F() expressions (two UPDATEs per
+change); bulk creates add their counts with one UPDATE per distinct increment,
+other bulk writes recompute the touched modules with one GROUP BY each.
+"""
+from django.db.models import Count, F, Sum
+
+from .models import Project, Module, Task
+
+ROLLUP_STATUSES = [s for s, _ in Task.status_choices]
+ROLLUP_FIELDS = ["tasks_total"] + [f"tasks_{s}" for s in ROLLUP_STATUSES]
+
+# keep IN (...) lists well below SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+
+def status_field(status):
+    """Counter for a status; statuses outside the choices only count towards the total."""
+    return f"tasks_{status}" if status in ROLLUP_STATUSES else None
+
+
+def bump(module_id, deltas):
+    """Add {field: delta} to a module and its project."""
+    deltas = {f: d for f, d in deltas.items() if f and d}
+    if not module_id or not deltas:
+        return
+    updates = {f: F(f) + d for f, d in deltas.items()}
+    Module.objects.filter(id=module_id).update(**updates)
+    Project.objects.filter(modules__id=module_id).update(**updates)
+
+
+def task_added(module_id, status):
+    bump(module_id, {"tasks_total": 1, status_field(status): 1})
+
+
+def task_removed(module_id, status):
+    bump(module_id, {"tasks_total": -1, status_field(status): -1})
+
+
+def _bump_many(model, deltas):
+    """Add {pk: {field: delta}}, one UPDATE per distinct set of deltas (batches mostly share a few)."""
+    by_deltas = {}
+    for pk, row_deltas in deltas.items():
+        by_deltas.setdefault(tuple(sorted(row_deltas.items())), []).append(pk)
+    for row_deltas, pks in by_deltas.items():
+        updates = {f: F(f) + d for f, d in row_deltas}
+        for chunk in _chunks(pks):
+            model.objects.filter(id__in=chunk).update(**updates)
+
+
+def tasks_created(tasks):
+    """Apply a batch of new tasks with a few grouped UPDATEs instead of one pair per module or a recount."""
+    deltas = {}
+    for task in tasks:
+        module_deltas = deltas.setdefault(task.module_id, {})
+        for field in ("tasks_total", status_field(task.status)):
+            if field:
+                module_deltas[field] = module_deltas.get(field, 0) + 1
+    if not deltas:
+        return
+    project_deltas = {}
+    for chunk in _chunks(deltas):
+        for module_id, project_id in Module.objects.filter(id__in=chunk).values_list("id", "project_id"):
+            totals = project_deltas.setdefault(project_id, {})
+            for field, delta in deltas[module_id].items():
+                totals[field] = totals.get(field, 0) + delta
+    _bump_many(Module, deltas)
+    _bump_many(Project, project_deltas)
+
+
+def task_changed(old_module_id, old_status, new_module_id, new_status):
+    if old_module_id == new_module_id:
+        if old_status != new_status:
+            deltas = {}
+            for field, delta in ((status_field(old_status), -1), (status_field(new_status), 1)):
+                if field:
+                    deltas[field] = deltas.get(field, 0) + delta
+            bump(new_module_id, deltas)
+        return
+    task_removed(old_module_id, old_status)
+    task_added(new_module_id, new_status)
+
+
+# ---------------- full recomputation ----------------
+def _chunks(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), CHUNK_SIZE):
+        yield ids[i:i + CHUNK_SIZE]
+
+
+def counted_modules(module_ids):
+    """{module_id: {field: value}} computed from Task rows."""
+    counts = {}
+    for chunk in _chunks(module_ids):
+        counts.update({m: dict.fromkeys(ROLLUP_FIELDS, 0) for m in chunk})
+        rows = (
+            Task.objects.filter(module_id__in=chunk)
+            .values("module_id", "status")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        for row in rows:
+            module_counts = counts[row["module_id"]]
+            module_counts["tasks_total"] += row["n"]
+            field = status_field(row["status"])
+            if field:
+                module_counts[field] += row["n"]
+    return counts
+
+
+def counted_projects(project_ids):
+    """{project_id: {field: value}} summed from the (already correct) module counters."""
+    counts = {}
+    for chunk in _chunks(project_ids):
+        counts.update({p: dict.fromkeys(ROLLUP_FIELDS, 0) for p in chunk})
+        rows = (
+            Module.objects.filter(project_id__in=chunk)
+            .values("project_id")
+            .annotate(**{f"sum_{f}": Sum(f) for f in ROLLUP_FIELDS})
+            .order_by()
+        )
+        for row in rows:
+            counts[row["project_id"]] = {f: row[f"sum_{f}"] or 0 for f in ROLLUP_FIELDS}
+    return counts
+
+
+def _write(model, counts):
+    objs = []
+    for pk, values in counts.items():
+        obj = model(pk=pk)
+        for field, value in values.items():
+            setattr(obj, field, value)
+        objs.append(obj)
+    model.objects.bulk_update(objs, ROLLUP_FIELDS, batch_size=CHUNK_SIZE)
+
+
+def refresh_modules(module_ids):
+    """Recompute counters for these modules and their projects (used after bulk writes)."""
+    module_ids = {m for m in module_ids if m}
+    if not module_ids:
+        return
+    existing = set()
+    project_ids = set()
+    for chunk in _chunks(module_ids):
+        for module_id, project_id in Module.objects.filter(id__in=chunk).values_list("id", "project_id"):
+            existing.add(module_id)
+            project_ids.add(project_id)
+    _write(Module, counted_modules(existing))
+    refresh_projects(project_ids)
+
+
+def refresh_projects(project_ids):
+    """Re-sum project counters from their modules (e.g. after modules moved between projects)."""
+    project_ids = {p for p in project_ids if p}
+    if project_ids:
+        _write(Project, counted_projects(project_ids))
+
+
+def rebuild_all():
+    _write(Module, counted_modules(Module.objects.values_list("id", flat=True)))
+    _write(Project, counted_projects(Project.objects.values_list("id", flat=True)))
+
+
+def verify_all():
+    """Returns [(model name, pk, field, stored, actual)] for every counter that is off."""
+    module_counts = counted_modules(Module.objects.values_list("id", flat=True))
+    # project totals are checked against the tasks under them, not the stored module counters
+    project_counts = {p: dict.fromkeys(ROLLUP_FIELDS, 0) for p in Project.objects.values_list("id", flat=True)}
+    for module_id, project_id in Module.objects.values_list("id", "project_id"):
+        if module_id in module_counts and project_id in project_counts:
+            for f in ROLLUP_FIELDS:
+                project_counts[project_id][f] += module_counts[module_id][f]
+
+    mismatches = []
+    empty = dict.fromkeys(ROLLUP_FIELDS, 0)
+    for model, expected in ((Module, module_counts), (Project, project_counts)):
+        for row in model.objects.values("id", *ROLLUP_FIELDS).iterator(chunk_size=2000):
+            actual = expected.get(row["id"], empty)
+            for f in ROLLUP_FIELDS:
+                if row[f] != actual[f]:
+                    mismatches.append((model.__name__, row["id"], f, row[f], actual[f]))
+    return mismatches
@@ -5,4 +5,6 @@ import chats.routing
 
 websocket_urlpatterns = [
     re_path(r'ws/call/(?P<username>\w+)/$', consumers.CallConsumer.as_asgi()),
+    re_path(r'ws/projects/(?P<project_id>\d+)/$', consumers.ProjectBoardConsumer.as_asgi()),
+    re_path(r'ws/ai-voicechat/$', consumers.VoiceChatConsumer.as_asgi()),
 ]
@@ -0,0 +1,404 @@
+"""
+Critical path scheduling over TaskDependency (finish-to-start links with a lag).
+
+Durations are whole days taken from the task's own dates (end_date inclusive, a
+task without end_date takes one day) and no task starts before its start_date.
+The forward pass gives the early start / finish, the backward pass the late start /
+finish against the project finish, and slack = late start - early start; tasks
+without slack are on the critical path. Results are stored in TaskSchedule.
+
+After an edit only the affected part of the graph is recomputed: the forward pass
+runs over the tasks downstream of the change, the backward pass over the tasks
+upstream of it, and both read the stored values of their neighbours at the
+boundary. Only when the project finish moves, which shifts every late date, is the
+whole project recomputed. Edits are collected per transaction (see mark) and
+applied once after commit.
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .models import Task, TaskDependency, TaskSchedule
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+SCHEDULE_FIELDS = ["early_start", "early_finish", "late_start", "late_finish", "slack", "critical"]
+
+
+class CycleError(ValueError):
+    pass
+
+
+def duration(start_date, end_date):
+    """Whole days, end date included; a task without end date takes one day."""
+    return max(1, (end_date - start_date).days + 1) if end_date else 1
+
+
+class Graph:
+    """
+    Tasks and links of one project, held in flat lists by position (task ids are
+    only looked up while loading), with days as date ordinals.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.index = {}
+        self.start = []         # earliest allowed start
+        self.length = []        # duration in days
+        self.succ = []          # position -> [(successor position, lag)]
+        self.indegree = []
+
+    def add_task(self, task_id, start_date, end_date):
+        self.index[task_id] = len(self.ids)
+        self.ids.append(task_id)
+        self.start.append(start_date.toordinal())
+        self.length.append(duration(start_date, end_date))
+        self.succ.append([])
+        self.indegree.append(0)
+
+    def add_link(self, predecessor, successor, lag):
+        """Links to tasks outside the graph are ignored."""
+        i, j = self.index.get(predecessor), self.index.get(successor)
+        if i is not None and j is not None:
+            self.succ[i].append((j, lag))
+            self.indegree[j] += 1
+
+
+def topological_order(nodes, succ):
+    """`nodes` in dependency order; links leaving the set are ignored."""
+    indegree = dict.fromkeys(nodes, 0)
+    for n in indegree:
+        for s, _ in succ.get(n, ()):
+            if s in indegree:
+                indegree[s] += 1
+    ready = [n for n, d in indegree.items() if d == 0]
+    order = []
+    while ready:
+        n = ready.pop()
+        order.append(n)
+        for s, _ in succ.get(n, ()):
+            if s in indegree:
+                indegree[s] -= 1
+                if indegree[s] == 0:
+                    ready.append(s)
+    if len(order) != len(indegree):
+        raise CycleError("Task dependencies contain a cycle")
+    return order
+
+
+def compute(graph):
+    """(finish, {task id: (es, ef, ls, lf)}) for the whole graph."""
+    n = len(graph.ids)
+    start, length, succ = graph.start, graph.length, graph.succ
+    indegree = graph.indegree[:]
+    early_start = start[:]
+    early_finish = [0] * n
+
+    # forward pass in Kahn order: a task is final once all its predecessors are
+    order = []
+    ready = [i for i in range(n) if not indegree[i]]
+    while ready:
+        i = ready.pop()
+        order.append(i)
+        ef = early_finish[i] = early_start[i] + length[i] - 1
+        for j, lag in succ[i]:
+            if ef + 1 + lag > early_start[j]:
+                early_start[j] = ef + 1 + lag
+            indegree[j] -= 1
+            if not indegree[j]:
+                ready.append(j)
+    if len(order) != n:
+        raise CycleError("Task dependencies contain a cycle")
+
+    finish = max(early_finish, default=0)
+    late_start = [0] * n
+    late_finish = [0] * n
+    for i in reversed(order):
+        lf = finish
+        for j, lag in succ[i]:
+            if late_start[j] - 1 - lag < lf:
+                lf = late_start[j] - 1 - lag
+        late_finish[i] = lf
+        late_start[i] = lf - length[i] + 1
+
+    ids = graph.ids
+    return finish, {ids[i]: (early_start[i], early_finish[i], late_start[i], late_finish[i]) for i in range(n)}
+
+
+# ---------------- loading / storing ----------------
+def _chunks(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), CHUNK_SIZE):
+        yield ids[i:i + CHUNK_SIZE]
+
+
+def load_project(project_id):
+    graph = Graph()
+    tasks = Task.objects.filter(module__project_id=project_id).values_list("id", "start_date", "end_date")
+    for task_id, start, end in tasks.iterator(chunk_size=5000):
+        graph.add_task(task_id, start, end)
+    links = TaskDependency.objects.filter(successor__module__project_id=project_id)
+    for p, s, lag in links.values_list("predecessor_id", "successor_id", "lag_days").iterator(chunk_size=5000):
+        graph.add_link(p, s, lag)
+    return graph
+
+
+def _stored(task_ids):
+    """{task id: (es, ef, ls, lf)} as ordinals from TaskSchedule."""
+    stored = {}
+    for chunk in _chunks(task_ids):
+        rows = TaskSchedule.objects.filter(task_id__in=chunk).values_list("task_id", *SCHEDULE_FIELDS[:4])
+        for task_id, *dates in rows:
+            stored[task_id] = tuple(d.toordinal() for d in dates)
+    return stored
+
+
+def _save(project_id, results):
+    """Upsert {task id: (es, ef, ls, lf)} with one executemany per chunk."""
+    table = TaskSchedule._meta.db_table
+    columns = ["task_id", "project_id", *SCHEDULE_FIELDS]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT (task_id) DO UPDATE SET "
+        + ", ".join(f"{c} = excluded.{c}" for c in columns[1:])
+    )
+    fromordinal = date.fromordinal
+    rows = [
+        (task_id, project_id, fromordinal(es), fromordinal(ef), fromordinal(ls), fromordinal(lf), ls - es, ls == es)
+        for task_id, (es, ef, ls, lf) in results.items()
+    ]
+    # one transaction: after commit the connection is in autocommit, one per row otherwise
+    with transaction.atomic(), connection.cursor() as cursor:
+        for i in range(0, len(rows), 5000):
+            cursor.executemany(sql, rows[i:i + 5000])
+
+
+def schedule_project(project_id):
+    """Recompute the whole project and store what changed. Returns the number of rows written."""
+    finish, results = compute(load_project(project_id))
+    with transaction.atomic():
+        existing = TaskSchedule.objects.filter(project_id=project_id).values_list("task_id", *SCHEDULE_FIELDS[:4])
+        stale = []
+        for task_id, *dates in existing.iterator(chunk_size=5000):
+            values = results.get(task_id)
+            if values is None:
+                stale.append(task_id)
+            elif values == tuple(d.toordinal() for d in dates):
+                del results[task_id]
+        for chunk in _chunks(stale):
+            TaskSchedule.objects.filter(task_id__in=chunk).delete()
+        _save(project_id, results)
+    return len(results)
+
+
+def _reachable(seeds, from_field, to_field):
+    """Seeds plus every task reachable over links from_field -> to_field (one recursive query)."""
+    seen = set(seeds)
+    table = TaskDependency._meta.db_table
+    with connection.cursor() as cursor:
+        for chunk in _chunks(seeds):
+            cursor.execute(
+                f"WITH RECURSIVE reach(id) AS ("
+                f"SELECT {from_field} FROM {table} WHERE {from_field} IN ({', '.join(['%s'] * len(chunk))}) "
+                f"UNION SELECT d.{to_field} FROM {table} d JOIN reach r ON d.{from_field} = r.id"
+                f") SELECT id FROM reach",
+                chunk,
+            )
+            seen.update(row[0] for row in cursor.fetchall())
+    return seen
+
+
+def _links(field, ids):
+    """(predecessor, successor, lag) of the links whose `field` is one of ids."""
+    links = []
+    for chunk in _chunks(ids):
+        rows = TaskDependency.objects.filter(**{f"{field}__in": chunk})
+        links.extend(rows.values_list("predecessor_id", "successor_id", "lag_days"))
+    return links
+
+
+class _Propagation:
+    """
+    Stored schedule of the tasks touched by an edit plus the values recomputed so
+    far. Rows are loaded in batches, one wave of tasks at a time.
+    """
+
+    def __init__(self, project_id):
+        self.project_id = project_id
+        self.start = {}     # task id -> earliest allowed start (ordinal)
+        self.length = {}    # task id -> duration in days
+        self.stored = {}
+        self.new = {}       # task id -> [es, ef, ls, lf]
+        self.missing = False
+
+    def load(self, ids):
+        ids = [i for i in ids if i not in self.start]
+        for chunk in _chunks(ids):
+            rows = Task.objects.filter(id__in=chunk, module__project_id=self.project_id)
+            for task_id, start, end in rows.values_list("id", "start_date", "end_date"):
+                self.start[task_id] = start.toordinal()
+                self.length[task_id] = duration(start, end)
+        self.stored.update(_stored([i for i in ids if i in self.start]))
+
+    def current(self, task_id, first, second):
+        """The pair as last computed (or stored), None for a task never scheduled."""
+        if task_id not in self.stored and (task_id not in self.new or self.new[task_id][first] is None):
+            return None
+        return self.value(task_id, first), self.value(task_id, second)
+
+    def value(self, task_id, index):
+        if task_id in self.new and self.new[task_id][index] is not None:
+            return self.new[task_id][index]
+        if task_id not in self.stored:
+            self.missing = True
+            return None
+        return self.stored[task_id][index]
+
+    def run(self, seeds, direction):
+        """
+        Recompute early (direction "forward") or late ("backward") dates starting at
+        seeds, following links only from tasks whose dates actually changed.
+        """
+        forward_pass = direction == "forward"
+        inbound, outbound = ("successor_id", "predecessor_id") if forward_pass else ("predecessor_id", "successor_id")
+        wave = set(seeds)
+        while wave and not self.missing:
+            self.load(wave)
+            wave &= self.start.keys()
+            inputs = defaultdict(list)
+            for p, s, lag in _links(inbound, wave):
+                if forward_pass:
+                    inputs[s].append((p, lag))
+                else:
+                    inputs[p].append((s, lag))
+            self.load({n for links in inputs.values() for n, _ in links})
+
+            # tasks of one wave can depend on each other: order them, the rest is read as is
+            within = defaultdict(list)
+            for n, links in inputs.items():
+                for m, lag in links:
+                    if m in wave:
+                        within[m].append((n, lag))
+            changed = []
+            for n in topological_order(wave, within):
+                length = self.length[n]
+                values = self.new.setdefault(n, [None] * 4)
+                if forward_pass:
+                    es = self.start[n]
+                    for p, lag in inputs.get(n, ()):
+                        ef_p = self.value(p, 1)
+                        es = es if ef_p is None else max(es, ef_p + 1 + lag)
+                    before = self.current(n, 0, 1)
+                    values[0], values[1] = es, es + length - 1
+                    after = (values[0], values[1])
+                else:
+                    lf = self.finish
+                    for s, lag in inputs.get(n, ()):
+                        ls_s = self.value(s, 2)
+                        lf = lf if ls_s is None else min(lf, ls_s - 1 - lag)
+                    before = self.current(n, 2, 3)
+                    values[2], values[3] = lf - length + 1, lf
+                    after = (values[2], values[3])
+                if after != before:
+                    changed.append(n)
+            self.missing = self.missing or any(n not in self.stored and n not in seeds for n in wave)
+            wave = {m for p, s, _ in _links(outbound, changed) for m in ((s,) if forward_pass else (p,))}
+
+
+def reschedule(project_id, downstream_of=(), upstream_of=()):
+    """
+    Apply edits: early dates are recomputed downstream of `downstream_of` (tasks whose
+    dates or incoming links changed), late dates upstream of `upstream_of` (tasks
+    whose duration or outgoing links changed), in both cases only as far as values
+    actually change. Falls back to schedule_project when stored values are missing
+    or the project finish moves. Returns the number of tasks written.
+    """
+    old_finish = TaskSchedule.objects.filter(project_id=project_id).aggregate(finish=Max("late_finish"))["finish"]
+    if old_finish is None:
+        return schedule_project(project_id)
+
+    state = _Propagation(project_id)
+    state.run(downstream_of, "forward")
+    if state.missing:
+        return schedule_project(project_id)
+
+    shifted = {n for n, v in state.new.items() if v[1] is not None}
+    finish = max((state.new[n][1] for n in shifted), default=0)
+    latest = TaskSchedule.objects.filter(project_id=project_id).order_by("-early_finish")
+    for task_id, ef in latest.values_list("task_id", "early_finish")[:len(shifted) + 1]:
+        if task_id not in shifted:
+            finish = max(finish, ef.toordinal())
+            break
+    if finish != old_finish.toordinal():
+        return schedule_project(project_id)
+
+    state.finish = finish
+    state.run(upstream_of, "backward")
+    if state.missing:
+        return schedule_project(project_id)
+
+    results = {}
+    for n in state.new:
+        if n not in state.start:
+            continue
+        values = tuple(state.value(n, i) for i in range(4))
+        if state.missing:
+            return schedule_project(project_id)
+        if state.stored.get(n) != values:
+            results[n] = values
+    _save(project_id, results)
+    return len(results)
+
+
+# ---------------- applying edits after commit ----------------
+_pending = threading.local()
+
+
+def mark(project_id, downstream_of=(), upstream_of=(), full=False):
+    """
+    Queue an edit of a project's graph; it is applied once the transaction commits,
+    together with the other edits of the same transaction.
+    """
+    if not project_id:
+        return
+    projects = getattr(_pending, "projects", None)
+    if projects is None:
+        projects = _pending.projects = {}
+    entry = projects.setdefault(project_id, {"downstream_of": set(), "upstream_of": set(), "full": False})
+    entry["downstream_of"].update(downstream_of)
+    entry["upstream_of"].update(upstream_of)
+    entry["full"] = entry["full"] or full
+    # every mark registers a callback, the first one to run takes all pending edits
+    # (edits left over from a rolled back transaction only cause a harmless recompute)
+    transaction.on_commit(apply_pending)
+
+
+def apply_pending():
+    projects = getattr(_pending, "projects", None)
+    _pending.projects = None
+    for project_id, entry in (projects or {}).items():
+        try:
+            if entry["full"]:
+                schedule_project(project_id)
+            else:
+                reschedule(project_id, entry["downstream_of"], entry["upstream_of"])
+        except Exception:
+            # the edit itself is committed; the schedule is fixed by the next full run
+            logger.exception("Rescheduling project %s failed", project_id)
+
+
+# ---------------- reads / validation ----------------
+def would_create_cycle(predecessor_id, successor_id):
+    """True if successor already leads to predecessor (or they are the same task)."""
+    return predecessor_id == successor_id or predecessor_id in _reachable({successor_id}, "predecessor_id", "successor_id")
+
+
+def critical_path(project_id):
+    """Critical task ids in schedule order."""
+    rows = TaskSchedule.objects.filter(project_id=project_id, critical=True).order_by("early_start", "early_finish", "task_id")
+    return list(rows.values_list("task_id", flat=True))
@@ -0,0 +1,165 @@
+"""
+Full-text search over projects, modules and tasks, backed by an SQLite FTS5 table.
+
+The index lives in one virtual table, pms_search. Each entity maps to a fixed rowid
+(pk * 4 + kind code), so keeping it in sync is an indexed DELETE + INSERT on the
+same connection and transaction as the model write. The table is created after
+migrate (post_migrate in PMS.signals), because virtual tables cannot be declared
+on models. On other database backends every function here is a no-op.
+"""
+import re
+
+from django.db import connection
+
+from .events import project_id_of
+from .models import Project, Module, Task
+
+TABLE = "pms_search"
+
+KINDS = {"project": 1, "module": 2, "task": 3}
+KIND_OF_MODEL = {Project: "project", Module: "module", Task: "task"}
+
+# bm25 column weights: kind, title, body, project_id
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+CHUNK_SIZE = 500
+
+
+def enabled(conn=None):
+    return (conn or connection).vendor == "sqlite"
+
+
+def rowid(kind, pk):
+    return pk * 4 + KINDS[kind]
+
+
+def create_index(conn=None):
+    conn = conn or connection
+    if not enabled(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "kind UNINDEXED, title, body, project_id UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+
+def drop_index(conn=None):
+    conn = conn or connection
+    if enabled(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+# ---------------- keeping the index in sync ----------------
+def _document(kind, obj):
+    """(title, body, project_id) for a model instance."""
+    if kind == "project":
+        return obj.name, obj.description or "", obj.pk
+    if kind == "module":
+        return obj.name, obj.description or "", obj.project_id
+    return obj.title, obj.description or "", project_id_of(obj)
+
+
+def index_instance(obj):
+    if not enabled():
+        return
+    kind = KIND_OF_MODEL[type(obj)]
+    title, body, project_id = _document(kind, obj)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [rowid(kind, obj.pk)])
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, kind, title, body, project_id) VALUES (%s, %s, %s, %s, %s)",
+            [rowid(kind, obj.pk), kind, title, body, project_id],
+        )
+
+
+def remove(kind, pks):
+    if not enabled():
+        return
+    ids = [rowid(kind, pk) for pk in pks]
+    with connection.cursor() as cursor:
+        for i in range(0, len(ids), CHUNK_SIZE):
+            chunk = ids[i:i + CHUNK_SIZE]
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})", chunk)
+
+
+def _select_sql(kind, where=""):
+    project, module, task = Project._meta.db_table, Module._meta.db_table, Task._meta.db_table
+    code = KINDS[kind]
+    if kind == "project":
+        return (f'SELECT p.id * 4 + {code}, \'project\', p.name, COALESCE(p.description, \'\'), p.id '
+                f'FROM "{project}" p {where.format(alias="p")}')
+    if kind == "module":
+        return (f'SELECT m.id * 4 + {code}, \'module\', m.name, COALESCE(m.description, \'\'), m.project_id '
+                f'FROM "{module}" m {where.format(alias="m")}')
+    return (f'SELECT t.id * 4 + {code}, \'task\', t.title, COALESCE(t.description, \'\'), m.project_id '
+            f'FROM "{task}" t JOIN "{module}" m ON m.id = t.module_id {where.format(alias="t")}')
+
+
+def reindex(kind, pks):
+    """Re-index rows by pk straight from the tables (used after bulk writes)."""
+    if not enabled():
+        return
+    pks = list(pks)
+    remove(kind, pks)
+    with connection.cursor() as cursor:
+        for i in range(0, len(pks), CHUNK_SIZE):
+            chunk = pks[i:i + CHUNK_SIZE]
+            where = "WHERE {alias}.id IN (" + ", ".join(["%s"] * len(chunk)) + ")"
+            cursor.execute(f"INSERT INTO {TABLE} (rowid, kind, title, body, project_id) " + _select_sql(kind, where), chunk)
+
+
+def rebuild():
+    """Drop and refill the whole index with one INSERT ... SELECT per entity type."""
+    if not enabled():
+        return
+    drop_index()
+    create_index()
+    with connection.cursor() as cursor:
+        for kind in KINDS:
+            cursor.execute(f"INSERT INTO {TABLE} (rowid, kind, title, body, project_id) " + _select_sql(kind))
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+
+# ---------------- querying ----------------
+def match_expression(text):
+    """
+    User text -> FTS5 query: every word must match, each as a prefix
+    ("fix log" finds "Fix login"). Quoting keeps FTS operators out of user input.
+    """
+    terms = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def search(text, kinds=None, project_id=None, limit=20):
+    """Ranked hits: [{"type", "id", "title", "snippet", "project", "score"}]."""
+    expression = match_expression(text)
+    if not enabled() or not expression:
+        return []
+    sql = (
+        f"SELECT rowid, kind, title, snippet({TABLE}, 2, '[', ']', '…', 12), project_id, "
+        f"bm25({TABLE}, 0, {TITLE_WEIGHT}, {BODY_WEIGHT}, 0) AS rank "
+        f"FROM {TABLE} WHERE {TABLE} MATCH %s"
+    )
+    # rows of projects queued for deletion stay in the index until their chunk is deleted
+    sql += f' AND project_id NOT IN (SELECT id FROM "{Project._meta.db_table}" WHERE deleting)'
+    params = [expression]
+    if kinds:
+        sql += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+        params += list(kinds)
+    if project_id:
+        sql += " AND project_id = %s"
+        params.append(int(project_id))
+    sql += " ORDER BY rank LIMIT %s"
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {"type": kind, "id": rid // 4, "title": title, "snippet": snippet, "project": project, "score": round(-rank, 4)}
+        for rid, kind, title, snippet, project, rank in rows
+    ]
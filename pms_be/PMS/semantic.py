@@ -0,0 +1,458 @@
+"""
+Semantic search over modules and tasks: their text is embedded (PMS_EMBEDDER) and
+matched against the embedded query by cosine similarity, so "which tasks are about
+payments" finds "Stripe checkout" without sharing a keyword with it.
+
+Vectors are stored in Embedding rows (float32 bytes keyed by the search rowid) and
+held in memory in one contiguous float32 matrix per process (VectorIndex). A query
+is a matrix-vector product plus argpartition for the top k. Scoring is bound by
+memory bandwidth (the whole matrix is read per product), so queries that arrive
+while one is being scored are answered together by the next matrix-matrix product
+(QueryBatcher): under load each query costs a fraction of a full pass.
+
+Keeping it current is incremental at every step:
+- a write that changes a title / name or description deletes the row's Embedding,
+  a delete drops it; a missing Embedding means "to embed";
+- update_index() embeds only the rows without an Embedding, PMS_SEMANTIC_BATCH_SIZE
+  texts per call. `manage.py update_embeddings` walks each table once along the
+  primary key. With PMS_SEMANTIC_AUTO_UPDATE (off by default: the "ollama"
+  embedder needs OLLAMA_EMBED_MODEL pulled first) a background thread embeds,
+  shortly after commits, just the ids the process wrote (update_pending());
+- each process's matrix only loads Embedding rows with a higher id than it has
+  seen. Vectors of rows deleted by another process are skipped when hits are
+  looked up.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+import weakref
+
+import numpy as np
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Exists, OuterRef
+from django.utils.module_loading import import_string
+
+from . import admission, ollama, search
+from .models import Embedding, Module, Task
+
+logger = logging.getLogger(__name__)
+
+MODELS = {"module": Module, "task": Task}
+TEXT_FIELDS = {"module": {"name", "description"}, "task": {"title", "description"}}
+TITLE_FIELD = {"module": "name", "task": "title"}
+
+LOAD_CHUNK = 10000
+# cap on the (queries x vectors) score matrix of one batched product
+MAX_SCORE_CELLS = 32 * 1024 * 1024
+# candidates looked up per requested hit, to make up for rows deleted meanwhile
+OVERFETCH = 2
+
+
+def normalized(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+# ---------------- embedders ----------------
+class HashingEmbedder:
+    """
+    Deterministic local embedder: words and their character trigrams hashed into
+    `dim` signed buckets (feature hashing). Needs no model, so tests and offline
+    setups get stable vectors; it matches shared words and word pieces, not meaning.
+    """
+
+    def __init__(self, dim=None):
+        self.dim = dim or getattr(settings, "PMS_EMBEDDING_DIM", 256)
+        self.name = f"hashing-{self.dim}"
+
+    @staticmethod
+    def features(text):
+        for word in re.findall(r"\w+", text.lower()):
+            yield word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+
+    def vectors(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self.features(text):
+                h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += weight if h >> 63 else -weight
+        return normalized(out)
+
+    async def embed(self, texts, priority="batch"):
+        return self.vectors(texts)
+
+
+class OllamaEmbedder:
+    """Ollama's /api/embed with OLLAMA_EMBED_MODEL, through the admission queue."""
+
+    def __init__(self, model_name=None):
+        self.model_name = model_name or getattr(settings, "OLLAMA_EMBED_MODEL", "nomic-embed-text")
+        self.name = f"ollama:{self.model_name}"
+
+    async def embed(self, texts, priority="batch"):
+        return normalized(await ollama.embed(texts, self.model_name, priority=priority))
+
+
+EMBEDDERS = {"ollama": OllamaEmbedder, "hashing": HashingEmbedder}
+_embedders = {}
+
+
+def embedder():
+    """The configured embedder: a name from EMBEDDERS or the dotted path of a class."""
+    name = getattr(settings, "PMS_EMBEDDER", "ollama")
+    if name not in _embedders:
+        _embedders[name] = EMBEDDERS[name]() if name in EMBEDDERS else import_string(name)()
+    return _embedders[name]
+
+
+# ---------------- in-memory index ----------------
+class VectorIndex:
+    """
+    Keys (int64) and unit vectors (float32 rows of one matrix), grown by doubling.
+    Removing a key moves the last row into its place, so rows stay contiguous.
+    Thread safe.
+    """
+
+    def __init__(self, model=None):
+        self._lock = threading.Lock()
+        self.reset(model)
+
+    def reset(self, model=None):
+        with self._lock:
+            self.model = model
+            self.dim = None
+            self.size = 0
+            self.loaded_through = 0  # highest Embedding id loaded
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+            self._keys = np.zeros(0, dtype=np.int64)
+            self._rows = {}
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, size):
+        if size <= len(self._keys):
+            return
+        capacity = max(size, 2 * len(self._keys), 1024)
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        keys = np.zeros(capacity, dtype=np.int64)
+        matrix[:self.size] = self._matrix[:self.size]
+        keys[:self.size] = self._keys[:self.size]
+        self._matrix, self._keys = matrix, keys
+
+    def add(self, keys, vectors, through=None):
+        """Insert or replace vectors by key."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+            rows = np.empty(len(keys), dtype=np.int64)
+            size = self.size
+            for i, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is None:
+                    row = self._rows[key] = size
+                    size += 1
+                rows[i] = row
+            self._reserve(size)
+            self._keys[rows] = keys
+            self._matrix[rows] = vectors
+            self.size = size
+            if through is not None:
+                self.loaded_through = max(self.loaded_through, through)
+
+    def remove(self, keys):
+        with self._lock:
+            for key in keys:
+                row = self._rows.pop(key, None)
+                if row is None:
+                    continue
+                last = self.size - 1
+                if row != last:
+                    moved = int(self._keys[last])
+                    self._keys[row] = moved
+                    self._matrix[row] = self._matrix[last]
+                    self._rows[moved] = row
+                self.size = last
+
+    def search(self, queries, k, codes=None):
+        """
+        Top k (key, score) per query row, best first. codes limits the hits to
+        those kind codes (key % 4, see search.rowid).
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            n = self.size
+            if not n or k <= 0:
+                return [[] for _ in queries]
+            matrix, keys = self._matrix[:n], self._keys[:n]
+            excluded = None
+            if codes:
+                excluded = ~np.isin(keys & 3, list(codes))
+            k = min(k, n)
+            results = []
+            step = max(1, MAX_SCORE_CELLS // n)
+            for start in range(0, len(queries), step):
+                scores = queries[start:start + step] @ matrix.T
+                if excluded is not None:
+                    scores[:, excluded] = -np.inf
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                for row, candidates in zip(scores, top):
+                    ordered = candidates[np.argsort(-row[candidates], kind="stable")]
+                    results.append([(int(keys[i]), float(row[i])) for i in ordered if row[i] > -np.inf])
+            return results
+
+
+index = VectorIndex()
+
+
+class QueryBatcher:
+    """
+    Coalesces the concurrent queries of one event loop: whatever arrives while a
+    batch is being scored (in a worker thread) is scored together next.
+    """
+
+    def __init__(self, vector_index):
+        self.index = vector_index
+        self._pending = []  # (vector, k, codes, future)
+        self._drain_task = None
+        self.batches = self.queries = 0
+
+    async def search(self, vector, k, codes=None):
+        """Top k (key, score) for one query vector, like VectorIndex.search."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((vector, k, tuple(codes or ()), future))
+        if self._drain_task is None:
+            self._drain_task = asyncio.create_task(self._drain())
+        return await future
+
+    async def _drain(self):
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                groups = {}
+                for item in batch:
+                    groups.setdefault(item[2], []).append(item)
+                for codes, items in groups.items():
+                    self.batches += 1
+                    self.queries += len(items)
+                    try:
+                        results = await asyncio.to_thread(
+                            self.index.search, np.stack([v for v, _, _, _ in items]), max(k for _, k, _, _ in items),
+                            list(codes) or None,
+                        )
+                    except Exception as e:
+                        for _, _, _, future in items:
+                            if not future.done():
+                                future.set_exception(e)
+                        continue
+                    for (_, k, _, future), result in zip(items, results):
+                        if not future.done():
+                            future.set_result(result[:k])
+        finally:
+            self._drain_task = None
+
+
+_batchers = weakref.WeakKeyDictionary()
+
+
+def batcher():
+    """The QueryBatcher of the running event loop over the process index."""
+    loop = asyncio.get_running_loop()
+    if loop not in _batchers:
+        _batchers[loop] = QueryBatcher(index)
+    return _batchers[loop]
+
+
+def refresh():
+    """Load the Embedding rows this process hasn't seen yet (for the current embedder)."""
+    name = embedder().name
+    if index.model != name:
+        index.reset(name)
+    while True:
+        rows = list(
+            Embedding.objects.filter(model=name, id__gt=index.loaded_through)
+            .order_by("id").values_list("id", "key", "vector")[:LOAD_CHUNK]
+        )
+        if not rows:
+            return
+        vectors = np.frombuffer(b"".join(bytes(v) for _, _, v in rows), dtype=np.float32).reshape(len(rows), -1)
+        index.add([key for _, key, _ in rows], vectors, through=rows[-1][0])
+
+
+# ---------------- keeping the embeddings current ----------------
+# ids written in this process since the last background pass, per kind
+_dirty = {kind: set() for kind in MODELS}
+_dirty_lock = threading.Lock()
+
+
+def auto_update():
+    return getattr(settings, "PMS_SEMANTIC_AUTO_UPDATE", False)
+
+
+def changed(kind, pks, created=False):
+    """Rows were written: drop embeddings of changed text and embed after commit."""
+    pks = list(pks)
+    if not created:
+        Embedding.objects.filter(key__in=[search.rowid(kind, pk) for pk in pks]).delete()
+    if auto_update():
+        transaction.on_commit(lambda: _queue(kind, pks))
+
+
+def _queue(kind, pks):
+    with _dirty_lock:
+        _dirty[kind].update(pks)
+    schedule()
+
+
+def remove(kind, pks):
+    if kind not in MODELS:
+        return
+    keys = [search.rowid(kind, pk) for pk in pks]
+    Embedding.objects.filter(key__in=keys).delete()
+    index.remove(keys)
+
+
+def _missing(kind, limit, after=0, ids=None):
+    """(pk, text) of up to `limit` rows without an embedding, by pk after `after` (and among `ids`)."""
+    model = MODELS[kind]
+    embedded = Embedding.objects.filter(key=OuterRef("id") * 4 + search.KINDS[kind])
+    rows = model.objects.filter(~Exists(embedded), id__gt=after)
+    if ids is not None:
+        rows = rows.filter(id__in=ids)
+    rows = rows.order_by("id").values_list("id", TITLE_FIELD[kind], "description")[:limit]
+    return [(pk, f"{title}\n{description or ''}".strip()) for pk, title, description in rows]
+
+
+def update_index(pks=None):
+    """
+    Embed the modules and tasks that have no embedding yet, all of them or only
+    those among pks ({kind: ids}). Returns how many were embedded.
+    """
+    return async_to_sync(_update_index)(pks)
+
+
+async def _update_index(pks):
+    # one event loop for the whole pass, so every batch shares the loop's pooled
+    # Ollama client, which is closed before the loop goes away
+    current = embedder()
+    batch_size = getattr(settings, "PMS_SEMANTIC_BATCH_SIZE", 64)
+    # vectors of another embedder can't be compared with this one's
+    await sync_to_async(Embedding.objects.exclude(model=current.name).delete)()
+    embedded = 0
+    try:
+        for kind in MODELS:
+            if pks is None:
+                # one walk along the primary key, each batch continues after the last
+                last = 0
+                while batch := await sync_to_async(_missing)(kind, batch_size, after=last):
+                    last = batch[-1][0]
+                    embedded += await _embed(current, kind, batch)
+            else:
+                ids = sorted(pks.get(kind, ()))
+                for i in range(0, len(ids), batch_size):
+                    if batch := await sync_to_async(_missing)(kind, batch_size, ids=ids[i:i + batch_size]):
+                        embedded += await _embed(current, kind, batch)
+    finally:
+        await ollama.aclose()
+    return embedded
+
+
+async def _embed(current, kind, batch):
+    vectors = await current.embed([text for _, text in batch], priority="batch")
+    await sync_to_async(Embedding.objects.bulk_create)(
+        [Embedding(key=search.rowid(kind, pk), model=current.name, vector=v.tobytes())
+         for (pk, _), v in zip(batch, vectors)],
+        ignore_conflicts=True,
+    )
+    return len(batch)
+
+
+def update_pending():
+    """Embed the rows this process wrote since the last pass; they stay queued if it fails."""
+    with _dirty_lock:
+        pending = {kind: ids for kind, ids in _dirty.items() if ids}
+        for kind in pending:
+            _dirty[kind] = set()
+    try:
+        return update_index(pending)
+    except Exception:
+        with _dirty_lock:
+            for kind, ids in pending.items():
+                _dirty[kind].update(ids)
+        raise
+
+
+_wake = threading.Event()
+_updater = None
+_updater_lock = threading.Lock()
+
+
+def schedule():
+    """Run update_pending() in the background thread PMS_SEMANTIC_UPDATE_DELAY seconds from now."""
+    global _updater
+    if not auto_update():
+        return
+    with _updater_lock:
+        if _updater is None:
+            _updater = threading.Thread(target=_run_updater, name="pms-embeddings", daemon=True)
+            _updater.start()
+    _wake.set()
+
+
+def _run_updater():
+    while True:
+        _wake.wait()
+        # let a burst of writes settle into one pass
+        time.sleep(getattr(settings, "PMS_SEMANTIC_UPDATE_DELAY", 1.0))
+        _wake.clear()
+        close_old_connections()
+        try:
+            update_pending()
+        except (DatabaseError, ollama.OllamaError, admission.Rejected) as e:
+            # the rows stay queued and are picked up by the next pass
+            logger.warning("Updating embeddings failed: %s", e)
+
+
+# ---------------- querying ----------------
+def _hits(scored, limit):
+    pks = {kind: [key // 4 for key, _ in scored if key % 4 == search.KINDS[kind]] for kind in MODELS}
+    found = {
+        "task": {t["id"]: (t["title"], t["module__project_id"])
+                 for t in Task.objects.filter(id__in=pks["task"], module__project__deleting=False)
+                 .values("id", "title", "module__project_id")},
+        "module": {m["id"]: (m["name"], m["project_id"])
+                   for m in Module.objects.filter(id__in=pks["module"], project__deleting=False)
+                   .values("id", "name", "project_id")},
+    }
+    kind_of_code = {code: kind for kind, code in search.KINDS.items()}
+    results = []
+    for key, score in scored:
+        kind, pk = kind_of_code[key % 4], key // 4
+        if pk not in found[kind]:
+            continue
+        title, project = found[kind][pk]
+        results.append({"type": kind, "id": pk, "title": title, "project": project, "score": round(score, 4)})
+        if len(results) == limit:
+            break
+    return results
+
+
+async def semantic_search(text, kinds=None, limit=20):
+    """Modules / tasks closest to the text: [{"type", "id", "title", "project", "score"}]."""
+    vector = (await embedder().embed([text], priority="interactive"))[0]
+    await sync_to_async(refresh)()
+    codes = [search.KINDS[k] for k in kinds] if kinds else None
+    scored = await batcher().search(vector, limit * OVERFETCH, codes)
+    return await sync_to_async(_hits)(scored, limit)
@@ -1,19 +1,76 @@
 from rest_framework import serializers
 from .models import *
+from . import scheduling
+
+# task counters maintained by PMS.rollups, never written by clients
+ROLLUP_READ_ONLY = ("tasks_total", "tasks_todo", "tasks_in_progress", "tasks_review", "tasks_completed")
+
 
 class ProjectSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+
     class Meta:
         model = Project
         fields = "__all__"
+        read_only_fields = ROLLUP_READ_ONLY + ("deleting",)
 
 
 class ModuleSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+
     class Meta:
         model = Module
         fields = "__all__"
+        read_only_fields = ROLLUP_READ_ONLY
 
 
 class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = "__all__"
+
+
+class TaskDependencySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaskDependency
+        fields = "__all__"
+
+    def validate(self, attrs):
+        predecessor, successor = attrs["predecessor"], attrs["successor"]
+        if predecessor.module.project_id != successor.module.project_id:
+            raise serializers.ValidationError("Both tasks must belong to the same project")
+        if scheduling.would_create_cycle(predecessor.id, successor.id):
+            raise serializers.ValidationError("This dependency would create a cycle")
+        return attrs
+
+
+# ------------- Nested tree (read only) -------------
+class ModuleTreeSerializer(ModuleSerializer):
+    tasks = TaskSerializer(many=True, read_only=True)
+
+
+class ProjectTreeSerializer(ProjectSerializer):
+    modules = ModuleTreeSerializer(many=True, read_only=True)
+
+
+# ------------- Bulk writes -------------
+# Foreign keys are plain ids here; PMS.bulk checks them for the whole batch in one
+# query per relation instead of one lookup per item.
+class BulkModuleSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+    project = serializers.IntegerField(source="project_id")
+    assigned_to = serializers.IntegerField(source="assigned_to_id", required=False, allow_null=True)
+
+    class Meta:
+        model = Module
+        fields = ["id", "project", "name", "description", "start_date", "end_date", "assigned_to"]
+
+
+class BulkTaskSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+    module = serializers.IntegerField(source="module_id")
+    assigned_to = serializers.IntegerField(source="assigned_to_id", required=False, allow_null=True)
+
+    class Meta:
+        model = Task
+        fields = ["id", "module", "title", "description", "assigned_to", "start_date", "end_date", "priority", "status"]
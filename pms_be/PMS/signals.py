@@ -0,0 +1,281 @@
+from collections import defaultdict
+
+from django.db import connections, transaction
+from django.db.models.signals import post_init, post_save, post_delete, post_migrate
+from django.dispatch import receiver
+
+from . import analytics, events, rollups, scheduling, search, semantic, workload
+from .models import Project, Module, Task, TaskQuerySet, TaskDependency, CollectionVersion, tasks_bulk_changed
+
+
+@receiver(post_init, sender=Project)
+@receiver(post_init, sender=Module)
+@receiver(post_init, sender=Task)
+def remember_loaded_values(sender, instance, **kwargs):
+    instance.remember_loaded_values()
+
+
+# ---------------- Task rollup counters ----------------
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        rollups.task_added(instance.module_id, instance.status)
+        return
+    old_module_id = instance._loaded_values.get("module_id")
+    old_status = instance._loaded_values.get("status")
+    if old_module_id is None or old_status is None:
+        # loaded without these fields; fall back to recounting
+        rollups.refresh_modules({old_module_id, instance.module_id})
+    else:
+        rollups.task_changed(old_module_id, old_status, instance.module_id, instance.status)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    rollups.task_removed(
+        instance._loaded_values.get("module_id") or instance.module_id,
+        instance._loaded_values.get("status") or instance.status,
+    )
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def tasks_bulk_saved(sender, module_ids, created=None, fields=None, **kwargs):
+    if created is not None:
+        rollups.tasks_created(created)
+    elif fields is None or TaskQuerySet.ROLLUP_FIELDS & fields:
+        rollups.refresh_modules(module_ids)
+
+
+# ---------------- modules moved between projects ----------------
+@receiver(post_save, sender=Module)
+def module_moved(sender, instance, created, raw=False, **kwargs):
+    old_project = instance._loaded_values.get("project_id")
+    if raw or created or old_project in (None, instance.project_id):
+        return
+    # the module's counters and tasks go with it
+    projects = {old_project, instance.project_id}
+    rollups.refresh_projects(projects)
+    analytics.snapshot({p: {} for p in projects})
+    # task rows carry their project for filtering
+    search.reindex("task", Task.objects.filter(module_id=instance.pk).values_list("id", flat=True))
+    for project_id in projects:
+        scheduling.mark(project_id, full=True)
+
+
+# ---------------- full-text search index ----------------
+@receiver(post_migrate)
+def create_search_index(sender, using="default", **kwargs):
+    if sender.name == "PMS":
+        search.create_index(connections[using])
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Module)
+@receiver(post_save, sender=Task)
+def index_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_instance(instance)
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Module)
+@receiver(post_delete, sender=Task)
+def unindex_deleted(sender, instance, **kwargs):
+    search.remove(search.KIND_OF_MODEL[sender], [instance.pk])
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def reindex_bulk_tasks(sender, task_ids, **kwargs):
+    search.reindex("task", task_ids)
+
+
+# ---------------- semantic search embeddings ----------------
+@receiver(post_save, sender=Module)
+@receiver(post_save, sender=Task)
+def embedding_saved(sender, instance, created, raw=False, **kwargs):
+    kind = search.KIND_OF_MODEL[sender]
+    if not raw and (created or semantic.TEXT_FIELDS[kind] & instance.changed_values().keys()):
+        semantic.changed(kind, [instance.pk], created)
+
+
+@receiver(post_delete, sender=Module)
+@receiver(post_delete, sender=Task)
+def embedding_deleted(sender, instance, **kwargs):
+    semantic.remove(search.KIND_OF_MODEL[sender], [instance.pk])
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def embeddings_bulk_changed(sender, task_ids, created=None, fields=None, **kwargs):
+    if created is not None:
+        semantic.changed("task", task_ids, created=True)
+    elif semantic.TEXT_FIELDS["task"] & fields:
+        semantic.changed("task", task_ids)
+
+
+# ---------------- collection version stamps (conditional GET) ----------------
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Module)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Module)
+@receiver(post_delete, sender=Task)
+def touch_collection(sender, raw=False, **kwargs):
+    if not raw:
+        CollectionVersion.touch(sender)
+
+
+# ---------------- board change events ----------------
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Module)
+@receiver(post_save, sender=Task)
+def record_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        events.instance_saved(instance, created)
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Module)
+@receiver(post_delete, sender=Task)
+def record_deleted(sender, instance, **kwargs):
+    events.instance_deleted(instance)
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def record_bulk_tasks(sender, task_ids, created=None, **kwargs):
+    events.rows_written(Task, task_ids, created=created is not None)
+
+
+# ---------------- cached workloads ----------------
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_workload_changed(sender, instance, signal, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = instance._loaded_values
+    user_ids = {loaded.get("assigned_to_id"), instance.assigned_to_id}
+    counts_changed = (
+        created or signal is post_delete
+        or loaded.get("status") != instance.status or loaded.get("module_id") != instance.module_id
+    )
+    if counts_changed:
+        # the module's open / overdue state may have changed for its assignee too
+        module_ids = {loaded.get("module_id"), instance.module_id}
+        user_ids |= set(Module.objects.filter(id__in=[m for m in module_ids if m]).values_list("assigned_to_id", flat=True))
+    # after commit, or a concurrent read could cache the old counts again
+    transaction.on_commit(lambda: workload.invalidate(*user_ids))
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def module_workload_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        user_ids = (instance._loaded_values.get("assigned_to_id"), instance.assigned_to_id)
+        transaction.on_commit(lambda: workload.invalidate(*user_ids))
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def bulk_workload_changed(sender, **kwargs):
+    transaction.on_commit(workload.invalidate_all)
+
+
+# ---------------- critical path schedule ----------------
+SCHEDULE_INPUTS = {"start_date", "end_date", "module_id"}
+
+
+@receiver(post_save, sender=Task)
+def task_schedule_changed(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = instance._loaded_values
+    if not created and not any(loaded.get(f) != getattr(instance, f) for f in SCHEDULE_INPUTS):
+        return
+    project_id = events.project_id_of(instance)
+    if not created and loaded.get("module_id") != instance.module_id:
+        old_project = Module.objects.filter(id=loaded.get("module_id")).values_list("project_id", flat=True).first()
+        if old_project != project_id:
+            scheduling.mark(old_project, full=True)
+            scheduling.mark(project_id, full=True)
+            return
+    scheduling.mark(project_id, downstream_of={instance.pk}, upstream_of={instance.pk})
+
+
+@receiver(post_delete, sender=Task)
+def task_unscheduled(sender, instance, **kwargs):
+    # its links go first (cascade), their receivers queue the neighbours; this only
+    # rechecks the project finish
+    scheduling.mark(events.project_id_of(instance))
+
+
+@receiver(post_save, sender=TaskDependency)
+@receiver(post_delete, sender=TaskDependency)
+def dependency_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    project_id = Task.objects.filter(id=instance.successor_id).values_list("module__project_id", flat=True).first()
+    scheduling.mark(project_id, downstream_of={instance.successor_id}, upstream_of={instance.predecessor_id})
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def bulk_schedule_changed(sender, module_ids, task_ids, created=None, fields=None, **kwargs):
+    if created is None and not SCHEDULE_INPUTS & fields:
+        return
+    if created is None and "module_id" in fields:
+        # tasks may have changed projects
+        for project_id in set(Module.objects.filter(id__in=module_ids).values_list("project_id", flat=True)):
+            scheduling.mark(project_id, full=True)
+        return
+    # new tasks have no links yet and edited ones keep theirs, so only what is
+    # downstream / upstream of them moves (an import doesn't recompute the project per batch)
+    by_project = defaultdict(set)
+    if created is not None:
+        projects = dict(Module.objects.filter(id__in=module_ids).values_list("id", "project_id"))
+        for task in created:
+            by_project[projects.get(task.module_id)].add(task.pk)
+    else:
+        task_ids = list(task_ids)
+        for i in range(0, len(task_ids), scheduling.CHUNK_SIZE):
+            rows = Task.objects.filter(id__in=task_ids[i:i + scheduling.CHUNK_SIZE]).values_list("id", "module__project_id")
+            for task_id, project_id in rows:
+                by_project[project_id].add(task_id)
+    for project_id, ids in by_project.items():
+        scheduling.mark(project_id, downstream_of=ids, upstream_of=ids)
+
+
+# ---------------- status history / daily snapshots ----------------
+# registered after the rollup receivers, so the snapshot copies up to date counters
+@receiver(post_save, sender=Task)
+def task_status_recorded(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    project_id = events.project_id_of(instance)
+    loaded = instance._loaded_values
+    if created:
+        analytics.record([(instance.pk, project_id, None, instance.status)])
+        return
+    if loaded.get("status") is not None and loaded["status"] != instance.status:
+        analytics.record([(instance.pk, project_id, loaded["status"], instance.status)])
+    if loaded.get("module_id") not in (None, instance.module_id):
+        # moved between modules: both projects' counts may have changed
+        old_project = Module.objects.filter(id=loaded["module_id"]).values_list("project_id", flat=True).first()
+        analytics.snapshot({p: {} for p in (old_project, project_id) if p})
+
+
+@receiver(post_delete, sender=Task)
+def task_status_removed(sender, instance, **kwargs):
+    status = instance._loaded_values.get("status") or instance.status
+    analytics.record([(instance.pk, events.project_id_of(instance), status, None)])
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def bulk_status_recorded(sender, module_ids, task_ids, created=None, fields=None, previous_status=None, **kwargs):
+    if created is not None:
+        projects = dict(Module.objects.filter(id__in=module_ids).values_list("id", "project_id"))
+        analytics.record([(t.pk, projects.get(t.module_id), None, t.status) for t in created])
+    elif previous_status is not None:
+        rows = Task.objects.filter(id__in=previous_status).values_list("id", "module__project_id", "status")
+        analytics.record([(t, p, previous_status[t], s) for t, p, s in rows if previous_status[t] is not None])
+    if created is None and fields is not None and "module_id" in fields:
+        projects = set(Module.objects.filter(id__in=module_ids).values_list("project_id", flat=True))
+        analytics.snapshot({p: {} for p in projects})
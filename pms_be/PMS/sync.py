@@ -0,0 +1,122 @@
+"""
+Delta sync for offline / mobile clients, read from the ChangeEvent log (PMS.events).
+
+A client keeps the seq of the last batch it applied and asks for what happened
+after it. Events in a batch are collapsed per entity: an entity that still exists
+comes back once as an upsert with its current row, a deleted one as a tombstone.
+
+compact() keeps the log bounded: outside the retention window only the newest
+event per entity survives, and old tombstones are dropped. The highest dropped
+tombstone seq is the horizon; a client whose seq is older than that may have
+missed a delete and has to reload instead of syncing.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Q
+from django.utils import timezone
+
+from .events import public_fields
+from .models import Project, Module, Task, ChangeEvent, CollectionVersion
+
+MODEL_OF_ENTITY = {"project": Project, "module": Module, "task": Task}
+# rows of projects queued for deletion count as deleted already
+VISIBLE = {"project": Q(deleting=False), "module": Q(project__deleting=False), "task": Q(module__project__deleting=False)}
+PLURAL = {"project": "projects", "module": "modules", "task": "tasks"}
+
+# CollectionVersion row holding the compaction horizon
+HORIZON = "change_log_horizon"
+DEFAULT_RETENTION_DAYS = 30
+COMPACT_CHUNK = 5000
+FETCH_CHUNK = 500
+
+
+class SyncExpired(Exception):
+    """The requested seq is older than the compaction horizon."""
+
+
+def horizon():
+    return CollectionVersion.objects.filter(name=HORIZON).values_list("version", flat=True).first() or 0
+
+
+def latest_seq():
+    return ChangeEvent.objects.aggregate(seq=Max("id"))["seq"] or 0
+
+
+def _current_rows(entity, ids):
+    model = MODEL_OF_ENTITY[entity]
+    attnames = [f.attname for f in model._meta.concrete_fields]
+    rows = {}
+    ids = list(ids)
+    for i in range(0, len(ids), FETCH_CHUNK):
+        for row in model.objects.filter(VISIBLE[entity], pk__in=ids[i:i + FETCH_CHUNK]).values(*attnames):
+            rows[row["id"]] = public_fields(model, row)
+    return rows
+
+
+def changes_since(since, limit, project_id=None):
+    """
+    One batch of at most `limit` log entries after `since`:
+    {"since", "next_since", "has_more", "upserts": {...}, "deleted": {...}}.
+    Raises SyncExpired when entries after `since` may already be compacted away.
+    """
+    if since and since < horizon():
+        raise SyncExpired(since)
+
+    events = ChangeEvent.objects.filter(id__gt=since)
+    if project_id:
+        events = events.filter(project_id=project_id)
+    # one extra row tells us whether there is another batch
+    page = list(events.order_by("id").values_list("id", "entity", "entity_id", "op")[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    last_op = {}
+    for _, entity, entity_id, op in page:
+        last_op[(entity, entity_id)] = op
+
+    upserts = {PLURAL[e]: [] for e in MODEL_OF_ENTITY}
+    deleted = {PLURAL[e]: [] for e in MODEL_OF_ENTITY}
+    for entity in MODEL_OF_ENTITY:
+        alive = [i for (e, i), op in last_op.items() if e == entity and op != "deleted"]
+        rows = _current_rows(entity, alive)
+        upserts[PLURAL[entity]] = [rows[i] for i in alive if i in rows]
+        # gone since the event was written: the tombstone is further along the log
+        deleted[PLURAL[entity]] = [i for (e, i), op in last_op.items() if e == entity and (op == "deleted" or i not in rows)]
+
+    return {
+        "since": since,
+        "next_since": page[-1][0] if page else since,
+        "has_more": has_more,
+        "upserts": upserts,
+        "deleted": deleted,
+    }
+
+
+def compact(retention_days=DEFAULT_RETENTION_DAYS):
+    """
+    Drop log entries older than the retention window that a syncing client no longer
+    needs. Returns (superseded entries removed, tombstones removed, new horizon).
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    cutoff_id = ChangeEvent.objects.filter(created_at__lt=cutoff).aggregate(seq=Max("id"))["seq"]
+    if not cutoff_id:
+        return 0, 0, horizon()
+
+    newer = ChangeEvent.objects.filter(entity=OuterRef("entity"), entity_id=OuterRef("entity_id"), id__gt=OuterRef("id"))
+    superseded = tombstones = 0
+    new_horizon = horizon()
+    start = ChangeEvent.objects.order_by("id").values_list("id", flat=True).first() or 0
+    # short transactions over id ranges so writers are never blocked for long
+    for low in range(start, cutoff_id + 1, COMPACT_CHUNK):
+        high = min(low + COMPACT_CHUNK - 1, cutoff_id)
+        with transaction.atomic():
+            window = ChangeEvent.objects.filter(id__gte=low, id__lte=high)
+            superseded += window.filter(Exists(newer)).delete()[0]
+            dropped = window.filter(op="deleted")
+            top = dropped.aggregate(seq=Max("id"))["seq"]
+            if top:
+                tombstones += dropped.delete()[0]
+                new_horizon = max(new_horizon, top)
+                CollectionVersion.objects.update_or_create(name=HORIZON, defaults={"version": new_horizon})
+    return superseded, tombstones, new_horizon
@@ -1,3 +1,1208 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import io
+import json
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .consumers import VoiceChatConsumer
+from . import (
+    admission, deadlines, deletion, imports, intents, llm_cache, memory, ollama, rollups, routing, scheduling, search,
+    semantic, sync, workload,
+)
+from .models import (
+    Project, Module, Task, ProjectDailySnapshot, TaskStatusChange, ConversationTurn, UserContext, Embedding,
+    ChangeEvent, TaskDependency, TaskSchedule, tasks_bulk_changed,
+)
+
+User = get_user_model()
+
+IN_MEMORY_CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+class ProjectTreeAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="dev", email="dev@example.com", password="x")
+
+    def make_projects(self, count, modules=3, tasks=4, prefix="P"):
+        for p in range(count):
+            project = Project.objects.create(name=f"{prefix}{p}", start_date=date(2026, 1, 1))
+            for m in range(modules):
+                module = Module.objects.create(project=project, name=f"M{m}", start_date=date(2026, 1, 1))
+                Task.objects.bulk_create([
+                    Task(module=module, title=f"T{t}", start_date=date(2026, 1, 1), assigned_to=self.user if t == 0 else None)
+                    for t in range(tasks)
+                ])
+
+    def fetch_tree(self, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/projects/tree/", params or {})
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(ctx.captured_queries)
+
+    def test_tree_is_nested(self):
+        self.make_projects(1, modules=2, tasks=3)
+        data, _ = self.fetch_tree()
+        self.assertEqual(len(data), 1)
+        self.assertEqual(len(data[0]["modules"]), 2)
+        self.assertEqual(len(data[0]["modules"][0]["tasks"]), 3)
+
+    def test_query_count_is_flat(self):
+        self.make_projects(2)
+        _, small = self.fetch_tree()
+        self.make_projects(20, modules=5, tasks=10, prefix="Q")
+        data, large = self.fetch_tree()
+        self.assertEqual(len(data), 22)
+        self.assertEqual(small, large)
+
+    def test_assignee_filter(self):
+        self.make_projects(3, modules=2, tasks=3)
+        data, _ = self.fetch_tree({"assigned_to": self.user.id})
+        self.assertEqual(len(data), 3)
+        for project in data:
+            for module in project["modules"]:
+                self.assertEqual([t["assigned_to"] for t in module["tasks"]], [self.user.id])
+
+    def test_non_numeric_ids_are_rejected(self):
+        for params in ({"id": "abc"}, {"assigned_to": "me"}):
+            self.assertEqual(self.client.get("/api/projects/tree/", params).status_code, 400)
+
+
+class BoardSummaryAPITests(TestCase):
+    def test_counts_and_overdue(self):
+        project = Project.objects.create(name="P", start_date=date(2026, 1, 1))
+        module = Module.objects.create(project=project, name="M", start_date=date(2026, 1, 1))
+        yesterday = timezone.localdate() - timedelta(days=1)
+        Task.objects.create(module=module, title="late", start_date=date(2026, 1, 1), end_date=yesterday, priority="high")
+        Task.objects.create(module=module, title="done", start_date=date(2026, 1, 1), end_date=yesterday, status="completed")
+        response = self.client.get("/api/tasks/board-summary/", {"project": project.id})
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()["projects"][str(project.id)]
+        self.assertEqual((summary["total"], summary["overdue"]), (2, 1))
+        self.assertEqual(summary["matrix"]["todo"]["high"], 1)
+        self.assertEqual(self.client.get("/api/tasks/board-summary/", {"module": "x"}).status_code, 400)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(name="Roll", start_date=date(2026, 1, 1))
+        self.first = Module.objects.create(project=self.project, name="A", start_date=date(2026, 1, 1))
+        self.second = Module.objects.create(project=self.project, name="B", start_date=date(2026, 1, 1))
+
+    def counters(self, obj):
+        obj.refresh_from_db()
+        return obj.tasks_total, obj.tasks_todo, obj.tasks_completed
+
+    def test_counters_follow_task_writes(self):
+        tasks = Task.objects.bulk_create([Task(module=self.first, title=f"T{i}", start_date=date(2026, 1, 1)) for i in range(3)])
+        single = Task.objects.create(module=self.second, title="S", start_date=date(2026, 1, 1))
+        self.assertEqual(self.counters(self.project), (4, 4, 0))
+
+        tasks[0].status = "completed"
+        tasks[0].save()
+        single.module = self.first
+        single.save()
+        self.assertEqual(self.counters(self.first), (4, 3, 1))
+        self.assertEqual(self.counters(self.second), (0, 0, 0))
+
+        Task.objects.filter(id=tasks[1].id).update(status="completed")
+        tasks[2].delete()
+        self.assertEqual(self.counters(self.project), (3, 1, 2))
+        self.assertEqual(self.project.progress, round(2 / 3, 4))
+        self.assertEqual(rollups.verify_all(), [])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ModuleMoveTests(TestCase):
+    def test_moving_a_module_carries_its_tasks(self):
+        source, target = (Project.objects.create(name=n, start_date=date(2026, 1, 1)) for n in ("Source", "Target"))
+        module = Module.objects.create(project=source, name="Payments", start_date=date(2026, 1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.bulk_create([
+                Task(module=module, title=f"Refund {i}", start_date=date(2026, 1, 1), status="completed" if i else "todo")
+                for i in range(3)
+            ])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().put(f"/api/modules/?id={module.id}", {"project": target.id}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        for project, counters in ((source, (0, 0)), (target, (3, 2))):
+            project.refresh_from_db()
+            self.assertEqual((project.tasks_total, project.tasks_completed), counters)
+        self.assertEqual(rollups.verify_all(), [])
+        self.assertEqual({h["project"] for h in search.search("refund", kinds=["task"])}, {target.id})
+        self.assertEqual(set(TaskSchedule.objects.values_list("project_id", flat=True)), {target.id})
+        self.assertEqual(
+            ProjectDailySnapshot.objects.get(project_id=source.id, day=timezone.localdate()).tasks_total, 0,
+        )
+
+
+class BulkWriteAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        project = Project.objects.create(name="Bulk", start_date=date(2026, 1, 1))
+        self.module = Module.objects.create(project=project, name="M", start_date=date(2026, 1, 1))
+
+    def items(self, count):
+        return [{"module": self.module.id, "title": f"T{i}", "start_date": "2026-01-01"} for i in range(count)]
+
+    def test_create_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.post("/api/tasks/bulk/", self.items(2), format="json").status_code, 201)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post("/api/tasks/bulk/", self.items(50), format="json")
+        self.assertEqual(response.json()["count"], 50)
+        self.assertEqual(len(small), len(large))
+        self.module.refresh_from_db()
+        self.assertEqual(self.module.tasks_total, 52)
+
+    def test_any_error_writes_nothing(self):
+        items = self.items(3)
+        items[1]["module"] = 999
+        items[2]["status"] = "bogus"
+        response = self.client.post("/api/tasks/bulk/", items, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.json()["errors"]], [1, 2])
+        self.assertFalse(Task.objects.exists())
+
+        task = Task.objects.create(module=self.module, title="A", start_date=date(2026, 1, 1))
+        response = self.client.put("/api/tasks/bulk/", [{"id": task.id, "status": "completed"}, {"id": 999}], format="json")
+        self.assertEqual(response.status_code, 400)
+        task.refresh_from_db()
+        self.assertEqual(task.status, "todo")
+        response = self.client.put("/api/tasks/bulk/", [{"id": task.id, "status": "completed"}], format="json")
+        self.assertEqual(response.status_code, 200)
+        task.refresh_from_db()
+        self.assertEqual(task.status, "completed")
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(name="Export", start_date=date(2026, 1, 1))
+        other = Project.objects.create(name="Other", start_date=date(2026, 1, 1))
+        for project in (self.project, other):
+            module = Module.objects.create(project=project, name=f"{project.name} M", start_date=date(2026, 1, 1))
+            Task.objects.bulk_create([Task(module=module, title=f"T{i}", start_date=date(2026, 1, 1)) for i in range(3)])
+
+    def download(self, path, params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_csv_rows_with_parent_names(self):
+        response, body = self.download("/api/exports/tasks/", {"project": self.project.id})
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual([r["title"] for r in rows], ["T0", "T1", "T2"])
+        self.assertEqual({r["module__project__name"] for r in rows}, {"Export"})
+
+    def test_ndjson_gzip(self):
+        with mock.patch("PMS.exports.FLUSH_EVERY", 2):
+            response, body = self.download("/api/exports/tasks/", {"format": "ndjson", "gzip": "1"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        rows = [json.loads(line) for line in gzip.decompress(body).splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]["module__name"], "Export M")
+        self.assertEqual(self.client.get("/api/exports/tasks/", {"format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/exports/users/").status_code, 404)
+
+
+class TaskImportTests(TestCase):
+    CSV = (
+        "title,project_name,module_name,start_date,end_date,priority,assigned_to\n"
+        "Login form,Web,Auth,2026-02-01,2026-02-10,high,dev\n"
+        "Token refresh,Web,Auth,2026-02-03,,,\n"
+        "Duplicate name,,Auth,2026-02-03,,,\n"
+        "Bad date,Web,Auth,02/03/2026,,,\n"
+        "Nobody,Web,Auth,2026-02-03,,,ghost\n"
+        "Payments,Web,Billing,2026-02-05,,low,\n"
+    )
+
+    def setUp(self):
+        User.objects.create_user(username="dev", email="dev@example.com", password="x")
+        self.web, mobile = (Project.objects.create(name=n, start_date=date(2026, 1, 1)) for n in ("Web", "Mobile"))
+        for project in (self.web, mobile):
+            Module.objects.create(project=project, name="Auth", start_date=date(2026, 1, 1))
+        Module.objects.create(project=self.web, name="Billing", start_date=date(2026, 1, 1))
+
+    def test_upload_streams_progress_and_reports_bad_rows(self):
+        upload = SimpleUploadedFile("tasks.csv", self.CSV.encode("utf-8-sig"), content_type="text/csv")
+        response = self.client.post("/api/tasks/import/", {"file": upload, "batch_size": 2})
+        events = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([e["imported"] for e in events], [2, 3])
+        summary = events[-1]
+        self.assertTrue(summary["done"])
+        self.assertEqual((summary["rows"], summary["failed"]), (6, 3))
+        self.assertEqual([e["line"] for e in summary["errors"]], [4, 5, 6])
+        self.assertIn("several projects", summary["errors"][0]["error"])
+
+        # what went in comes back out of the export
+        body = b"".join(self.client.get("/api/exports/tasks/", {"project": self.web.id}).streaming_content)
+        rows = {r["title"]: r for r in csv.DictReader(io.StringIO(body.decode()))}
+        self.assertEqual(set(rows), {"Login form", "Token refresh", "Payments"})
+        self.assertEqual((rows["Login form"]["module__name"], rows["Login form"]["priority"]), ("Auth", "high"))
+        self.assertEqual(rows["Login form"]["assigned_to_id"], str(User.objects.get(username="dev").id))
+        self.assertEqual((rows["Payments"]["module__name"], rows["Payments"]["end_date"]), ("Billing", ""))
+
+    def test_names_are_resolved_without_a_query_per_row(self):
+        def run(count):
+            text = "title,module_name,project_name,start_date\n" + "".join(f"T{i},Auth,Web,2026-02-01\n" for i in range(count))
+            with CaptureQueriesContext(connection) as queries:
+                summary = imports.import_tasks_csv(io.StringIO(text), batch_size=100)
+            self.assertEqual(summary["imported"], count)
+            return len(queries)
+
+        self.assertEqual(run(10), run(100))
+
+    def test_unreadable_file_ends_with_an_error_line(self):
+        def post(content):
+            upload = SimpleUploadedFile("tasks.csv", content, content_type="text/csv")
+            response = self.client.post("/api/tasks/import/", {"file": upload, "batch_size": 1})
+            return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        # an unterminated quote runs into the csv field size limit
+        head = "title,project_name,module_name,start_date\nLogin form,Web,Auth,2026-02-01\n"
+        events = post((head + '"Broken' + "x" * 200_000).encode())
+        summary = events[-1]
+        self.assertTrue(summary["done"])
+        self.assertEqual((summary["imported"], summary["line"]), (1, 3))
+        self.assertIn("Malformed CSV", summary["error"])
+
+        events = post(head.replace("Login form", "Caf\u00e9").encode("latin-1"))
+        self.assertEqual((events[-1]["imported"], events[-1]["done"]), (0, True))
+        self.assertIn("not UTF-8", events[-1]["error"])
+
+    def test_projects_being_deleted_take_no_rows(self):
+        Project.objects.filter(pk=self.web.pk).update(deleting=True)
+        summary = imports.import_tasks_csv(io.StringIO("title,project_name,module_name,start_date\nX,Web,Billing,2026-02-01\n"))
+        self.assertEqual((summary["imported"], summary["failed"]), (0, 1))
+        self.assertFalse(Task.objects.exists())
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.web = Project.objects.create(name="Web shop", start_date=date(2026, 1, 1))
+        self.mobile = Project.objects.create(name="Mobile app", start_date=date(2026, 1, 1))
+        self.auth = Module.objects.create(project=self.web, name="Login", description="Sessions", start_date=date(2026, 1, 1))
+        app = Module.objects.create(project=self.mobile, name="Screens", start_date=date(2026, 1, 1))
+        self.title_hit = Task.objects.create(module=self.auth, title="Fix login redirect", start_date=date(2026, 1, 1))
+        self.body_hit = Task.objects.create(module=self.auth, title="Audit", description="check the login flow",
+                                            start_date=date(2026, 1, 1))
+        self.other = Task.objects.create(module=app, title="Login screen", start_date=date(2026, 1, 1))
+
+    def hits(self, params):
+        response = self.client.get("/api/search/", params)
+        self.assertEqual(response.status_code, 200)
+        return [(h["type"], h["id"]) for h in response.json()["results"]]
+
+    def test_title_matches_rank_above_description_matches(self):
+        hits = self.hits({"q": "log", "type": "task"})
+        self.assertEqual(len(hits), 3)
+        self.assertEqual(hits[-1], ("task", self.body_hit.id))
+
+    def test_project_filter_and_updates(self):
+        self.assertEqual(self.hits({"q": "login", "project": self.mobile.id}), [("task", self.other.id)])
+        self.other.title = "Sign in screen"
+        self.other.save()
+        self.assertEqual(self.hits({"q": "login", "project": self.mobile.id}), [])
+        self.title_hit.delete()
+        self.assertNotIn(("task", self.title_hit.id), self.hits({"q": "login"}))
+        self.assertEqual(self.client.get("/api/search/", {"q": "x", "type": "user"}).status_code, 400)
+
+
+class TimelineAPITests(TestCase):
+    def test_overlap_with_open_ended_rows(self):
+        project = Project.objects.create(name="P", start_date=date(2026, 1, 1))
+        module = Module.objects.create(project=project, name="M", start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+        inside = Task.objects.create(module=module, title="inside", start_date=date(2026, 3, 5), end_date=date(2026, 3, 6))
+        running = Task.objects.create(module=module, title="running", start_date=date(2026, 2, 1))
+        Task.objects.create(module=module, title="before", start_date=date(2026, 1, 1), end_date=date(2026, 2, 28))
+        Task.objects.create(module=module, title="after", start_date=date(2026, 4, 1))
+
+        response = self.client.get("/api/timeline/", {"start": "2026-03-01", "end": "2026-03-31", "project": project.id})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["modules"]["id"], [])
+        self.assertEqual(data["tasks"]["id"], [running.id, inside.id])
+        self.assertEqual(data["tasks"]["end"], [None, "2026-03-06"])
+
+        for params in (
+            {"end": "2026-03-31"},
+            {"start": "2026-03-31", "end": "2026-03-01"},
+            {"start": "2026-03-01", "end": "2026-03-31", "module": "x"},
+        ):
+            self.assertEqual(self.client.get("/api/timeline/", params).status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        project = Project.objects.create(name="P", start_date=date(2026, 1, 1))
+        self.module = Module.objects.create(project=project, name="M", start_date=date(2026, 1, 1))
+        self.task = Task.objects.create(module=self.module, title="T", start_date=date(2026, 1, 1))
+
+    def test_board_summary_revalidates(self):
+        first = self.client.get("/api/tasks/board-summary/")
+        self.assertEqual(first.status_code, 200)
+        last_modified = parse_http_date(first["Last-Modified"])
+        self.assertGreaterEqual(last_modified, time.time() - 60)
+
+        cached = self.client.get("/api/tasks/board-summary/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get("/api/tasks/board-summary/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304)
+
+        self.task.status = "completed"
+        self.task.save()
+        fresh = self.client.get("/api/tasks/board-summary/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh["ETag"], first["ETag"])
+
+    def test_date_stamp_is_midnight(self):
+        Task.objects.all().delete()
+        Module.objects.all().delete()
+        with mock.patch("PMS.views.collection_stamps", return_value=[0, 0]):
+            response = self.client.get("/api/tasks/board-summary/")
+        midnight = datetime.combine(timezone.localdate(), datetime.min.time(), tzinfo=dt_timezone.utc)
+        self.assertEqual(parse_http_date(response["Last-Modified"]), int(midnight.timestamp()))
+
+    def test_single_row_etag_changes_on_write(self):
+        url = f"/api/tasks/?id={self.task.id}"
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        Task.objects.filter(id=self.task.id).update(title="Renamed")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ProjectBoardConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.project = Project.objects.create(name="Board", start_date=date(2026, 1, 1))
+        self.module = Module.objects.create(project=self.project, name="M", start_date=date(2026, 1, 1))
+
+    def board(self, query=""):
+        return WebsocketCommunicator(URLRouter(routing.websocket_urlpatterns), f"/ws/projects/{self.project.id}/{query}")
+
+    async def test_live_events_and_replay_after_reconnect(self):
+        board = self.board()
+        self.assertTrue((await board.connect())[0])
+        task = await sync_to_async(Task.objects.create)(module=self.module, title="A", start_date=date(2026, 1, 1))
+        message = await board.receive_json_from()
+        created = message["events"][0]
+        self.assertEqual((created["entity"], created["id"], created["op"]), ("task", task.id, "created"))
+        await board.disconnect()
+
+        # missed while disconnected
+        task.status = "completed"
+        await sync_to_async(task.save)()
+        board = self.board(f"?cursor={created['seq']}")
+        await board.connect()
+        replay = (await board.receive_json_from())["events"]
+        self.assertEqual([(e["op"], e["fields"]) for e in replay], [("updated", {"status": "completed"})])
+        self.assertTrue(await board.receive_nothing())
+
+        await board.send_json_to({"action": "resume", "cursor": "x"})
+        self.assertEqual((await board.receive_json_from())["type"], "error")
+        await board.disconnect()
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        project = Project.objects.create(name="Sync", start_date=date(2026, 1, 1))
+        self.module = Module.objects.create(project=project, name="M", start_date=date(2026, 1, 1))
+        self.start = sync.latest_seq()
+
+    def changes(self, since, limit=500):
+        response = self.client.get("/api/sync/", {"since": since, "limit": limit})
+        return response.status_code, response.json()
+
+    def test_batches_follow_the_cursor_and_collapse_per_entity(self):
+        kept = Task.objects.create(module=self.module, title="kept", start_date=date(2026, 1, 1))
+        gone = Task.objects.create(module=self.module, title="gone", start_date=date(2026, 1, 1))
+        kept.title = "renamed"
+        kept.save()
+        gone_id = gone.id
+        gone.delete()
+
+        _, first = self.changes(self.start, limit=2)
+        self.assertTrue(first["has_more"])
+        _, rest = self.changes(first["next_since"])
+        self.assertFalse(rest["has_more"])
+        self.assertEqual([t["title"] for t in rest["upserts"]["tasks"]], ["renamed"])
+        self.assertEqual(rest["deleted"]["tasks"], [gone_id])
+        # the first batch saw "gone" created, but it no longer exists
+        self.assertEqual(first["deleted"]["tasks"], [gone_id])
+        self.assertEqual(self.changes(rest["next_since"])[1]["next_since"], rest["next_since"])
+
+    def test_clients_behind_the_compaction_horizon_must_reload(self):
+        task = Task.objects.create(module=self.module, title="A", start_date=date(2026, 1, 1))
+        task.delete()
+        Task.objects.create(module=self.module, title="B", start_date=date(2026, 1, 1))
+        ChangeEvent.objects.update(created_at=timezone.now() - timedelta(days=60))
+        after_delete = ChangeEvent.objects.filter(op="deleted").get().id
+
+        superseded, tombstones, horizon = sync.compact(retention_days=30)
+        self.assertEqual((superseded, tombstones, horizon), (1, 1, after_delete))
+        status_code, body = self.changes(self.start)
+        self.assertEqual(status_code, 410)
+        self.assertEqual(body["latest"], sync.latest_seq())
+        status_code, body = self.changes(horizon)
+        self.assertEqual(status_code, 200)
+        self.assertEqual([t["title"] for t in body["upserts"]["tasks"]], ["B"])
+
+    def test_bulk_update_sends_one_signal(self):
+        tasks = Task.objects.bulk_create([Task(module=self.module, title=f"T{i}", start_date=date(2026, 1, 1)) for i in range(30)])
+        received = mock.Mock()
+        tasks_bulk_changed.connect(received, sender=Task)
+        self.addCleanup(tasks_bulk_changed.disconnect, received, sender=Task)
+        for task in tasks:
+            task.status = "completed"
+        Task.objects.bulk_update(tasks, ["status"], batch_size=10)
+        self.assertEqual(received.call_count, 1)
+        self.assertEqual(received.call_args.kwargs["fields"], {"status"})
+        self.module.refresh_from_db()
+        self.assertEqual(self.module.tasks_completed, 30)
+
+
+@override_settings(PMS_DELETE_IN_BACKGROUND=False)
+class ProjectDeletionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.project = Project.objects.create(name="Big", start_date=date(2026, 1, 1))
+        self.other = Project.objects.create(name="Other", start_date=date(2026, 1, 1))
+        for project in (self.project, self.other):
+            for m in range(3):
+                module = Module.objects.create(project=project, name=f"M{m}", start_date=date(2026, 1, 1))
+                Task.objects.bulk_create([Task(module=module, title=f"T{t}", start_date=date(2026, 1, 1)) for t in range(5)])
+
+    def test_delete_flags_then_removes_in_chunks(self):
+        response = self.client.delete(f"/api/projects/?id={self.project.id}")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["deletion"]["tasks_total"], 15)
+        # hidden right away, rows still there until the background run
+        self.assertEqual(self.client.get(f"/api/projects/?id={self.project.id}").status_code, 404)
+        self.assertEqual(Task.objects.filter(module__project=self.project).count(), 15)
+
+        with mock.patch.object(deletion, "CHUNK_SIZE", 4):
+            deletion.run(self.project.id)
+
+        self.assertFalse(Project.objects.filter(id=self.project.id).exists())
+        self.assertEqual(Module.objects.filter(project_id=self.project.id).count(), 0)
+        self.assertEqual(Task.objects.count(), 15)
+        self.assertEqual({h["project"] for h in search.search("T1")}, {self.other.id})
+        progress = self.client.get(f"/api/projects/deletion/?id={self.project.id}").json()
+        self.assertEqual((progress["status"], progress["tasks_deleted"], progress["modules_deleted"]), ("done", 15, 3))
+
+    def test_flagged_project_is_hidden_everywhere(self):
+        user = User.objects.create_user(username="dev", email="dev@example.com", password="x")
+        since = sync.latest_seq()
+        Task.objects.update(assigned_to=user, end_date=date(2026, 1, 2))
+        summary = self.client.get("/api/tasks/board-summary/")
+        self.assertEqual(self.client.get("/api/workload/", {"users": user.id}).json()["results"][0]["tasks"]["open"], 30)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/projects/?id={self.project.id}")
+
+        projects = self.client.get("/api/tasks/board-summary/", HTTP_IF_NONE_MATCH=summary["ETag"]).json()["projects"]
+        self.assertEqual(set(projects), {str(self.other.id)})
+        timeline = self.client.get("/api/timeline/", {"start": "2026-01-01", "end": "2026-01-31"}).json()
+        self.assertEqual(len(timeline["tasks"]["id"]), 15)
+        body = b"".join(self.client.get("/api/exports/modules/").streaming_content).decode()
+        self.assertEqual(len(body.splitlines()), 4)
+        self.assertEqual({h["project"] for h in search.search("T1")}, {self.other.id})
+        self.assertEqual(self.client.get("/api/workload/", {"users": user.id}).json()["results"][0]["tasks"]["open"], 15)
+        changes = self.client.get("/api/sync/", {"since": since}).json()
+        self.assertEqual((len(changes["upserts"]["tasks"]), len(changes["deleted"]["tasks"])), (15, 15))
+        self.assertEqual({t["module"] for t in changes["upserts"]["tasks"]}, set(self.other.modules.values_list("id", flat=True)))
+
+    @override_settings(PMS_DELETE_IN_BACKGROUND=True)
+    def test_repeated_delete_starts_one_run(self):
+        with mock.patch.object(deletion, "start") as start:
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.assertEqual(self.client.delete(f"/api/projects/?id={self.project.id}").status_code, 202)
+            self.assertEqual(start.call_count, 1)
+            deletion.ProjectDeletion.objects.filter(project_id=self.project.id).update(status="failed")
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(f"/api/projects/?id={self.project.id}")
+            self.assertEqual(start.call_count, 2)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class WorkloadTests(TestCase):
+    def setUp(self):
+        # ids are reused across tests, cached entries are not
+        cache.clear()
+        self.client = APIClient()
+        self.alice = User.objects.create_user(username="alice", email="alice@example.com", password="x")
+        self.bob = User.objects.create_user(username="bob", email="bob@example.com", password="x")
+        project = Project.objects.create(name="P", start_date=date(2026, 1, 1))
+        self.module = Module.objects.create(project=project, name="M", start_date=date(2026, 1, 1))
+        self.task = Task.objects.create(module=self.module, title="T", start_date=date(2026, 1, 1), assigned_to=self.alice,
+                                        priority="high")
+
+    def open_tasks(self):
+        response = self.client.get("/api/workload/", {"users": f"{self.alice.id},{self.bob.id}"})
+        return {r["username"]: r["tasks"]["open"] for r in response.json()["results"]}
+
+    def test_reassignment_invalidates_both_users_after_commit(self):
+        self.assertEqual(self.open_tasks(), {"alice": 1, "bob": 0})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.assigned_to = self.bob
+            self.task.save()
+            # still inside the transaction: the cached entries are untouched
+            self.assertEqual(self.open_tasks(), {"alice": 1, "bob": 0})
+        self.assertEqual(self.open_tasks(), {"alice": 0, "bob": 1})
+
+    def test_status_change_invalidates(self):
+        self.assertEqual(workload.workload([self.alice.id])[self.alice.id]["tasks"]["by_priority"]["high"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.status = "completed"
+            self.task.save()
+        self.assertEqual(self.open_tasks(), {"alice": 0, "bob": 0})
+        with CaptureQueriesContext(connection) as queries:
+            self.open_tasks()
+        # both users come from the cache, only the user lookup runs
+        self.assertEqual(len(queries), 1)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class SchedulingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.project = Project.objects.create(name="Plan", start_date=date(2026, 1, 1))
+        self.module = Module.objects.create(project=self.project, name="M", start_date=date(2026, 1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            # A (3 days) -> B (2 days) -> D, A -> C (1 day) -> D
+            self.a, self.b, self.c, self.d = (
+                Task.objects.create(module=self.module, title=title, start_date=date(2026, 1, 1), end_date=end)
+                for title, end in (("A", date(2026, 1, 3)), ("B", date(2026, 1, 2)), ("C", None), ("D", None))
+            )
+            for predecessor, successor in ((self.a, self.b), (self.a, self.c), (self.b, self.d), (self.c, self.d)):
+                TaskDependency.objects.create(predecessor=predecessor, successor=successor)
+
+    def schedule(self):
+        response = self.client.get("/api/projects/schedule/", {"id": self.project.id})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        columns = data["tasks"]
+        return data, {t: (es, slack) for t, es, slack in zip(columns["task"], columns["early_start"], columns["slack"])}
+
+    def assert_matches_full_recompute(self):
+        _, full = scheduling.compute(scheduling.load_project(self.project.id))
+        stored = scheduling._stored(full)
+        self.assertEqual(stored, full)
+
+    def test_critical_path_and_slack(self):
+        data, rows = self.schedule()
+        self.assertEqual(data["critical_path"], [self.a.id, self.b.id, self.d.id])
+        self.assertEqual(data["finish"], "2026-01-06")
+        self.assertEqual(rows[self.c.id], ("2026-01-04", 1))
+        self.assertEqual(rows[self.d.id], ("2026-01-06", 0))
+
+    def test_cycles_are_rejected(self):
+        response = self.client.post("/api/tasks/dependencies/", {"predecessor": self.d.id, "successor": self.a.id}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cycle", str(response.json()))
+        self.assertTrue(scheduling.would_create_cycle(self.b.id, self.b.id))
+        with self.assertRaises(scheduling.CycleError):
+            scheduling.topological_order([1, 2], {1: [(2, 0)], 2: [(1, 0)]})
+
+    def test_edits_are_applied_downstream_only(self):
+        with mock.patch.object(scheduling, "schedule_project", wraps=scheduling.schedule_project) as full:
+            # C takes two days: it loses its slack, the finish stays
+            with self.captureOnCommitCallbacks(execute=True):
+                self.c.end_date = date(2026, 1, 2)
+                self.c.save()
+            # new tasks have no links yet
+            with self.captureOnCommitCallbacks(execute=True):
+                extra = Task.objects.bulk_create([Task(module=self.module, title=f"E{i}", start_date=date(2026, 1, 2)) for i in range(3)])
+            self.assertEqual(full.call_count, 0)
+            # pushing the finish out (D now takes a week) recomputes every late date
+            with self.captureOnCommitCallbacks(execute=True):
+                self.d.end_date = date(2026, 1, 7)
+                self.d.save()
+            self.assertEqual(full.call_count, 1)
+
+        data, rows = self.schedule()
+        self.assertEqual(data["critical_path"], [self.a.id, self.b.id, self.c.id, self.d.id])
+        self.assertEqual(data["finish"], "2026-01-12")
+        self.assertEqual(rows[extra[0].id], ("2026-01-02", 10))
+        self.assert_matches_full_recompute()
+
+
+class ProjectAnalyticsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.project = Project.objects.create(name="Flow", start_date=date(2026, 1, 1))
+        self.module = Module.objects.create(project=self.project, name="M", start_date=date(2026, 1, 1))
+
+    def test_transitions_are_recorded_once_and_snapshotted(self):
+        task = Task.objects.create(module=self.module, title="A", start_date=date(2026, 1, 1))
+        task.status = "in_progress"
+        task.save()
+        task.status = "completed"
+        task.save()
+        others = Task.objects.bulk_create([Task(module=self.module, title=f"B{i}", start_date=date(2026, 1, 1)) for i in range(2)])
+        others[0].status = "review"
+        Task.objects.bulk_update(others[:1], ["status"])
+
+        self.assertEqual(
+            list(TaskStatusChange.objects.order_by("id").values_list("task_id", "from_status", "to_status")),
+            [(task.id, None, "todo"), (task.id, "todo", "in_progress"), (task.id, "in_progress", "completed"),
+             (others[0].id, None, "todo"), (others[1].id, None, "todo"), (others[0].id, "todo", "review")],
+        )
+        snapshot = ProjectDailySnapshot.objects.get(project_id=self.project.id)
+        self.assertEqual((snapshot.tasks_total, snapshot.tasks_todo, snapshot.tasks_review, snapshot.tasks_completed), (3, 1, 1, 1))
+        self.assertEqual((snapshot.created_count, snapshot.completed_count, snapshot.cycle_time_count), (3, 1, 1))
+
+    def test_burndown_carries_counts_over_quiet_days(self):
+        today = timezone.localdate()
+        ProjectDailySnapshot.objects.create(project_id=self.project.id, day=today - timedelta(days=3), tasks_total=4, tasks_completed=1)
+        ProjectDailySnapshot.objects.create(project_id=self.project.id, day=today - timedelta(days=1), tasks_total=4, tasks_completed=3)
+        data = self.client.get("/api/projects/burndown/", {"id": self.project.id, "start": str(today - timedelta(days=4))}).json()
+        self.assertEqual(data["remaining"], [0, 3, 3, 1, 1])
+        self.assertEqual(self.client.get("/api/projects/burndown/", {"id": self.project.id, "start": "2020-01-01"}).status_code, 400)
+
+
+class DeadlineScanTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="dana", password="x")
+        project = Project.objects.create(name="Deadlines", start_date=date(2026, 1, 1))
+        self.module = Module.objects.create(project=project, name="M", start_date=date(2026, 1, 1))
+        self.today = date(2026, 3, 10)
+
+    def task(self, end, **kwargs):
+        return Task.objects.create(module=self.module, title=f"Due {end}", start_date=date(2026, 1, 1),
+                                   end_date=end, assigned_to=self.user, **kwargs)
+
+    def test_each_run_only_reads_the_window_since_the_last_one(self):
+        # history that was overdue long before the first run is not reported
+        Task.objects.bulk_create([
+            Task(module=self.module, title=f"Old {i}", start_date=date(2026, 1, 1), end_date=date(2026, 1, 2), assigned_to=self.user)
+            for i in range(20)
+        ])
+        yesterday = self.task(self.today - timedelta(days=1))
+        soon = self.task(self.today + timedelta(days=2))
+        self.task(self.today + timedelta(days=1), status="completed")
+
+        with mock.patch.object(deadlines, "notify") as notify, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(deadlines.scan(today=self.today), {"overdue": 1, "due_soon": 1})
+        items = notify.call_args.args[0]["dana"]
+        self.assertEqual({(i["kind"], i["id"]) for i in items}, {("overdue", yesterday.id), ("due_soon", soon.id)})
+
+        self.assertEqual(deadlines.scan(today=self.today), {"overdue": 0, "due_soon": 0})
+        # next day: only what moved into the windows, however much history there is
+        self.task(self.today + timedelta(days=3))
+        self.assertEqual(deadlines.scan(today=self.today + timedelta(days=1)), {"overdue": 0, "due_soon": 1})
+        self.assertEqual(deadlines.scan(today=self.today + timedelta(days=3)), {"overdue": 1, "due_soon": 0})
+
+    def test_skipped_days_are_caught_up(self):
+        missed = [self.task(self.today + timedelta(days=d)) for d in (1, 2)]
+        deadlines.scan(today=self.today)
+        # cron didn't run for two days
+        with mock.patch.object(deadlines, "notify") as notify, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(deadlines.scan(today=self.today + timedelta(days=3))["overdue"], 2)
+        items = notify.call_args.args[0]["dana"]
+        self.assertEqual({i["id"] for i in items if i["kind"] == "overdue"}, {t.id for t in missed})
+
+    def test_projects_being_deleted_are_left_out(self):
+        self.task(self.today - timedelta(days=1))
+        Module.objects.filter(pk=self.module.pk).update(assigned_to=self.user, end_date=self.today)
+        Project.objects.filter(pk=self.module.project_id).update(deleting=True)
+        self.assertEqual(deadlines.scan(today=self.today), {"overdue": 0, "due_soon": 0})
+
+
+class ModuleTaskAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.project = Project.objects.create(name="Lists", start_date=date(2026, 1, 1))
+        self.module = Module.objects.create(project=self.project, name="M", start_date=date(2026, 1, 1))
+        Task.objects.bulk_create([
+            Task(module=self.module, title=f"T{i}", start_date=date(2026, 1, 1 + i % 5),
+                 status="completed" if i % 3 == 0 else "todo", priority="high" if i % 2 else "low")
+            for i in range(12)
+        ])
+
+    def test_filters_fields_and_keyset_pages(self):
+        params = {"project": self.project.id, "status": "todo", "fields": "id,title", "page_size": 3}
+        seen, cursor = [], None
+        with CaptureQueriesContext(connection) as queries:
+            while True:
+                data = self.client.get("/api/tasks/", {**params, **({"cursor": cursor} if cursor else {})}).json()
+                seen += data["results"]
+                cursor = data["next_cursor"]
+                if not cursor:
+                    break
+        self.assertEqual(len(seen), 8)
+        self.assertEqual(len({t["id"] for t in seen}), 8)
+        self.assertEqual(set(seen[0]), {"id", "title"})
+        # one query per page (plus the conditional GET stamp)
+        self.assertLessEqual(len(queries), 3 * 2)
+        # the SELECT only reads the requested columns (and the ordering)
+        self.assertNotIn('"description"', queries[-1]["sql"])
+
+    def test_detail_and_bad_params(self):
+        task = Task.objects.first()
+        data = self.client.get("/api/tasks/", {"id": task.id, "fields": "status"}).json()
+        self.assertEqual(data, {"status": task.status})
+        self.assertEqual(self.client.get("/api/modules/", {"id": self.module.id, "fields": "progress"}).json(), {"progress": 0.3333})
+        self.assertEqual(self.client.get("/api/tasks/", {"status": "nope"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/tasks/", {"fields": "nope"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/tasks/", {"id": 999999}).status_code, 404)
+
+    def test_name_orderings_are_indexed(self):
+        for url, ordering in (("/api/tasks/", "title"), ("/api/tasks/", "-title"), ("/api/modules/", "name")):
+            with CaptureQueriesContext(connection) as queries:
+                cursor = self.client.get(url, {"ordering": ordering, "page_size": 2}).json()["next_cursor"]
+                if cursor:
+                    self.client.get(url, {"ordering": ordering, "page_size": 2, "cursor": cursor})
+            for query in queries:
+                if "ORDER BY" in query["sql"]:
+                    with connection.cursor() as db:
+                        db.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                        plan = " ".join(str(row) for row in db.fetchall())
+                    self.assertNotIn("TEMP B-TREE", plan, (url, ordering))
+
+    def test_tampered_cursor_is_a_bad_request(self):
+        def cursor(values):
+            return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+        for url in ("/api/projects/", "/api/tasks/", "/api/modules/"):
+            for values in (["abc", 1], [None, 1], ["2024-01-01", "x"], [["2024-01-01"], {}], ["2024-01-01"]):
+                response = self.client.get(url, {"cursor": cursor(values)})
+                self.assertEqual(response.status_code, 400, (url, values))
+            self.assertEqual(self.client.get(url, {"cursor": cursor(["2026-01-03", 5])}).status_code, 200)
+
+
+@mock.patch.object(ollama, "RETRY_BACKOFF", 0)
+class OllamaClientTests(TestCase):
+    def serve(self, *answers):
+        """Route the client through a MockTransport answering with `answers` in turn; returns the requests seen."""
+        seen = []
+        answers = list(answers)
+
+        def handler(request):
+            seen.append(request)
+            answer = answers.pop(0) if len(answers) > 1 else answers[0]
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        def new_client():
+            return httpx.AsyncClient(base_url=ollama.base_url(), transport=httpx.MockTransport(handler))
+
+        patcher = mock.patch.object(ollama, "_new_client", new_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return seen
+
+    @staticmethod
+    def reply(content):
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": content}, "done": True})
+
+    def test_gateway_errors_are_retried(self):
+        seen = self.serve(httpx.Response(502), httpx.Response(503), self.reply("hello"))
+        self.assertEqual(asyncio.run(ollama.chat([{"role": "user", "content": "hi"}])), "hello")
+        self.assertEqual(len(seen), 3)
+
+        seen = self.serve(httpx.Response(504))
+        with override_settings(OLLAMA_RETRIES=1), self.assertRaises(ollama.OllamaError):
+            asyncio.run(ollama.chat([]))
+        self.assertEqual(len(seen), 2)
+        # other errors are not worth retrying
+        seen = self.serve(httpx.Response(500))
+        with self.assertRaises(ollama.OllamaError):
+            asyncio.run(ollama.chat([]))
+        self.assertEqual(len(seen), 1)
+
+    def test_connection_errors_are_retried(self):
+        refused = httpx.ConnectError("Connection refused")
+        seen = self.serve(refused, self.reply("back"))
+        self.assertEqual(asyncio.run(ollama.chat([])), "back")
+        self.assertEqual(len(seen), 2)
+
+        seen = self.serve(refused)
+        with self.assertRaisesMessage(ollama.OllamaError, "Could not reach Ollama"):
+            asyncio.run(ollama.chat([]))
+        self.assertEqual(len(seen), 3)
+
+    def test_stream_retries_before_the_first_token(self):
+        lines = "".join(json.dumps({"message": {"content": t}, "done": t == ""}) + "\n" for t in ("a", "b", ""))
+        seen = self.serve(httpx.Response(503), httpx.Response(200, text=lines))
+
+        async def tokens():
+            return [t async for t in ollama.stream_chat([])]
+
+        self.assertEqual(asyncio.run(tokens()), ["a", "b"])
+        self.assertEqual([r.url.path for r in seen], ["/api/chat", "/api/chat"])
+        self.assertTrue(json.loads(seen[0].content)["stream"])
+
+    def test_url_pointing_at_the_chat_endpoint(self):
+        for url in ("http://ollama:11434/api/chat", "http://ollama:11434/api/chat/", "http://ollama:11434"):
+            with override_settings(OLLAMA_URL=url):
+                self.assertEqual(ollama.base_url(), "http://ollama:11434")
+                seen = self.serve(self.reply("ok"))
+                asyncio.run(ollama.chat([]))
+                self.assertEqual(str(seen[0].url), "http://ollama:11434/api/chat")
+
+    def test_unreachable_model_is_a_bad_gateway(self):
+        self.serve(httpx.ConnectError("Connection refused"))
+        response = self.client.post("/api/ai-chat/", {"message": "how do I plan a sprint?"}, content_type="application/json")
+        self.assertEqual(response.status_code, 502)
+        self.assertIn("Could not reach Ollama", response.json()["error"])
+
+    def test_odd_json_replies_are_chat(self):
+        llm_cache.replies.clear()
+        for i, content in enumerate(['{"action": "create_project", "data": ["Apollo"]}', '{"action": "create_project", "data": null}',
+                                     '{"action": ["create_project"], "data": {}}', '["create_project"]', '"hello"', "null"]):
+            async def chat(messages, **kwargs):
+                return content
+
+            with mock.patch("PMS.ollama.chat", chat):
+                response = self.client.post("/api/ai-chat/", {"message": f"question {i}"}, content_type="application/json")
+            self.assertEqual((response.status_code, response.json()), (200, {"reply": content}))
+        self.assertFalse(Project.objects.exists())
+
+    def test_voicechat_needs_a_text_message(self):
+        seen = self.serve(self.reply("unused"))
+        for body in [{"message": 5}, ["hi"], {"message": "  "}]:
+            response = self.client.post("/api/ai-voicechat/", body, content_type="application/json")
+            self.assertEqual(response.status_code, 400, body)
+        self.assertEqual(seen, [])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ReplyStreamingTests(TestCase):
+    def setUp(self):
+        llm_cache.replies.clear()
+        self.release = asyncio.Event()
+
+    def stream_chat(self, tokens, hold=False):
+        async def fake(messages, model_name=None, priority="chat", **options):
+            for token in tokens:
+                yield token
+            if hold:
+                # a long reply: wait until stopped
+                await self.release.wait()
+        return mock.patch("PMS.ollama.stream_chat", fake)
+
+    async def test_sse_frames(self):
+        with self.stream_chat(["Plan ", "the ", "sprint"]):
+            response = await AsyncClient().post("/api/ai-voicechat/", {"message": "plan?", "stream": True},
+                                                content_type="application/json")
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        frames = [frame.split("\n") for frame in body.split("\n\n") if frame]
+        self.assertEqual([f[0] for f in frames], ["event: token"] * 3 + ["event: done"])
+        self.assertEqual(json.loads(frames[1][1].removeprefix("data: ")), {"token": "the "})
+        self.assertEqual(json.loads(frames[-1][1].removeprefix("data: ")), {"reply": "Plan the sprint"})
+
+    async def test_websocket_tokens_done_and_stop(self):
+        socket = WebsocketCommunicator(VoiceChatConsumer.as_asgi(), "/ws/ai-voicechat/")
+        self.assertTrue((await socket.connect())[0])
+        with self.stream_chat(["Hi", " there"]):
+            await socket.send_json_to({"message": "hello"})
+            self.assertEqual(await socket.receive_json_from(), {"type": "token", "token": "Hi"})
+            self.assertEqual(await socket.receive_json_from(), {"type": "token", "token": " there"})
+            self.assertEqual(await socket.receive_json_from(), {"type": "done", "reply": "Hi there"})
+
+        with self.stream_chat(["Once"], hold=True):
+            await socket.send_json_to({"message": "tell me a long story"})
+            self.assertEqual(await socket.receive_json_from(), {"type": "token", "token": "Once"})
+            await socket.send_json_to({"action": "stop"})
+            self.assertTrue(await socket.receive_nothing(timeout=0.2))
+        # a stopped reply is incomplete and must not be cached
+        self.assertIsNone(llm_cache.lookup("tell me a long story", ollama.model(), ollama.VOICE_SYSTEM_PROMPT)[1])
+        # a message that isn't text is ignored, the socket stays open
+        await socket.send_json_to({"message": 5})
+        self.assertTrue(await socket.receive_nothing(timeout=0.1))
+        with self.stream_chat(["Still here"]):
+            await socket.send_json_to({"message": "ping"})
+            self.assertEqual(await socket.receive_json_from(), {"type": "token", "token": "Still here"})
+            self.assertEqual(await socket.receive_json_from(), {"type": "done", "reply": "Still here"})
+        await socket.disconnect()
+
+
+class ReplyCacheTests(TestCase):
+    def test_lru_ttl_and_byte_cap(self):
+        cache = llm_cache.ReplyCache(ttl=60, max_entries=2, max_bytes=100)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        # b was the least recently used
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), ("1", None, "3"))
+        cache.put("d", "x" * 99)
+        self.assertEqual(cache.stats()["entries"], 1)
+        with mock.patch("PMS.llm_cache.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get("d"))
+        self.assertEqual(cache.stats()["expired"], 1)
+
+    def test_create_commands_bypass_the_cache(self):
+        self.assertEqual(llm_cache.key("Hello!", "m"), llm_cache.key("  hello ", "m"))
+        self.assertNotEqual(llm_cache.key("hello", "m"), llm_cache.key("hello", "m", "other system prompt"))
+        self.assertEqual(llm_cache.lookup("Create a task Fix login in module Auth", "m"), (None, None))
+        self.assertIsNotNone(llm_cache.lookup("how are you", "m")[0])
+
+
+class IntentParserTests(TestCase):
+    today = date(2026, 10, 1)
+
+    def test_structured_commands(self):
+        self.assertEqual(
+            intents.parse("create task Fix login in module Auth starting 2026-11-01 priority high", self.today),
+            {"action": "create_task", "data": {"title": "Fix login", "module_name": "Auth", "start_date": "2026-11-01", "priority": "high"}},
+        )
+        self.assertEqual(
+            intents.parse('Create module "Auth in depth" for project Website due 2026-12-01', self.today),
+            {"action": "create_module", "data": {"name": "Auth in depth", "project_name": "Website",
+                                                 "start_date": "2026-10-01", "end_date": "2026-12-01"}},
+        )
+        self.assertEqual(intents.parse("add a new project Website from tomorrow.", self.today)["data"],
+                         {"name": "Website", "start_date": "2026-10-02"})
+        self.assertEqual(intents.parse("create a project called Apollo starting 2026-11-01", self.today)["data"],
+                         {"name": "Apollo", "start_date": "2026-11-01"})
+        self.assertEqual(intents.parse('create project named "Apollo"', self.today)["data"],
+                         {"name": "Apollo", "start_date": "2026-10-01"})
+
+    def test_free_form_text_goes_to_the_model(self):
+        for message in [
+            "hi, how are you?",
+            "create a task for the login bug",
+            "create task Fix login in module Auth starting 2026-02-30",
+            "create task Fix login in module Auth starting 2026-11-01 starting 2026-11-02",
+            "create project Website priority high",
+            "create task Fix in module Auth from 2026-11-05 due 2026-11-01",
+            "make a project plan for the marketing launch",
+            "create a new project for me please",
+            "add project management tips to my notes",
+            "make a task list for module Auth",
+            "Create a project called Apollo",
+        ]:
+            self.assertIsNone(intents.parse(message, self.today), message)
+
+    def test_fast_path_skips_the_model(self):
+        project = Project.objects.create(name="Website", start_date=date(2026, 1, 1))
+        Module.objects.create(project=project, name="Auth", start_date=date(2026, 1, 1))
+        # an unreachable Ollama would fail the request if it were called
+        with override_settings(OLLAMA_URL="http://127.0.0.1:1", OLLAMA_RETRIES=0):
+            response = self.client.post("/api/ai-chat/", {"message": "create task Fix login in module Auth"},
+                                        content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"]["title"], "Fix login")
+        self.assertGreaterEqual(self.client.get("/api/ai-stats/").json()["ai_chat"]["fast_path"]["count"], 1)
+
+    def test_message_must_be_text(self):
+        for message in [5, ["create project Website"], "   "]:
+            response = self.client.post("/api/ai-chat/", {"message": message}, content_type="application/json")
+            self.assertEqual(response.status_code, 400, message)
+
+
+class AdmissionTests(TestCase):
+    def test_priority_order_and_backpressure(self):
+        controller = admission.AdmissionController()
+        order = []
+
+        async def call(priority, label):
+            async with controller.slot(priority):
+                order.append(label)
+                await asyncio.sleep(0.01)
+
+        async def burst():
+            await controller.acquire("batch")  # keeps the only slot busy while the others queue
+            calls = [asyncio.create_task(call(p, label)) for p, label in
+                     [("batch", "b1"), ("chat", "c1"), ("interactive", "i1"), ("chat", "c2")]]
+            await asyncio.sleep(0)
+            with self.assertRaises(admission.Rejected) as rejected:
+                await controller.acquire("interactive")
+            controller.release()
+            await asyncio.gather(*calls)
+            return rejected.exception.status_code
+
+        with override_settings(OLLAMA_CONCURRENCY=1, OLLAMA_QUEUE_SIZE=4):
+            self.assertEqual(asyncio.run(burst()), 429)
+        self.assertEqual(order, ["i1", "c1", "c2", "b1"])
+        stats = controller.stats()
+        self.assertEqual((stats["active"], stats["queue_depth"], stats["rejected"]), (0, 0, 1))
+
+    def test_queue_timeout_is_503(self):
+        controller = admission.AdmissionController()
+
+        async def starve():
+            await controller.acquire()
+            try:
+                await controller.acquire("interactive")
+            finally:
+                controller.release()
+
+        with override_settings(OLLAMA_CONCURRENCY=1, OLLAMA_QUEUE_TIMEOUT=0.01):
+            with self.assertRaises(admission.Rejected) as rejected:
+                asyncio.run(starve())
+        self.assertEqual(rejected.exception.status_code, 503)
+        self.assertEqual(controller.stats()["timed_out"], 1)
+
+
+@override_settings(PMS_AI_MEMORY_TURNS=4, PMS_AI_MEMORY_FLUSH_DELAY=0)
+class ConversationMemoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ann", password="x")
+
+    def test_ring_buffer_and_token_budget(self):
+        for i in range(5):
+            ConversationTurn.objects.append([(self.user.id, "user", f"q{i}"), (self.user.id, "assistant", "a" * 40 * i)])
+        self.assertEqual(ConversationTurn.objects.filter(user=self.user).count(), 4)
+        with self.assertNumQueries(1):
+            turns = ConversationTurn.objects.recent(self.user.id)
+        self.assertEqual([t["content"][:2] for t in turns], ["q3", "aa", "q4", "aa"])
+        # 160 characters of the last reply are ~44 tokens, the question before it 4
+        self.assertEqual([t["content"] for t in memory.within_budget(turns, 50)], ["q4", "a" * 160])
+        context = UserContext.objects.create(user=self.user)
+        context.add_message("ai", "hello")
+        self.assertEqual(context.memory[-1], {"ai": "hello"})
+
+    def test_chat_sends_earlier_turns(self):
+        prompts = []
+
+        async def chat(messages, **kwargs):
+            prompts.append(messages)
+            return f"reply {len(prompts)}"
+
+        token = f"Bearer {AccessToken.for_user(self.user)}"
+        with mock.patch("PMS.ollama.chat", chat):
+            for message in ["my name is Ann", "what is my name?"]:
+                response = self.client.post("/api/ai-chat/", {"message": message},
+                                            content_type="application/json", HTTP_AUTHORIZATION=token)
+                self.assertEqual(response.json()["reply"], f"reply {len(prompts)}")
+        self.assertEqual(len(prompts[0]), 1)
+        self.assertEqual(prompts[1][:2], [{"role": "user", "content": "my name is Ann"},
+                                          {"role": "assistant", "content": "reply 1"}])
+        self.assertEqual(ConversationTurn.objects.filter(user=self.user).count(), 4)
+
+    def test_memory_needs_the_users_token(self):
+        ConversationTurn.objects.append([(self.user.id, "user", "my password is hunter2"),
+                                         (self.user.id, "assistant", "noted")])
+        prompts = []
+
+        async def chat(messages, **kwargs):
+            prompts.append(messages)
+            return "hello"
+
+        with mock.patch("PMS.ollama.chat", chat):
+            # naming someone else's id in the body neither reads nor extends their conversation
+            response = self.client.post("/api/ai-chat/", {"message": "what did I tell you?", "user_id": self.user.id},
+                                        content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+            # an expired or forged token is an anonymous chat
+            response = self.client.post("/api/ai-chat/", {"message": "hi"}, content_type="application/json",
+                                        HTTP_AUTHORIZATION="Bearer not-a-token")
+            self.assertEqual((response.status_code, response.json()), (200, {"reply": "hello"}))
+        self.assertEqual([[m["role"] for m in prompt] for prompt in prompts], [["user"], ["user"]])
+        self.assertNotIn("hunter2", prompts[0][0]["content"])
+        self.assertEqual(ConversationTurn.objects.filter(user=self.user).count(), 2)
+
+    def test_created_objects_belong_to_the_token_user(self):
+        self.client.post("/api/ai-chat/", {"message": 'create project "Anon"', "user_id": self.user.id},
+                         content_type="application/json")
+        self.client.post("/api/ai-chat/", {"message": 'create project "Mine"'}, content_type="application/json",
+                         HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        self.assertEqual(dict(Project.objects.values_list("name", "created_by")), {"Anon": None, "Mine": self.user.id})
+
+
+@override_settings(PMS_EMBEDDER="hashing", PMS_SEMANTIC_AUTO_UPDATE=False)
+class SemanticSearchTests(TestCase):
+    def setUp(self):
+        semantic.index.reset()
+        project = Project.objects.create(name="Shop", start_date=date(2026, 1, 1))
+        self.module = Module.objects.create(project=project, name="Checkout", start_date=date(2026, 1, 1))
+        self.payment = Task.objects.create(module=self.module, title="Refund failed payments",
+                                           description="Retry card payment refunds", start_date=date(2026, 1, 1))
+        self.other = Task.objects.create(module=self.module, title="Update the logo", start_date=date(2026, 1, 1))
+
+    def test_vector_index(self):
+        index = semantic.VectorIndex()
+        # keys are search rowids: 6 is a module, 11 and 15 are tasks
+        index.add([6, 11, 15, 19], semantic.normalized([[1, 0], [0, 1], [1, 1], [1, 0]]))
+        index.remove([19])
+        self.assertEqual(len(index), 3)
+        self.assertEqual([key for key, _ in index.search([[1, 0.1]], 2)[0]], [6, 15])
+        self.assertEqual([key for key, _ in index.search([[1, 0]], 5, codes=[3])[0]], [15, 11])
+
+    def test_incremental_update_and_search(self):
+        self.assertEqual(semantic.update_index(), 3)
+        self.assertEqual(semantic.update_index(), 0)
+        response = self.client.get("/api/semantic-search/", {"q": "payment refund", "type": "task"})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([r["id"] for r in results], [self.payment.id, self.other.id])
+
+        # only a text change needs a new embedding
+        self.other.status = "completed"
+        self.other.save()
+        self.assertEqual(Embedding.objects.count(), 3)
+        self.other.title = "Payment provider logo"
+        self.other.save()
+        self.assertEqual(Embedding.objects.count(), 2)
+        self.assertEqual(semantic.update_index(), 1)
+        self.other.delete()
+        self.assertEqual(Embedding.objects.count(), 2)
+        self.assertEqual(self.client.get("/api/semantic-search/").status_code, 400)
+
+    @override_settings(PMS_SEMANTIC_AUTO_UPDATE=True, CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+    def test_background_pass_only_reads_the_written_rows(self):
+        semantic.update_index()
+        for ids in semantic._dirty.values():
+            ids.clear()
+        with mock.patch.object(semantic, "schedule"), self.captureOnCommitCallbacks(execute=True):
+            self.other.title = "Payment provider logo"
+            self.other.save()
+            added = Task.objects.create(module=self.module, title="Chargebacks", start_date=date(2026, 1, 1))
+            # renaming a module through the bulk API drops its embedding too
+            response = self.client.put("/api/modules/bulk/", [{"id": self.module.id, "name": "Payments"}],
+                                       content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(semantic._dirty, {"module": {self.module.id}, "task": {self.other.id, added.id}})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(semantic.update_pending(), 3)
+        table = Embedding._meta.db_table
+        reads = [q["sql"] for q in queries if q["sql"].startswith("SELECT") and table in q["sql"]]
+        self.assertTrue(reads)
+        self.assertTrue(all(" IN (" in sql for sql in reads))
+        self.assertEqual(semantic._dirty, {"module": set(), "task": set()})
+
+    @override_settings(PMS_EMBEDDER="ollama", PMS_SEMANTIC_BATCH_SIZE=2)
+    def test_update_pass_shares_one_client_and_closes_it(self):
+        clients = []
+
+        def handler(request):
+            texts = json.loads(request.content)["input"]
+            return httpx.Response(200, json={"embeddings": [[1.0, float(i)] for i in range(len(texts))]})
+
+        def new_client():
+            clients.append(httpx.AsyncClient(base_url=ollama.base_url(), transport=httpx.MockTransport(handler)))
+            return clients[-1]
+
+        with mock.patch.object(ollama, "_new_client", new_client):
+            # one module, then two tasks in one batch
+            self.assertEqual(semantic.update_index(), 3)
+        self.assertEqual(len(clients), 1)
+        self.assertTrue(clients[0].is_closed)
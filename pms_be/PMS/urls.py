@@ -3,7 +3,27 @@ from .views import *
 
 urlpatterns = [
     path("projects/", ProjectAPI.as_view(), name="projects_api"),
+    path("projects/deletion/", ProjectDeletionAPI.as_view(), name="project_deletion_api"),
+    path("projects/schedule/", ProjectScheduleAPI.as_view(), name="project_schedule_api"),
+    path("projects/burndown/", BurndownAPI.as_view(), name="project_burndown_api"),
+    path("projects/cumulative-flow/", CumulativeFlowAPI.as_view(), name="project_cumulative_flow_api"),
+    path("projects/cycle-time/", CycleTimeAPI.as_view(), name="project_cycle_time_api"),
+    path("projects/tree/", ProjectTreeAPI.as_view(), name="project_tree_api"),
+    path("modules/", ModuleAPI.as_view(), name="modules_api"),
+    path("tasks/", TaskAPI.as_view(), name="tasks_api"),
+    path("tasks/board-summary/", TaskBoardSummaryAPI.as_view(), name="task_board_summary_api"),
+    path("timeline/", TimelineAPI.as_view(), name="timeline_api"),
+    path("modules/bulk/", ModuleBulkAPI.as_view(), name="module_bulk_api"),
+    path("tasks/bulk/", TaskBulkAPI.as_view(), name="task_bulk_api"),
+    path("tasks/dependencies/", TaskDependencyAPI.as_view(), name="task_dependency_api"),
+    path("tasks/import/", task_import_view, name="task_import"),
+    path("exports/<str:entity>/", export_view, name="export"),
+    path("search/", SearchAPI.as_view(), name="search_api"),
+    path("semantic-search/", SemanticSearchView.as_view(), name="semantic_search"),
+    path("workload/", WorkloadAPI.as_view(), name="workload_api"),
+    path("sync/", SyncAPI.as_view(), name="sync_api"),
 
     path("ai-chat/", AIChatView.as_view(), name="ai_chat_api"),
+    path("ai-stats/", AIStatsAPI.as_view(), name="ai_stats_api"),
     path('ai-voicechat/', voicechat, name='ai_voicechat'),
 ]
@@ -1,30 +1,77 @@
+import io
 import json
-import requests
+import time
+from datetime import date
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.core.paginator import Paginator
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.db.models import Prefetch, Q, Count, Max
+from django.utils import timezone
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import require_GET, require_POST
+from django.views.decorators.csrf import csrf_exempt
+
+from .models import Project, Module, Task, ProjectDeletion, TaskDependency, TaskSchedule
+from .serializers import ProjectSerializer, ModuleSerializer, TaskSerializer, ProjectTreeSerializer, TaskDependencySerializer
+from .pagination import KeysetPaginator, InvalidCursor
+from . import admission, analytics, bulk, deletion, exports, imports, intents, listing, llm_cache, memory, metrics, ollama, scheduling, search, semantic, sync, workload
+from .conditional import conditional, collection_stamps, day_stamp
+
+User = get_user_model()
+
+# (start_date, id) is covered by the pms_project_start_id index
+PROJECT_PAGINATOR = KeysetPaginator(ordering=("-start_date", "-id"))
+
+def project_stamps(request):
+    project_id = request.query_params.get("id")
+    if project_id:
+        if not project_id.isdigit():
+            return None
+        version = Project.objects.filter(id=project_id).values_list("version", flat=True).first()
+        return None if version is None else [version]
+    return collection_stamps(Project)
+
+
+def invalid_id_param(params, *names):
+    """400 for the first of these query params that is set but not an id, otherwise None."""
+    for name in names:
+        value = params.get(name)
+        if value and not value.isdigit():
+            return Response({"error": f"{name} must be an id"}, status=status.HTTP_400_BAD_REQUEST)
+    return None
 
-from .models import Project, Module, Task
-from .serializers import ProjectSerializer, ModuleSerializer, TaskSerializer
 
 # ------------- Project manual CRUD via query param id -------------
 class ProjectAPI(APIView):
+    @conditional(project_stamps)
     def get(self, request):
         project_id = request.query_params.get("id")
         if project_id:
             try:
-                project = Project.objects.get(id=project_id)
+                project = Project.objects.get(id=project_id, deleting=False)
                 serializer = ProjectSerializer(project)
                 return Response(serializer.data)
             except Project.DoesNotExist:
                 return Response({"error":"Project not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        # list
-        projects = Project.objects.all().order_by("-created_at")
+        # list (keyset paginated, newest start_date first)
+        try:
+            projects, next_cursor = PROJECT_PAGINATOR.paginate(Project.objects.filter(deleting=False), request)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         serializer = ProjectSerializer(projects, many=True)
-        return Response(serializer.data)
+        return Response({
+            "page_size": PROJECT_PAGINATOR.page_size(request),
+            "next_cursor": next_cursor,
+            "results": serializer.data,
+        })
 
     def post(self, request):
         serializer = ProjectSerializer(data=request.data)
@@ -38,7 +85,7 @@ class ProjectAPI(APIView):
         if not project_id:
             return Response({"error":"id query param required"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            project = Project.objects.get(id=project_id)
+            project = Project.objects.get(id=project_id, deleting=False)
         except Project.DoesNotExist:
             return Response({"error":"Project not found"}, status=status.HTTP_404_NOT_FOUND)
         serializer = ProjectSerializer(project, data=request.data, partial=True)
@@ -53,278 +100,871 @@ class ProjectAPI(APIView):
             return Response({"error":"id query param required"}, status=status.HTTP_400_BAD_REQUEST)
         try:
             project = Project.objects.get(id=project_id)
-            project.delete()
-            return Response({"message":"Deleted"}, status=status.HTTP_200_OK)
         except Project.DoesNotExist:
             return Response({"error":"Project not found"}, status=status.HTTP_404_NOT_FOUND)
-        
-import json
-import requests
-from django.conf import settings
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
-from django.core.paginator import Paginator
+        # modules and tasks are removed in the background, see ProjectDeletionAPI for progress
+        progress = deletion.progress(deletion.request_deletion(project))
+        return Response({"message": "Deletion started", "deletion": progress}, status=status.HTTP_202_ACCEPTED)
 
-from .models import Project, Module, Task
-from .serializers import ProjectSerializer, ModuleSerializer, TaskSerializer
 
-# ------------- Project manual CRUD via query param id -------------
-class ProjectAPI(APIView):
+class ProjectDeletionAPI(APIView):
+    """GET /api/projects/deletion/?id=<project id> -> progress of a background project deletion."""
+
     def get(self, request):
         project_id = request.query_params.get("id")
-        if project_id:
-            try:
-                project = Project.objects.get(id=project_id)
-                serializer = ProjectSerializer(project)
-                return Response(serializer.data)
-            except Project.DoesNotExist:
-                return Response({"error":"Project not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not project_id or not project_id.isdigit():
+            return Response({"error":"id query param required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            record = ProjectDeletion.objects.get(project_id=project_id)
+        except ProjectDeletion.DoesNotExist:
+            return Response({"error":"No deletion for this project"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(deletion.progress(record))
+
+
+# ------------- Module / Task CRUD via query param id -------------
+def row_stamps(model):
+    def stamps(request):
+        pk = request.query_params.get("id")
+        if pk:
+            if not pk.isdigit():
+                return None
+            version = model.objects.filter(id=pk).values_list("version", flat=True).first()
+            return None if version is None else [version]
+        return collection_stamps(model)
+    return stamps
+
+
+class EntityAPI(APIView):
+    """
+    GET    ?id=<id>[&fields=a,b]  -> one row
+    GET    [filters][&fields=a,b][&ordering=][&cursor=&page_size=] -> keyset page
+    POST   create, PUT ?id= partial update, DELETE ?id=
+    Filters, fields and orderings are listed in PMS.listing.
+    """
+    spec = None
+    serializer_class = None
+    name = None
 
-        # list
-        projects = Project.objects.all().order_by("-created_at")
-        serializer = ProjectSerializer(projects, many=True)
-        return Response(serializer.data)
+    def get(self, request):
+        pk = request.query_params.get("id")
+        try:
+            if pk:
+                row = listing.detail(self.spec, pk, request.query_params) if pk.isdigit() else None
+                if row is None:
+                    return Response({"error": f"{self.name} not found"}, status=status.HTTP_404_NOT_FOUND)
+                return Response(row)
+            return Response(listing.page(self.spec, request))
+        except (listing.InvalidQuery, InvalidCursor) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     def post(self, request):
-        serializer = ProjectSerializer(data=request.data)
+        serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def put(self, request):
-        project_id = request.query_params.get("id")
-        if not project_id:
+        pk = request.query_params.get("id")
+        if not pk:
             return Response({"error":"id query param required"}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            project = Project.objects.get(id=project_id)
-        except Project.DoesNotExist:
-            return Response({"error":"Project not found"}, status=status.HTTP_404_NOT_FOUND)
-        serializer = ProjectSerializer(project, data=request.data, partial=True)
+        instance = self.spec.model.objects.filter(self.spec.base, id=pk).first() if pk.isdigit() else None
+        if instance is None:
+            return Response({"error": f"{self.name} not found"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = self.serializer_class(instance, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request):
+        pk = request.query_params.get("id")
+        if not pk:
+            return Response({"error":"id query param required"}, status=status.HTTP_400_BAD_REQUEST)
+        instance = self.spec.model.objects.filter(self.spec.base, id=pk).first() if pk.isdigit() else None
+        if instance is None:
+            return Response({"error": f"{self.name} not found"}, status=status.HTTP_404_NOT_FOUND)
+        instance.delete()
+        return Response({"message":"Deleted"}, status=status.HTTP_200_OK)
+
+
+class ModuleAPI(EntityAPI):
+    spec = listing.MODULES
+    serializer_class = ModuleSerializer
+    name = "Module"
+
+    @conditional(row_stamps(Module))
+    def get(self, request):
+        return super().get(request)
+
+
+class TaskAPI(EntityAPI):
+    spec = listing.TASKS
+    serializer_class = TaskSerializer
+    name = "Task"
+
+    @conditional(row_stamps(Task))
+    def get(self, request):
+        return super().get(request)
+
+
+# ------------- Project -> Module -> Task tree -------------
+class ProjectTreeAPI(APIView):
+    """
+    Nested Project -> Module -> Task tree for the board UI.
+    Always runs 3 queries (projects, modules, tasks) thanks to prefetching,
+    however many rows come back.
+    Optional query params: id (project), status (project status), assigned_to (user id).
+    """
+
+    @conditional(lambda request: collection_stamps(Project, Module, Task))
+    def get(self, request):
+        if error := invalid_id_param(request.query_params, "id", "assigned_to"):
+            return error
         project_id = request.query_params.get("id")
-        if not project_id:
+        project_status = request.query_params.get("status")
+        assigned_to = request.query_params.get("assigned_to")
+
+        projects = Project.objects.filter(deleting=False)
+        modules = Module.objects.order_by("start_date", "id")
+        tasks = Task.objects.order_by("start_date", "id")
+
+        if project_id:
+            projects = projects.filter(id=project_id)
+        if project_status:
+            projects = projects.filter(status=project_status)
+        if assigned_to:
+            # keep only the branches that lead to work owned by this user
+            tasks = tasks.filter(assigned_to_id=assigned_to)
+            modules = modules.filter(
+                Q(assigned_to_id=assigned_to) | Q(tasks__assigned_to_id=assigned_to)
+            ).distinct()
+            projects = projects.filter(
+                Q(modules__assigned_to_id=assigned_to) | Q(modules__tasks__assigned_to_id=assigned_to)
+            ).distinct()
+
+        projects = projects.order_by("start_date", "id").prefetch_related(
+            Prefetch("modules", queryset=modules.prefetch_related(Prefetch("tasks", queryset=tasks)))
+        )
+        serializer = ProjectTreeSerializer(projects, many=True)
+        return Response(serializer.data)
+
+
+
+# ------------- Kanban board summary -------------
+class TaskBoardSummaryAPI(APIView):
+    """
+    Task counts per project and per module, split by status x priority, plus overdue
+    counts (end_date in the past and not completed), from a single GROUP BY query.
+    Optional query params: project, module, assigned_to.
+    """
+
+    # overdue counts change at midnight even without writes
+    @conditional(lambda request: collection_stamps(Module, Task) + [day_stamp()])
+    def get(self, request):
+        if error := invalid_id_param(request.query_params, "project", "module", "assigned_to"):
+            return error
+        project_id = request.query_params.get("project")
+        module_id = request.query_params.get("module")
+        assigned_to = request.query_params.get("assigned_to")
+
+        tasks = Task.objects.filter(module__project__deleting=False)
+        if project_id:
+            tasks = tasks.filter(module__project_id=project_id)
+        if module_id:
+            tasks = tasks.filter(module_id=module_id)
+        if assigned_to:
+            tasks = tasks.filter(assigned_to_id=assigned_to)
+
+        today = timezone.localdate()
+        rows = (
+            tasks.values("module__project_id", "module_id", "status", "priority")
+            .annotate(
+                count=Count("id"),
+                overdue=Count("id", filter=Q(end_date__lt=today) & ~Q(status="completed")),
+            )
+            .order_by()
+        )
+
+        projects, modules = {}, {}
+        for row in rows:
+            module_summary = modules.setdefault(row["module_id"], self.empty_summary())
+            module_summary["project"] = row["module__project_id"]
+            for summary in (projects.setdefault(row["module__project_id"], self.empty_summary()), module_summary):
+                summary["total"] += row["count"]
+                summary["overdue"] += row["overdue"]
+                # values outside the choices (e.g. written by the AI chat) still get counted
+                by_priority = summary["matrix"].setdefault(row["status"], {})
+                by_priority[row["priority"]] = by_priority.get(row["priority"], 0) + row["count"]
+                summary["by_status"][row["status"]] = summary["by_status"].get(row["status"], 0) + row["count"]
+                summary["by_priority"][row["priority"]] = summary["by_priority"].get(row["priority"], 0) + row["count"]
+
+        return Response({"projects": projects, "modules": modules})
+
+    @staticmethod
+    def empty_summary():
+        statuses = [s for s, _ in Task.status_choices]
+        priorities = [p for p, _ in Task.priority_choices]
+        return {
+            "total": 0,
+            "overdue": 0,
+            "by_status": dict.fromkeys(statuses, 0),
+            "by_priority": dict.fromkeys(priorities, 0),
+            "matrix": {s: dict.fromkeys(priorities, 0) for s in statuses},
+        }
+
+
+# ------------- Timeline / Gantt -------------
+class TimelineAPI(APIView):
+    """
+    GET /api/timeline/?start=YYYY-MM-DD&end=YYYY-MM-DD[&project=&module=&assigned_to=]
+    Modules and tasks whose [start_date, end_date] overlaps the window; a null
+    end_date counts as still running. The payload is columnar (one array per
+    field) to keep it small for large windows.
+    """
+    MODULE_COLUMNS = {"id": "id", "project": "project_id", "name": "name", "start": "start_date",
+                      "end": "end_date", "assigned_to": "assigned_to_id"}
+    TASK_COLUMNS = {"id": "id", "module": "module_id", "title": "title", "start": "start_date", "end": "end_date",
+                    "status": "status", "priority": "priority", "assigned_to": "assigned_to_id"}
+
+    @conditional(lambda request: collection_stamps(Module, Task))
+    def get(self, request):
+        try:
+            window_start = date.fromisoformat(request.query_params.get("start", ""))
+            window_end = date.fromisoformat(request.query_params.get("end", ""))
+        except ValueError:
+            return Response({"error": "start and end (YYYY-MM-DD) query params required"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if window_end < window_start:
+            return Response({"error": "end must not be before start"}, status=status.HTTP_400_BAD_REQUEST)
+        if error := invalid_id_param(request.query_params, "project", "module", "assigned_to"):
+            return error
+
+        # two index range branches instead of one OR over a nullable column
+        overlap = (
+            Q(end_date__gte=window_start, start_date__lte=window_end)
+            | Q(end_date__isnull=True, start_date__lte=window_end)
+        )
+        modules = Module.objects.filter(overlap, project__deleting=False)
+        tasks = Task.objects.filter(overlap, module__project__deleting=False)
+
+        project_id = request.query_params.get("project")
+        module_id = request.query_params.get("module")
+        assigned_to = request.query_params.get("assigned_to")
+        if project_id:
+            modules = modules.filter(project_id=project_id)
+            tasks = tasks.filter(module__project_id=project_id)
+        if module_id:
+            modules = modules.filter(id=module_id)
+            tasks = tasks.filter(module_id=module_id)
+        if assigned_to:
+            modules = modules.filter(assigned_to_id=assigned_to)
+            tasks = tasks.filter(assigned_to_id=assigned_to)
+
+        return Response({
+            "window": {"start": window_start, "end": window_end},
+            "modules": self.columns(modules.order_by("start_date", "id"), self.MODULE_COLUMNS),
+            "tasks": self.columns(tasks.order_by("start_date", "id"), self.TASK_COLUMNS),
+        })
+
+    @staticmethod
+    def columns(queryset, mapping):
+        rows = list(queryset.values_list(*mapping.values()))
+        return {name: [row[i] for row in rows] for i, name in enumerate(mapping)}
+
+
+# ------------- Task dependencies / critical path -------------
+class TaskDependencyAPI(APIView):
+    """
+    GET    /api/tasks/dependencies/?task=<id>   -> links into and out of a task
+    POST   /api/tasks/dependencies/             {"predecessor", "successor", "lag_days"}
+    DELETE /api/tasks/dependencies/?id=<link id>
+    """
+
+    def get(self, request):
+        task_id = request.query_params.get("task")
+        if not task_id or not task_id.isdigit():
+            return Response({"error":"task query param required"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "predecessors": TaskDependencySerializer(TaskDependency.objects.filter(successor_id=task_id), many=True).data,
+            "successors": TaskDependencySerializer(TaskDependency.objects.filter(predecessor_id=task_id), many=True).data,
+        })
+
+    def post(self, request):
+        serializer = TaskDependencySerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def delete(self, request):
+        link_id = request.query_params.get("id")
+        if not link_id:
             return Response({"error":"id query param required"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            project = Project.objects.get(id=project_id)
-            project.delete()
+            TaskDependency.objects.get(id=link_id).delete()
             return Response({"message":"Deleted"}, status=status.HTTP_200_OK)
-        except Project.DoesNotExist:
+        except TaskDependency.DoesNotExist:
+            return Response({"error":"Dependency not found"}, status=status.HTTP_404_NOT_FOUND)
+
+
+class ProjectScheduleAPI(APIView):
+    """
+    GET /api/projects/schedule/?id=<project id>[&critical=1]
+    Early / late dates, slack and the critical path (columnar, in schedule order).
+    """
+    COLUMNS = {"task": "task_id", "early_start": "early_start", "early_finish": "early_finish",
+               "late_start": "late_start", "late_finish": "late_finish", "slack": "slack", "critical": "critical"}
+
+    def get(self, request):
+        project_id = request.query_params.get("id")
+        if not project_id or not project_id.isdigit():
+            return Response({"error":"id query param required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not Project.objects.filter(id=project_id, deleting=False).exists():
             return Response({"error":"Project not found"}, status=status.HTTP_404_NOT_FOUND)
-        
-import json
-import requests
-from django.contrib.auth import get_user_model
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from .models import Project, Module, Task
-from .serializers import ProjectSerializer, ModuleSerializer, TaskSerializer
 
-User = get_user_model()
+        rows = TaskSchedule.objects.filter(project_id=project_id)
+        if not rows.exists():
+            # first request for a project scheduled before dependencies existed
+            scheduling.schedule_project(int(project_id))
+        if request.query_params.get("critical") in ("1", "true", "yes"):
+            rows = rows.filter(critical=True)
+        rows = rows.order_by("early_start", "early_finish", "task_id")
+        finish = TaskSchedule.objects.filter(project_id=project_id).aggregate(finish=Max("early_finish"))["finish"]
+        return Response({
+            "project": int(project_id),
+            "finish": finish,
+            "critical_path": scheduling.critical_path(project_id),
+            "tasks": TimelineAPI.columns(rows, self.COLUMNS),
+        })
+
+
+# ------------- Burndown / flow analytics -------------
+class ProjectAnalyticsAPI(APIView):
+    """
+    GET ?id=<project id>[&start=YYYY-MM-DD&end=YYYY-MM-DD]
+    One value per day (last 30 days by default), read from the daily snapshots.
+    """
+    report = None
+
+    def get(self, request):
+        project_id = request.query_params.get("id")
+        if not project_id or not project_id.isdigit():
+            return Response({"error":"id query param required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start = request.query_params.get("start")
+            end = request.query_params.get("end")
+            start, end = analytics.window(
+                date.fromisoformat(start) if start else None, date.fromisoformat(end) if end else None,
+            )
+        except ValueError as e:
+            return Response({"error": f"Invalid window: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        project = Project.objects.filter(id=project_id, deleting=False).first()
+        if project is None:
+            return Response({"error":"Project not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"project": project.id, "start": start, "end": end, **self.report(project, start, end)})
+
+
+class BurndownAPI(ProjectAnalyticsAPI):
+    """Remaining (not completed) tasks per day, with an ideal line to the project end date."""
+    report = staticmethod(analytics.burndown)
+
+
+class CumulativeFlowAPI(ProjectAnalyticsAPI):
+    """Tasks per status per day."""
+    report = staticmethod(analytics.cumulative_flow)
+
 
+class CycleTimeAPI(ProjectAnalyticsAPI):
+    """Tasks created / completed per day and the average in progress -> completed time."""
+    report = staticmethod(analytics.cycle_time)
 
-class AIChatView(APIView):
+
+# ------------- Batched module / task writes -------------
+class BulkWriteAPI(APIView):
     """
-    AI-powered dynamic Project/Module/Task creation via natural language.
-    - If the message is casual (hi, how are you, etc.), returns AI text reply.
-    - If the message requests project/module/task creation, creates it dynamically.
+    POST a list to create, PUT a list (each item with "id") to partially update.
+    All items are validated before anything is written; on any error nothing is
+    saved and the errors come back per item index.
     """
+    spec = None
+    output_serializer = None
 
     def post(self, request):
-        message = request.data.get("message")
-        user_id = request.data.get("user_id")
-        user = None
+        objs, errors = bulk.create(self.spec, request.data)
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"count": len(objs), "results": self.output_serializer(objs, many=True).data},
+                        status=status.HTTP_201_CREATED)
 
-        if user_id:
-            try:
-                user = User.objects.get(id=user_id)
-            except User.DoesNotExist:
-                pass
+    def put(self, request):
+        objs, errors = bulk.update(self.spec, request.data)
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"count": len(objs), "results": self.output_serializer(objs, many=True).data})
+
+
+class ModuleBulkAPI(BulkWriteAPI):
+    spec = bulk.MODULES
+    output_serializer = ModuleSerializer
+
+
+class TaskBulkAPI(BulkWriteAPI):
+    spec = bulk.TASKS
+    output_serializer = TaskSerializer
+
+
+
+# ------------- Full-text search -------------
+class SearchAPI(APIView):
+    """
+    GET /api/search/?q=<text>&type=project,module,task&project=<id>&limit=20
+    Ranked prefix matches from the FTS5 index (titles weigh more than descriptions).
+    """
 
-        if not message:
-            return Response({"error": "Message required"}, status=400)
+    def get(self, request):
+        text = request.query_params.get("q", "").strip()
+        if not text:
+            return Response({"error": "q query param required"}, status=status.HTTP_400_BAD_REQUEST)
+        kinds = [k for k in request.query_params.get("type", "").split(",") if k]
+        if any(k not in search.KINDS for k in kinds):
+            return Response({"error": "type must be project, module and/or task"}, status=status.HTTP_400_BAD_REQUEST)
+        project_id = request.query_params.get("project")
+        if project_id and not project_id.isdigit():
+            return Response({"error": "project must be an id"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 20)), 100))
+        except ValueError:
+            limit = 20
+        return Response({"results": search.search(text, kinds=kinds, project_id=project_id, limit=limit)})
+
+
+# ------------- Semantic search -------------
+class SemanticSearchView(View):
+    """
+    GET /api/semantic-search/?q=<text>&type=module,task&limit=20
+    Modules and tasks ranked by how close their text is in meaning to q (cosine
+    similarity of embeddings, see PMS.semantic). Rows edited in the last moments
+    may not be embedded yet.
+    """
 
+    async def get(self, request):
+        text = request.GET.get("q", "").strip()
+        if not text:
+            return JsonResponse({"error": "q query param required"}, status=400)
+        kinds = [k for k in request.GET.get("type", "").split(",") if k]
+        if any(k not in semantic.MODELS for k in kinds):
+            return JsonResponse({"error": "type must be module and/or task"}, status=400)
         try:
-            # 🔹 Dynamically generate prompt
-            prompt = (
-                f"You are a project management assistant.\n"
-                f"The user sent the following message:\n\"{message}\"\n\n"
-                f"If the message is about creating a project, module, or task, "
-                f"respond ONLY in JSON with one of these actions: "
-                f"\"create_project\", \"create_module\", or \"create_task\".\n"
-                f"The JSON must include all relevant fields. Example:\n"
-                f"{{\n"
-                f"  \"action\": \"create_project|create_module|create_task\",\n"
-                f"  \"data\": {{\n"
-                f"    \"name\": \"...\",\n"
-                f"    \"project_name\": \"...\" (for module),\n"
-                f"    \"module_name\": \"...\" (for task),\n"
-                f"    \"description\": \"...\",\n"
-                f"    \"start_date\": \"YYYY-MM-DD\",\n"
-                f"    \"end_date\": \"YYYY-MM-DD\",\n"
-                f"    \"priority\": \"low|medium|high|urgent\",\n"
-                f"    \"status\": \"todo|in_progress|review|completed\"\n"
-                f"  }}\n"
-                f"}}\n"
-                f"If the message is casual chat, respond normally in plain text."
-            )
+            limit = max(1, min(int(request.GET.get("limit", 20)), 100))
+        except ValueError:
+            limit = 20
+        try:
+            results = await semantic.semantic_search(text, kinds=kinds, limit=limit)
+        except admission.Rejected as e:
+            return rejected_response(e)
+        except ollama.OllamaError as e:
+            return JsonResponse({"error": f"Failed to connect to Ollama: {e}"}, status=502)
+        return JsonResponse({"results": results})
+
+
+# ------------- Per-user workload -------------
+class WorkloadAPI(APIView):
+    """
+    GET /api/workload/?users=1,2,3
+    Open / overdue tasks (by status and priority) and modules per assignee. Without
+    users, every active user is listed. Served from a per-user cache.
+    """
 
-            # 🔹 Call Ollama API
-            response = requests.post(
-                "http://127.0.0.1:11434/api/chat",
-                json={"model": "llama3:latest", "messages": [{"role": "user", "content": prompt}], "stream": False},
+    def get(self, request):
+        users = User.objects.filter(is_active=True)
+        raw_ids = [u for u in request.query_params.get("users", "").split(",") if u]
+        if raw_ids:
+            if not all(u.isdigit() for u in raw_ids):
+                return Response({"error": "users must be a comma separated list of ids"}, status=status.HTTP_400_BAD_REQUEST)
+            users = User.objects.filter(id__in=raw_ids)
+        names = dict(users.order_by("username").values_list("id", "username"))
+        loads = workload.workload(list(names))
+        return Response({
+            "date": timezone.localdate(),
+            "results": [{"user": user_id, "username": username, **loads[user_id]} for user_id, username in names.items()],
+        })
+
+
+# ------------- Delta sync -------------
+class SyncAPI(APIView):
+    """
+    GET /api/sync/?since=<seq>&limit=500&project=<id>
+    What changed after `since`: current rows of created / updated entities and ids of
+    deleted ones, at most `limit` log entries per call. Keep calling with next_since
+    while has_more is true. 410 means the client is too far behind and must reload.
+    """
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get("since", 0))
+            limit = int(request.query_params.get("limit", getattr(settings, "PMS_MAX_PAGE_SIZE", 500)))
+        except ValueError:
+            return Response({"error": "since and limit must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0:
+            return Response({"error": "since must not be negative"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, 5000))
+        project_id = request.query_params.get("project")
+        if project_id and not project_id.isdigit():
+            return Response({"error": "project must be an id"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return Response(sync.changes_since(since, limit, project_id=project_id))
+        except sync.SyncExpired:
+            return Response(
+                {"error": "Changes since this sequence were compacted, reload everything", "latest": sync.latest_seq()},
+                status=status.HTTP_410_GONE,
             )
 
-            data = response.json()
-            ai_content = data.get("message", {}).get("content", "")
-            print("AI raw content:", ai_content, flush=True)
 
-            if not ai_content:
-                return Response({"reply": "⚠ Model loaded but returned empty response."})
+# ------------- Streaming exports -------------
+@require_GET
+def export_view(request, entity):
+    """
+    GET /api/exports/<projects|modules|tasks>/?format=csv|ndjson&gzip=1&project=<id>
+    Streams the rows instead of building the whole file in memory.
+    """
+    if entity not in exports.EXPORTS:
+        return JsonResponse({"error": f"Unknown export '{entity}'"}, status=404)
+    fmt = request.GET.get("format", "csv")
+    if fmt not in exports.FORMATS:
+        return JsonResponse({"error": "format must be csv or ndjson"}, status=400)
+    use_gzip = request.GET.get("gzip") in ("1", "true", "yes")
+    project_id = request.GET.get("project")
+    if project_id and not project_id.isdigit():
+        return JsonResponse({"error": "project must be an id"}, status=400)
+
+    chunks, content_type, filename = exports.stream_export(
+        entity, fmt=fmt, gzip=use_gzip, project_id=project_id
+    )
+    response = StreamingHttpResponse(exports.streaming_content(request, chunks), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+
+# ------------- CSV task import -------------
+@csrf_exempt
+@require_POST
+def task_import_view(request):
+    """
+    POST /api/tasks/import/ (multipart, field "file", optional batch_size)
+    Streams NDJSON progress lines, one per inserted batch; the last line has done=true
+    and the per-line errors, plus "error" / "line" if the file stopped being readable.
+    """
+    upload = request.FILES.get("file")
+    if not upload:
+        return JsonResponse({"error": "file required"}, status=400)
+    try:
+        batch_size = max(1, min(int(request.POST.get("batch_size", imports.DEFAULT_BATCH_SIZE)), 10000))
+    except ValueError:
+        return JsonResponse({"error": "batch_size must be a number"}, status=400)
+
+    text_stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    lines = (json.dumps(event) + "\n" for event in imports.iter_import(text_stream, batch_size))
+    return StreamingHttpResponse(exports.streaming_content(request, lines), content_type="application/x-ndjson")
+
+
+
+# ------------- AI chat (Ollama, see PMS.ollama) -------------
+class AIStatsAPI(APIView):
+    """
+    GET /api/ai-stats/ -> counters of the AI endpoints: reply cache hits / misses,
+    how AI chat requests were answered (fast_path, cache, llm, rejected) with their
+    latency, and the Ollama admission queue (depth, rejections, wait per priority).
+    """
+
+    def get(self, request):
+        return Response({
+            "cache": llm_cache.replies.stats(),
+            "ai_chat": metrics.ai_chat.stats(),
+            "admission": admission.controller.stats(),
+        })
+
+
+# Async views: while Ollama generates, the request only holds a coroutine. The ORM
+# work around it runs in a thread (sync_to_async).
+CHAT_PROMPT = (
+    "You are a project management assistant.\n"
+    "The user sent the following message:\n\"{message}\"\n\n"
+    "If the message is about creating a project, module, or task, "
+    "respond ONLY in JSON with one of these actions: "
+    "\"create_project\", \"create_module\", or \"create_task\".\n"
+    "The JSON must include all relevant fields. Example:\n"
+    "{{\n"
+    "  \"action\": \"create_project|create_module|create_task\",\n"
+    "  \"data\": {{\n"
+    "    \"name\": \"...\",\n"
+    "    \"project_name\": \"...\" (for module),\n"
+    "    \"module_name\": \"...\" (for task),\n"
+    "    \"description\": \"...\",\n"
+    "    \"start_date\": \"YYYY-MM-DD\",\n"
+    "    \"end_date\": \"YYYY-MM-DD\",\n"
+    "    \"priority\": \"low|medium|high|urgent\",\n"
+    "    \"status\": \"todo|in_progress|review|completed\"\n"
+    "  }}\n"
+    "}}\n"
+    "If the message is casual chat, respond normally in plain text."
+)
+
+def jwt_user(request):
+    """
+    The user of the request's JWT, as the DRF views authenticate it, or None without
+    one. Raises AuthenticationFailed for a bad or expired token.
+    """
+    authenticated = JWTAuthentication().authenticate(request)
+    return authenticated[0] if authenticated else None
+
+
+def request_json(request):
+    """Body of a JSON or form POST as a dict."""
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST.dict()
 
-            # 🔹 Try to parse JSON (for project/module/task)
-            try:
-                ai_json = json.loads(ai_content)
-                action = ai_json.get("action")
-                payload = ai_json.get("data", {})
-                print("Parsed action:", action, "Payload:", payload, flush=True)
-            except json.JSONDecodeError:
-                # Not JSON → treat as normal chat
-                return Response({"reply": ai_content})
-
-            # 🔹 Validate required fields before creating DB entries
-            required_fields = {
-                "create_project": ["name", "start_date"],
-                "create_module": ["name", "project_name", "start_date"],
-                "create_task": ["title", "module_name", "start_date"],
-            }
-
-            missing_fields = [f for f in required_fields.get(action, []) if not payload.get(f)]
-            if missing_fields:
-                # Not enough info → reply AI content instead
-                return Response({"reply": ai_content})
-
-            # 🔹 Map actions to DB operations
-            result = {}
-            if action == "create_project":
-                project = Project.objects.create(
-                    name=payload.get("name"),
-                    description=payload.get("description", ""),
-                    start_date=payload.get("start_date"),
-                    end_date=payload.get("end_date"),
-                    created_by=user,
-                )
-                result = ProjectSerializer(project).data
-
-            elif action == "create_module":
-                project_name = payload.get("project_name")
-                try:
-                    project = Project.objects.get(name=project_name)
-                except Project.DoesNotExist:
-                    return Response({"reply": f"Project '{project_name}' not found."}, status=404)
-
-                module = Module.objects.create(
-                    project=project,
-                    name=payload.get("name"),
-                    description=payload.get("description", ""),
-                    start_date=payload.get("start_date"),
-                    end_date=payload.get("end_date"),
-                    assigned_to=user,
-                )
-                result = ModuleSerializer(module).data
-
-            elif action == "create_task":
-                module_name = payload.get("module_name")
-                try:
-                    module = Module.objects.get(name=module_name)
-                except Module.DoesNotExist:
-                    return Response({"reply": f"Module '{module_name}' not found."}, status=404)
-
-                task = Task.objects.create(
-                    module=module,
-                    title=payload.get("name") or payload.get("title"),
-                    description=payload.get("description", ""),
-                    start_date=payload.get("start_date"),
-                    end_date=payload.get("end_date"),
-                    priority=payload.get("priority", "medium"),
-                    status=payload.get("status", "todo"),
-                    assigned_to=user,
-                )
-                result = TaskSerializer(task).data
-
-            else:
-                # Unknown action → treat as normal chat
-                return Response({"reply": ai_content})
-
-            return Response({"reply": f"✅ {action} executed!", "created": result})
 
+def rejected_response(error, key="error"):
+    """429 / 503 with Retry-After for a call the Ollama admission queue turned away."""
+    response = JsonResponse({key: str(error)}, status=error.status_code)
+    response["Retry-After"] = str(int(error.retry_after))
+    return response
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AIChatView(View):
+    """
+    AI-powered dynamic Project/Module/Task creation via natural language.
+    - If the message is casual (hi, how are you, etc.), returns AI text reply.
+    - If the message requests project/module/task creation, creates it dynamically.
+    - With a JWT ("Authorization: Bearer ..."), earlier turns of that user's
+      conversation are sent along (PMS.memory), the exchange is remembered and what
+      it creates is attributed to them. Without a valid token (none, or an expired
+      one) the chat still works, anonymously and without memory.
+    """
+    required_fields = {
+        "create_project": ["name", "start_date"],
+        "create_module": ["name", "project_name", "start_date"],
+        "create_task": ["title", "module_name", "start_date"],
+    }
+
+    async def post(self, request):
+        started = time.perf_counter()
+        data = request_json(request)
+        try:
+            user = await sync_to_async(jwt_user)(request)
+        except AuthenticationFailed:
+            # e.g. an access token that expired while the chat was open
+            user = None
+        user_id = user.id if user else None
+        path, response = await self.answer(data, user_id)
+        if path:
+            metrics.ai_chat.record(path, time.perf_counter() - started)
+        if path and user_id:
+            await memory.remember(user_id, data["message"], json.loads(response.content).get("reply"))
+        return response
+
+    async def answer(self, data, user_id=None):
+        """
+        (how it was answered: fast_path / cache / llm / rejected / None, response);
+        user_id is the authenticated user, whose conversation is the context.
+        """
+        message = data.get("message")
+        if not isinstance(message, str) or not message.strip():
+            return None, JsonResponse({"error": "Message required"}, status=400)
+
+        # unambiguous create commands don't need the model at all
+        intent = intents.parse(message)
+        if intent is not None:
+            return "fast_path", await self.run_action(intent["action"], intent["data"], user_id)
+
+        # plain chat replies are cached; create commands always go to the model, and
+        # so does anything said in an ongoing conversation (the reply depends on it)
+        history = await memory.context(user_id)
+        cache_key, cached = llm_cache.lookup(message, ollama.model(), CHAT_PROMPT) if not history else (None, None)
+        if cached is not None:
+            return "cache", cached_response({"reply": cached})
+        try:
+            ai_content = await ollama.chat(history + [{"role": "user", "content": CHAT_PROMPT.format(message=message)}])
+        except admission.Rejected as e:
+            return "rejected", rejected_response(e)
+        except ollama.OllamaError as e:
+            return "llm", JsonResponse({"error": f"Failed to connect to Ollama: {e}"}, status=502)
+
+        if not ai_content:
+            return "llm", JsonResponse({"reply": "⚠ Model loaded but returned empty response."})
+
+        # 🔹 Try to parse JSON (for project/module/task)
+        try:
+            ai_json = json.loads(ai_content)
+        except json.JSONDecodeError:
+            ai_json = None
+        if not isinstance(ai_json, dict):
+            # Not a JSON object → treat as normal chat
+            llm_cache.store(cache_key, ai_content)
+            return "llm", JsonResponse({"reply": ai_content})
+        action, payload = ai_json.get("action"), ai_json.get("data")
+
+        # 🔹 Not an action, or not enough info → reply AI content instead
+        if (not isinstance(action, str) or action not in self.required_fields or not isinstance(payload, dict)
+                or any(not payload.get(f) for f in self.required_fields[action])):
+            return "llm", JsonResponse({"reply": ai_content})
+        return "llm", await self.run_action(action, payload, user_id)
+
+    async def run_action(self, action, payload, user_id):
+        try:
+            body, status_code = await sync_to_async(self.execute)(action, payload, user_id)
         except Exception as e:
-            return Response({"error": f"Failed to connect to Ollama: {str(e)}"}, status=500)
+            return JsonResponse({"error": f"Failed to execute {action}: {e}"}, status=500)
+        return JsonResponse(body, status=status_code)
+
+    @staticmethod
+    def execute(action, payload, user_id):
+        """Map an action to DB operations -> (response body, status)."""
+        user = User.objects.filter(id=user_id).first() if user_id else None
+
+        if action == "create_project":
+            project = Project.objects.create(
+                name=payload.get("name"),
+                description=payload.get("description", ""),
+                start_date=payload.get("start_date"),
+                end_date=payload.get("end_date"),
+                created_by=user,
+            )
+            result = ProjectSerializer(project).data
 
+        elif action == "create_module":
+            project_name = payload.get("project_name")
+            try:
+                project = Project.objects.get(name=project_name)
+            except Project.DoesNotExist:
+                return {"reply": f"Project '{project_name}' not found."}, 404
+
+            module = Module.objects.create(
+                project=project,
+                name=payload.get("name"),
+                description=payload.get("description", ""),
+                start_date=payload.get("start_date"),
+                end_date=payload.get("end_date"),
+                assigned_to=user,
+            )
+            result = ModuleSerializer(module).data
 
+        else:
+            module_name = payload.get("module_name")
+            try:
+                module = Module.objects.get(name=module_name)
+            except Module.DoesNotExist:
+                return {"reply": f"Module '{module_name}' not found."}, 404
+            except Module.MultipleObjectsReturned:
+                return {"reply": f"More than one module is called '{module_name}'."}, 400
+
+            task = Task.objects.create(
+                module=module,
+                title=payload.get("name") or payload.get("title"),
+                description=payload.get("description", ""),
+                start_date=payload.get("start_date"),
+                end_date=payload.get("end_date"),
+                priority=payload.get("priority", "medium"),
+                status=payload.get("status", "todo"),
+                assigned_to=user,
+            )
+            result = TaskSerializer(task).data
+
+        return {"reply": f"✅ {action} executed!", "created": result}, 200
+
+
+async def sse_tokens(pieces):
+    """
+    Server-sent events for a streamed reply: one "token" event per piece, then
+    "done" with the whole reply (or "error").
+    """
+    reply = []
+    try:
+        async for piece in pieces:
+            reply.append(piece)
+            yield f"event: token\ndata: {json.dumps({'token': piece})}\n\n"
+    except ollama.OllamaError as e:
+        yield f"event: error\ndata: {json.dumps({'error': f'Error contacting LLM: {e}'})}\n\n"
+        return
+    yield f"event: done\ndata: {json.dumps({'reply': ''.join(reply) or 'Sorry, no response from LLM.'})}\n\n"
+
+
+def cached_response(body):
+    response = JsonResponse(body)
+    response["X-Cache"] = "HIT"
+    return response
+
+
+async def prepend(first, pieces):
+    if first is not None:
+        yield first
+    async for piece in pieces:
+        yield piece
+
+
+def sse_response(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # keep reverse proxies (nginx) from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
 
-# ai_voicechat/views.py
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-import json
-import requests
 
 @csrf_exempt
-def voicechat(request):
+async def voicechat(request):
+    """
+    POST {"message": "..."} -> {"reply": "..."} once the reply is complete, or with
+    "stream": true (or ?stream=1) server-sent events carrying it token by token.
+    """
     if request.method != "POST":
         return JsonResponse({"reply": "Only POST requests allowed"}, status=405)
 
     try:
         data = json.loads(request.body)
-        message = data.get("message", "").strip()
-        if not message:
-            return JsonResponse({"reply": "No message provided"}, status=400)
-
-        # Call Ollama with summarization instruction
-        ollama_url = "http://127.0.0.1:11434/api/chat"
-        payload = {
-            "model": "llama3:latest",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a helpful AI assistant. Always summarize your replies into maximum 3 lines. Be concise, clear, and informative."
-                },
-                {
-                    "role": "user",
-                    "content": message
-                }
-            ]
-        }
-
-        resp = requests.post(ollama_url, json=payload, timeout=10)
-        resp.raise_for_status()
+    except ValueError:
+        return JsonResponse({"reply": "Invalid JSON body"}, status=400)
+    message = data.get("message") if isinstance(data, dict) else None
+    message = message.strip() if isinstance(message, str) else ""
+    if not message:
+        return JsonResponse({"reply": "No message provided"}, status=400)
+
+    # Call Ollama with summarization instruction
+    messages = [
+        {"role": "system", "content": ollama.VOICE_SYSTEM_PROMPT},
+        {"role": "user", "content": message},
+    ]
+    stream = data.get("stream") is True or request.GET.get("stream") in ("1", "true", "yes")
+    cache_key, cached = llm_cache.lookup(message, ollama.model(), ollama.VOICE_SYSTEM_PROMPT)
+    if cached is not None:
+        if stream:
+            return sse_response(sse_tokens(llm_cache.replay(cached)))
+        return cached_response({"reply": cached})
+    if stream:
+        pieces = llm_cache.remembered(ollama.stream_chat(messages, priority="interactive"), cache_key)
+        # wait for the first token before answering, so that being turned away by the
+        # admission queue (or Ollama being down) still gets a proper status code
+        try:
+            first = await anext(pieces, None)
+        except admission.Rejected as e:
+            return rejected_response(e, key="reply")
+        except ollama.OllamaError as e:
+            return JsonResponse({"reply": f"Error contacting LLM: {e}"}, status=502)
+        return sse_response(sse_tokens(prepend(first, pieces)))
 
-        # Handle streaming multiple JSON lines
-        lines = [line for line in resp.text.split("\n") if line.strip()]
-        full_reply = ""
-        for line in lines:
-            try:
-                llm_response = json.loads(line)
-                msg_content = llm_response.get("message", {}).get("content")
-                if msg_content:
-                    full_reply += msg_content
-            except json.JSONDecodeError:
-                continue
-
-        if not full_reply:
-            full_reply = "Sorry, no response from LLM."
-
-        return JsonResponse({"reply": full_reply})
-
-    except requests.exceptions.RequestException as e:
-        print("Requests error:", e)
-        return JsonResponse({"reply": f"Error contacting LLM: {str(e)}"}, status=500)
-    except Exception as e:
-        print("General error:", e)
-        return JsonResponse({"reply": f"Error: {str(e)}"}, status=500)
+    try:
+        reply = await ollama.chat(messages, priority="interactive")
+        llm_cache.store(cache_key, reply)
+    except admission.Rejected as e:
+        return rejected_response(e, key="reply")
+    except ollama.OllamaError as e:
+        return JsonResponse({"reply": f"Error contacting LLM: {e}"}, status=502)
+
+    return JsonResponse({"reply": reply or "Sorry, no response from LLM."})
@@ -0,0 +1,104 @@
+"""
+Per-user workload: open / overdue tasks by status and priority, and open / overdue
+modules, for whoever they are assigned to.
+
+Users missing from the cache are computed together with one GROUP BY over Task
+(served by the pms_task_assignee_board index) and one over Module, however many
+users are asked for. Entries are cached per user and dropped by PMS.signals when a
+task or module assigned to that user changes; bulk task writes bump a generation
+number instead, which retires every cached entry at once.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Module, Task
+
+CACHE_TIMEOUT = 6 * 60 * 60
+GENERATION_KEY = "pms:workload:generation"
+CHUNK_SIZE = 500
+
+OPEN_STATUSES = [s for s, _ in Task.status_choices if s != "completed"]
+PRIORITIES = [p for p, _ in Task.priority_choices]
+
+
+def _generation():
+    # a fresh generation after eviction must not match keys written before it
+    return cache.get_or_set(GENERATION_KEY, time.time_ns, None)
+
+
+def _key(generation, user_id, today):
+    # overdue depends on the date, so entries also expire at midnight
+    return f"pms:workload:{generation}:{today.isoformat()}:{user_id}"
+
+
+def _empty():
+    return {
+        "tasks": {"open": 0, "overdue": 0, "by_status": dict.fromkeys(OPEN_STATUSES, 0), "by_priority": dict.fromkeys(PRIORITIES, 0)},
+        "modules": {"open": 0, "overdue": 0},
+    }
+
+
+def compute(user_ids, today):
+    """{user_id: workload} straight from the database, two queries per chunk of users."""
+    result = {u: _empty() for u in user_ids}
+    user_ids = list(user_ids)
+    for i in range(0, len(user_ids), CHUNK_SIZE):
+        chunk = user_ids[i:i + CHUNK_SIZE]
+        task_rows = (
+            Task.objects.filter(assigned_to_id__in=chunk, status__in=OPEN_STATUSES, module__project__deleting=False)
+            .values("assigned_to_id", "status", "priority")
+            .annotate(n=Count("id"), overdue=Count("id", filter=Q(end_date__lt=today)))
+            .order_by()
+        )
+        for row in task_rows:
+            tasks = result[row["assigned_to_id"]]["tasks"]
+            tasks["open"] += row["n"]
+            tasks["overdue"] += row["overdue"]
+            tasks["by_status"][row["status"]] += row["n"]
+            tasks["by_priority"][row["priority"]] = tasks["by_priority"].get(row["priority"], 0) + row["n"]
+
+        # a module is open until all of its tasks are completed (rollup counters, no join)
+        module_rows = (
+            Module.objects.filter(assigned_to_id__in=chunk, project__deleting=False)
+            .filter(Q(tasks_total=0) | Q(tasks_completed__lt=F("tasks_total")))
+            .values("assigned_to_id")
+            .annotate(n=Count("id"), overdue=Count("id", filter=Q(end_date__lt=today)))
+            .order_by()
+        )
+        for row in module_rows:
+            result[row["assigned_to_id"]]["modules"] = {"open": row["n"], "overdue": row["overdue"]}
+    return result
+
+
+def workload(user_ids):
+    """{user_id: workload} served from the cache where possible."""
+    today = timezone.localdate()
+    generation = _generation()
+    keys = {u: _key(generation, u, today) for u in user_ids}
+    cached = cache.get_many(keys.values())
+    result = {u: cached[k] for u, k in keys.items() if k in cached}
+
+    missing = [u for u in user_ids if u not in result]
+    if missing:
+        fresh = compute(missing, today)
+        cache.set_many({keys[u]: data for u, data in fresh.items()}, CACHE_TIMEOUT)
+        result.update(fresh)
+    return result
+
+
+def invalidate(*user_ids):
+    user_ids = {u for u in user_ids if u}
+    if user_ids:
+        today = timezone.localdate()
+        generation = _generation()
+        cache.delete_many([_key(generation, u, today) for u in user_ids])
+
+
+def invalidate_all():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), None)
@@ -144,8 +144,20 @@ CSRF_TRUSTED_ORIGINS = [
     "http://localhost:8006",
 ]
 
-# OLLAMA_URL = "http://192.168.0.108:11434/api/chat"
-OLLAMA_URL = "http://localhost:11434/api/chat"
+# Ollama chat backend (PMS.ollama): base URL, model and client limits
+# OLLAMA_URL = "http://192.168.0.108:11434"
+OLLAMA_URL = "http://localhost:11434"
+OLLAMA_MODEL = "llama3:latest"
+OLLAMA_EMBED_MODEL = "nomic-embed-text"
+OLLAMA_TIMEOUT = 120          # seconds to wait for a reply
+OLLAMA_CONNECT_TIMEOUT = 5
+OLLAMA_RETRIES = 2            # on connection errors and 502/503/504
+OLLAMA_MAX_CONNECTIONS = 50   # keep-alive pool per event loop
+# admission control (PMS.admission): calls running at once, calls allowed to wait
+# (more get 429) and seconds a call may wait before it gets 503
+OLLAMA_CONCURRENCY = 2
+OLLAMA_QUEUE_SIZE = 32
+OLLAMA_QUEUE_TIMEOUT = 30
 ASGI_APPLICATION = "be.asgi.application"
 
 
@@ -156,4 +168,62 @@ CHANNEL_LAYERS = {
             "hosts": [("127.0.0.1", 6379)],
         },
     },
-}
\ No newline at end of file
+}
+
+
+# -------------------------------
+# 🔹 PMS
+# -------------------------------
+# Keyset pagination defaults for list endpoints (?page_size=)
+PMS_PAGE_SIZE = 50
+PMS_MAX_PAGE_SIZE = 500
+
+# DELETE /api/projects/ flags the project and removes its rows from a background
+# thread (PMS.deletion); with False they stay until `manage.py purge_deleted_projects`
+PMS_DELETE_IN_BACKGROUND = True
+
+# Cached assistant replies for repeated chat prompts (PMS.llm_cache), per process
+PMS_LLM_CACHE_TTL = 60 * 60
+PMS_LLM_CACHE_MAX_ENTRIES = 1000
+PMS_LLM_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# AI chat conversation memory (PMS.memory): turns kept per user, token budget of the
+# history sent with a prompt, and batching of the writes (a delay of 0 writes each
+# exchange right away; e.g. 0.5 buffers turns and inserts them together)
+PMS_AI_MEMORY_TURNS = 20
+PMS_AI_MEMORY_TOKENS = 1000
+PMS_AI_MEMORY_FLUSH_DELAY = 0
+PMS_AI_MEMORY_FLUSH_SIZE = 200
+
+# Semantic search over modules and tasks (PMS.semantic): "ollama" embeds with
+# OLLAMA_EMBED_MODEL, "hashing" is a deterministic local stand-in (tests, offline)
+# with PMS_EMBEDDING_DIM dimensions. `manage.py update_embeddings` embeds what is
+# missing, PMS_SEMANTIC_BATCH_SIZE texts per call. With PMS_SEMANTIC_AUTO_UPDATE
+# changed rows are also embedded in the background PMS_SEMANTIC_UPDATE_DELAY seconds
+# after a commit; it is off until the embed model is there (`ollama pull nomic-embed-text`).
+#
+# Query latency budget (target: 20 ms per query at 1M vectors). Scoring reads the
+# whole float32 matrix, so it scales with rows x dimension; the dimension is the
+# embed model's (768 for nomic-embed-text) or PMS_EMBEDDING_DIM for "hashing".
+# `manage.py bench_semantic --dim N` on one vCPU, 1M vectors, top-10:
+#   dim  64: one query 30 ms, batched 12 ms per query   (meets 20 ms batched)
+#   dim 128: one query 69 ms, batched 16 ms per query   (meets 20 ms batched)
+#   dim 256: one query 116 ms, batched 23 ms per query  (misses)
+# A lone query meets 20 ms at 250k x 128 (17 ms); 1M x 32 is at the edge (20 ms).
+# Batching only helps when queries arrive together (QueryBatcher). Re-run the
+# bench on the target host.
+PMS_EMBEDDER = "ollama"
+PMS_EMBEDDING_DIM = 256
+PMS_SEMANTIC_BATCH_SIZE = 64
+PMS_SEMANTIC_AUTO_UPDATE = False
+PMS_SEMANTIC_UPDATE_DELAY = 1.0
+
+# Per-process cache for derived data (PMS.workload). Point this at a shared backend
+# such as django.core.cache.backends.redis.RedisCache when running several workers,
+# so invalidations reach all of them.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
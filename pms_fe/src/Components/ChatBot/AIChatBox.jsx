@@ -50,7 +50,13 @@ const AIChatBox = () => {
     setLoading(true);
 
     try {
-      const res = await axios.post("/api/ai-chat/", { message: trimmed,user_id:"1" });
+      // the signed-in user's token, so the assistant remembers their conversation
+      const access = localStorage.getItem("access");
+      const res = await axios.post(
+        "/api/ai-chat/",
+        { message: trimmed },
+        access ? { headers: { Authorization: `Bearer ${access}` } } : undefined
+      );
       const botText = res.data.reply || "No response";
       const botMsg = { id: "bot-" + Date.now(), sender: "bot", text: botText, meta: res.data.created || null };
       setMessages((m) => [...m, botMsg]);